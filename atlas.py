@@ -0,0 +1,96 @@
+"""
+Sprite-sheet atlases: one image holding every tile of a puzzle in its solved layout, decoded once and sliced in memory.
+
+A puzzle file references an atlas with "atlas: <image path>" instead of one image per tile, the grid is given by
+"number". The tiles and the thumbnail of an atlas puzzle get shape names of the form "<image path>#<grid>:<cell>"
+and "<image path>#<grid>:thumbnail", which the shape registry slices out of the atlas.
+"""
+import math
+import tkinter
+import constants
+from puzzle_pack import load_photo
+
+SEPARATOR = '#'
+THUMBNAIL = 'thumbnail'
+
+
+def tile_name(path, grid, cell):
+    """
+    Get the shape name of a tile of an atlas
+    :param path: the atlas image file path
+    :param grid: the number of tiles per line
+    :param cell: the linear index of the tile in the solved layout, the last one is the blank tile
+    :return: the shape name
+    """
+    return f"{path}{SEPARATOR}{grid}:{cell}"
+
+
+def thumbnail_name(path, grid):
+    """
+    Get the shape name of the thumbnail of an atlas
+    :param path: the atlas image file path
+    :param grid: the number of tiles per line
+    :return: the shape name
+    """
+    return f"{path}{SEPARATOR}{grid}:{THUMBNAIL}"
+
+
+def split_name(name):
+    """
+    Split a shape name into the atlas it is sliced out of and its part
+    :param name: the shape name, or an image file path
+    :return: tuple (image file path, grid, cell or THUMBNAIL), grid and part are None for an image file path
+    """
+    path, separator, part = name.rpartition(SEPARATOR)
+    if not separator:
+        return name, None, None
+    grid, _, cell = part.partition(':')
+    return path, int(grid), cell if cell == THUMBNAIL else int(cell)
+
+
+def source_path(name):
+    """
+    Get the image file behind a shape name
+    :param name: the shape name, or an image file path
+    :return: the image file path
+    """
+    return split_name(name)[0]
+
+
+def expand_config(puzzle_config):
+    """
+    Give the tiles and the thumbnail of an atlas puzzle their shape names, a "blank" or "thumbnail" image file given
+    in the puzzle file is kept
+    :param puzzle_config: the puzzle configuration, with the keys "atlas" and "number"
+    :return: None
+    """
+    path = puzzle_config['atlas']
+    number = puzzle_config['number']
+    grid = math.isqrt(number)
+    for cell in range(number):
+        puzzle_config.setdefault(cell + 1, tile_name(path, grid, cell))
+    if 'blank' in puzzle_config:
+        puzzle_config[number] = puzzle_config['blank']
+    puzzle_config.setdefault('thumbnail', thumbnail_name(path, grid))
+
+
+def slice_atlas(path, grid):
+    """
+    Decode an atlas once and cut its tiles and thumbnail, a Tk interpreter must exist
+    :param path: the atlas image file path, loose or inside a puzzle pack
+    :param grid: the number of tiles per line
+    :return: dict of the images, shape name -> tkinter.PhotoImage
+    """
+    source = load_photo(path)
+    width, height = source.width() // grid, source.height() // grid
+    images = {}
+    for cell in range(grid * grid):
+        row, col = divmod(cell, grid)
+        image = tkinter.PhotoImage(width=width, height=height)
+        # The last cell is the blank tile, left transparent
+        if cell < grid * grid - 1:
+            image.tk.call(image, 'copy', source, '-from', col * width, row * height, (col + 1) * width,
+                          (row + 1) * height)
+        images[tile_name(path, grid, cell)] = image
+    images[thumbnail_name(path, grid)] = source.subsample(math.ceil(source.width() / constants.THUMBNAIL_SIZE))
+    return images
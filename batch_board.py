@@ -0,0 +1,145 @@
+"""
+Batch simulator running thousands of boards at once with NumPy, for scramble difficulty and player policy studies.
+
+NumPy is optional: the game itself never imports this module.
+"""
+import math
+from file_manager import FileManager
+from heuristic import manhattan_table
+from puzzle_state import PuzzleState
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+UP, DOWN, LEFT, RIGHT = range(4)  # Directions of the tile that slides into the blank, relative to the blank
+
+
+def direction_table(size):
+    """
+    Get the linear index of the neighbor of every cell in every direction
+    :param size: number of tiles per line
+    :return: int array of shape (size * size, 4), -1 where the neighbor is off the board
+    """
+    table = np.full((size * size, 4), -1, dtype=np.int64)
+    for index in range(size * size):
+        row, col = divmod(index, size)
+        if row > 0:
+            table[index, UP] = index - size
+        if row < size - 1:
+            table[index, DOWN] = index + size
+        if col > 0:
+            table[index, LEFT] = index - 1
+        if col < size - 1:
+            table[index, RIGHT] = index + 1
+    return table
+
+
+class BatchBoard:
+    """
+    K boards of the same size, held as a (K, N*N) uint8 array of tile ids plus the blank index of every board
+
+    Tile ids are the same as in PuzzleState. Every operation works on all the boards in single NumPy operations.
+
+    Attributes:
+    size (int): The number of tiles per line
+    count (int): The number of boards
+    cells (numpy.ndarray): The tile ids of every board, shape (K, N*N), uint8
+    blanks (numpy.ndarray): The linear index of the blank of every board, shape (K,)
+    directions (numpy.ndarray): The neighbor of every cell in every direction, see direction_table
+    distances (numpy.ndarray): The Manhattan distance of every tile from every cell, shape (N*N, N*N)
+    goal (numpy.ndarray): The tile ids of the solved board
+    """
+    def __init__(self, size, count):
+        """
+        Constructor of the BatchBoard class, all the boards start solved
+        :param size: The number of tiles per line, up to 16 so that tile ids fit in uint8
+        :param count: The number of boards
+        """
+        if np is None:
+            raise ImportError("BatchBoard requires NumPy")
+        if size * size > 256:
+            raise ValueError(f"Batch boards hold up to 16x16 puzzles, got {size}x{size}")
+        self.size = size
+        self.count = count
+        self.goal = np.arange(size * size, dtype=np.uint8)
+        self.cells = np.tile(self.goal, (count, 1))
+        self.blanks = np.full(count, size * size - 1, dtype=np.int64)
+        self.directions = direction_table(size)
+        self.distances = np.array(manhattan_table(size), dtype=np.int64)
+
+    @classmethod
+    def from_puzzle_file(cls, puzzle_file, count):
+        """
+        Create a batch with the size of a puzzle file
+        :param puzzle_file: the name of the puzzle file, loaded through FileManager
+        :param count: the number of boards
+        :return: a new BatchBoard
+        """
+        puzzle_config = FileManager(puzzle_file).load_puzzle_file()
+        return cls(math.isqrt(puzzle_config['number']), count)
+
+    def legal_mask(self):
+        """
+        Get the legal directions of every board
+        :return: bool array of shape (K, 4), in the order UP, DOWN, LEFT, RIGHT
+        """
+        return self.directions[self.blanks] >= 0
+
+    def step(self, moves):
+        """
+        Slide one tile into the blank on every board, illegal moves leave their board unchanged
+        :param moves: int array of shape (K,), the direction of the tile to slide on every board
+        :return: bool array of shape (K,), True where the move was legal
+        """
+        targets = self.directions[self.blanks, moves]
+        legal = targets >= 0
+        boards = np.nonzero(legal)[0]
+        targets = targets[boards]
+        blanks = self.blanks[boards]
+        self.cells[boards, blanks] = self.cells[boards, targets]
+        self.cells[boards, targets] = self.size * self.size - 1
+        self.blanks[boards] = targets
+        return legal
+
+    def random_moves(self, rng):
+        """
+        Draw one legal direction per board, uniformly
+        :param rng: numpy.random.Generator
+        :return: int array of shape (K,)
+        """
+        weights = rng.random((self.count, 4)) * self.legal_mask()
+        return weights.argmax(axis=1)
+
+    def scramble(self, moves, rng):
+        """
+        Scramble every board with its own random walk of the blank, solvability is kept
+        :param moves: the number of moves per board
+        :param rng: numpy.random.Generator
+        :return: None
+        """
+        for _ in range(moves):
+            self.step(self.random_moves(rng))
+
+    def is_solved(self):
+        """
+        Check which boards are solved
+        :return: bool array of shape (K,)
+        """
+        return (self.cells == self.goal).all(axis=1)
+
+    def manhattan(self):
+        """
+        Calculate the Manhattan distance of every board, the blank excluded
+        :return: int array of shape (K,)
+        """
+        return self.distances[self.cells, np.arange(self.size * self.size)].sum(axis=1)
+
+    def to_state(self, board):
+        """
+        Copy one board into a PuzzleState
+        :param board: the index of the board in the batch
+        :return: a new PuzzleState
+        """
+        return PuzzleState(self.size, self.cells[board].tolist(), int(self.blanks[board]))
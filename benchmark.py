@@ -0,0 +1,250 @@
+"""
+Benchmarks of the headless puzzle engine, run with: python benchmark.py
+
+The renderer benchmark needs a display and is skipped without one.
+"""
+import os
+import random
+import sys
+import time
+import tkinter
+from bitboard import BitBoard
+from board import Board
+from puzzle_state import PuzzleState, neighbor_table
+from renderer import NullRenderer, create_renderer
+from solution_cache import SolutionCache
+from solver import IDAStarSolver, ParallelIDAStarSolver
+from tile import Tile
+
+# Uniform random 4x4 scrambles of ScrambleGenerator(5001), with their optimal number of moves
+HARD_INSTANCES = [
+    ([14, 7, 13, 3, 12, 4, 5, 2, 0, 1, 8, 15, 11, 6, 10, 9], 53),
+    ([9, 4, 5, 12, 7, 1, 2, 3, 11, 10, 8, 13, 0, 14, 15, 6], 55),
+    ([10, 9, 7, 0, 3, 15, 14, 2, 13, 4, 1, 5, 12, 8, 6, 11], 50),
+    ([15, 3, 2, 12, 0, 14, 8, 7, 9, 5, 6, 4, 10, 1, 13, 11], 50),
+    ([15, 12, 11, 10, 0, 13, 3, 2, 8, 5, 14, 1, 7, 4, 6, 9], 52),
+    ([11, 1, 13, 15, 0, 9, 2, 10, 6, 14, 3, 5, 12, 4, 7, 8], 53),
+    ([12, 8, 4, 10, 11, 9, 7, 2, 0, 14, 6, 5, 1, 13, 3, 15], 52),
+    ([6, 12, 5, 1, 0, 9, 7, 4, 2, 15, 8, 14, 10, 3, 11, 13], 51),
+]
+
+
+def random_walk_state(size, moves, rng):
+    """
+    Scramble a solved state the same way as Board.real_scramble
+    :param size: number of tiles per line
+    :param moves: number of random moves of the blank
+    :param rng: random.Random object
+    :return: a scrambled PuzzleState
+    """
+    state = PuzzleState(size)
+    for _ in range(moves):
+        state.move(rng.choice(state.legal_moves()))
+    return state
+
+
+def benchmark_instances(size=4, count=10, seed=5001):
+    """
+    Build the fixed set of instances shared by the solver benchmarks
+    :param size: number of tiles per line
+    :param count: number of instances
+    :param seed: seed of the random walks
+    :return: list of PuzzleState
+    """
+    rng = random.Random(seed)
+    return [random_walk_state(size, rng.randint(5, 200), rng) for _ in range(count)]
+
+
+def benchmark_solver(size=4, count=10, seed=5001):
+    """
+    Measure the throughput of the IDA* solver on a fixed set of instances
+    :param size: number of tiles per line
+    :param count: number of instances
+    :param seed: seed of the random walks
+    :return: None
+    """
+    solver = IDAStarSolver()
+    total_nodes = 0
+    total_time = 0.0
+    print(f"IDA* solver, {size}x{size}")
+    for state in benchmark_instances(size, count, seed):
+        result = solver.solve(state)
+        total_nodes += result.nodes
+        total_time += result.elapsed
+        print(f"  {len(result.moves):3d} moves  {result.nodes:9d} nodes  {result.elapsed:8.3f}s  "
+              f"{result.nodes_per_second:10.0f} nodes/s")
+    print(f"  total {total_nodes} nodes in {total_time:.3f}s, {total_nodes / max(total_time, 1e-9):.0f} nodes/s")
+
+
+def benchmark_parallel_solver(instances=HARD_INSTANCES, workers=None):
+    """
+    Measure the speedup of the parallel IDA* solver over the single-process solver on fixed hard 4x4 instances, 45 to
+    55 moves away from the solved puzzle, whose searches are long enough to amortize the split and the workers
+    :param instances: list of tuples (cells, optimal number of moves), default is HARD_INSTANCES
+    :param workers: number of worker processes, default is the number of CPUs
+    :return: None
+    """
+    solver = IDAStarSolver()
+    parallel_solver = ParallelIDAStarSolver(workers)
+    parallel_solver.start()
+    total_time = 0.0
+    total_parallel_time = 0.0
+    print(f"Parallel IDA* solver, 4x4, {parallel_solver.workers} workers on {os.cpu_count()} CPUs")
+    try:
+        for cells, optimal in instances:
+            state = PuzzleState(4, cells)
+            result = solver.solve(state)
+            parallel_result = parallel_solver.solve(state)
+            if len(result.moves) != optimal or len(parallel_result.moves) != optimal:
+                raise RuntimeError(f"Expected {optimal} moves, got {len(result.moves)} and "
+                                   f"{len(parallel_result.moves)}")
+            total_time += result.elapsed
+            total_parallel_time += parallel_result.elapsed
+            print(f"  {optimal:3d} moves  {result.elapsed:8.3f}s  {parallel_result.elapsed:8.3f}s  "
+                  f"speedup {result.elapsed / max(parallel_result.elapsed, 1e-9):5.2f}")
+    finally:
+        parallel_solver.close()
+    print(f"  total {total_time:.3f}s vs {total_parallel_time:.3f}s, "
+          f"speedup {total_time / max(total_parallel_time, 1e-9):.2f}")
+
+
+def quadratic_inversions(state):
+    """
+    Count the inversions with the double loop the board used before the Fenwick tree, as a baseline
+    :param state: PuzzleState
+    :return: inversions
+    """
+    ids = [tile for tile in state.cells if tile != state.blank_id]
+    inversions = 0
+    for i in range(len(ids)):
+        for j in range(i + 1, len(ids)):
+            if ids[i] > ids[j]:
+                inversions += 1
+    return inversions
+
+
+def benchmark_solvability(sizes=(4, 10, 50), repeat=5, seed=5001):
+    """
+    Compare the quadratic inversion count, the Fenwick tree count and the parity kept by swap
+    :param sizes: numbers of tiles per line
+    :param repeat: number of timed calls per path
+    :param seed: seed of the shuffles
+    :return: None
+    """
+    rng = random.Random(seed)
+    print("Solvability check, time per call")
+    for size in sizes:
+        cells = list(range(size * size))
+        rng.shuffle(cells)
+        state = PuzzleState(size, cells)
+        timings = []
+        for check in (lambda: quadratic_inversions(state), state.calculate_inversions, state.is_solvable):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                check()
+            timings.append((time.perf_counter() - start) / repeat)
+        print(f"  {size:2d}x{size:<2d}  quadratic {timings[0] * 1e3:10.3f}ms  fenwick {timings[1] * 1e3:8.3f}ms  "
+              f"parity {timings[2] * 1e6:6.2f}us")
+
+
+def benchmark_bitboard(puzzle_file='mario.puz', moves=100000, seed=5001):
+    """
+    Compare the moves per second and the bytes per stored state of a bitboard and of the 2D list of tiles
+    :param puzzle_file: puzzle file of the board, up to 4x4
+    :param moves: number of random moves
+    :param seed: seed of the random moves
+    :return: None
+    """
+    board = Board(puzzle_file, NullRenderer(), SolutionCache())
+    bitboard = BitBoard.from_tiles(board.tiles)
+    size = board.num_tiles
+    rng = random.Random(seed)
+    # The same walk for both, as linear indices
+    walk = []
+    state = board.state.copy()
+    for _ in range(moves):
+        index = rng.choice(state.legal_moves())
+        state.move(index)
+        walk.append(index)
+
+    start = time.perf_counter()
+    for index in walk:
+        position = divmod(index, size)
+        board.swap(position, board.empty_tile_position)
+        board.empty_tile_position = position
+    list_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for index in walk:
+        bitboard.move(index)
+    bitboard_time = time.perf_counter() - start
+    assert BitBoard.from_tiles(board.tiles) == bitboard
+
+    # A snapshot of the tiles as a 2D list of tile ids, the cheapest copy of Board.tiles
+    snapshot = [[row * size + col for row, col in (tile.init_position for tile in line)] for line in board.tiles]
+    list_bytes = sys.getsizeof(snapshot) + sum(sys.getsizeof(line) for line in snapshot)
+    print(f"Bitboard, {size}x{size}")
+    print(f"  2D tiles list  {moves / list_time:10.0f} moves/s  {list_bytes:4d} bytes per state")
+    print(f"  bitboard       {moves / bitboard_time:10.0f} moves/s  {sys.getsizeof(bitboard.bits):4d} bytes per state")
+
+
+def benchmark_renderers(sizes=(4, 20), moves=200, image='Images/mario/1.gif', seed=5001):
+    """
+    Compare the startup draw time and the per-move frame time of the turtle and canvas renderers
+    :param sizes: numbers of tiles per line
+    :param moves: number of timed moves per board
+    :param image: image file path of every tile
+    :param seed: seed of the random moves
+    :return: None
+    """
+    print("Renderers, startup draw and per-move frame time")
+    for size in sizes:
+        tile_size = min(90, 800 // size)
+        neighbors = neighbor_table(size)
+        for name in ('turtle', 'canvas'):
+            renderer = create_renderer(name)
+            tiles = [Tile(image, divmod(index, size), divmod(index, size), renderer) for index in range(size * size)]
+
+            def draw(tile, index):
+                row, col = divmod(index, size)
+                tile.draw(col * tile_size - 400, 400 - row * tile_size)
+
+            start = time.perf_counter()
+            for index, tile in enumerate(tiles):
+                draw(tile, index)
+            renderer.update()
+            startup_time = time.perf_counter() - start
+            rng = random.Random(seed)
+            cells = list(range(size * size))  # The tile drawn at every position, the last one is the blank
+            blank = size * size - 1
+            start = time.perf_counter()
+            for _ in range(moves):
+                index = rng.choice(neighbors[blank])
+                cells[blank], cells[index] = cells[index], cells[blank]
+                draw(tiles[cells[blank]], blank)
+                renderer.update()
+                blank = index
+            frame_time = (time.perf_counter() - start) / moves
+            for tile in tiles:
+                renderer.hide_tile(tile)
+            renderer.update()
+            print(f"  {size:2d}x{size:<2d}  {name:6s}  startup {startup_time * 1e3:8.1f}ms  "
+                  f"frame {frame_time * 1e3:7.3f}ms")
+
+
+def main():
+    """
+    Run all the benchmarks
+    :return: None
+    """
+    benchmark_solvability()
+    benchmark_bitboard()
+    benchmark_solver()
+    benchmark_parallel_solver()
+    try:
+        benchmark_renderers()
+    except tkinter.TclError as error:
+        print(f"Renderers skipped: {error}")
+
+
+if __name__ == "__main__":
+    main()
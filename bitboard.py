@@ -0,0 +1,171 @@
+"""
+Packed bitboards for boards up to 4x4: the whole state fits in one 64-bit int, 4 bits per cell.
+"""
+from puzzle_state import PuzzleState, neighbor_table
+
+MAX_BITBOARD_SIZE = 4  # 16 cells of 4 bits
+CELL_BITS = 4
+CELL_MASK = 0xF
+
+
+def move_table(size):
+    """
+    Get the precomputed moves of every blank position
+    :param size: number of tiles per line
+    :return: tuple of tuples, table[blank] holds (index, shift, spread) for every tile that can slide into the blank,
+    shift is the bit offset of the tile, spread has one bit at the lowest bit of both cells
+    """
+    table = _MOVE_TABLES.get(size)
+    if table is None:
+        table = tuple(tuple((index, index * CELL_BITS, (1 << index * CELL_BITS) | (1 << blank * CELL_BITS))
+                            for index in neighbors)
+                      for blank, neighbors in enumerate(neighbor_table(size)))
+        _MOVE_TABLES[size] = table
+    return table
+
+
+_MOVE_TABLES = {}
+
+
+def pack(cells):
+    """
+    Pack tile ids into a bitboard
+    :param cells: sequence of the tile ids in linear order
+    :return: int, the tile at linear index i in bits 4i to 4i + 3
+    """
+    bits = 0
+    for index, tile in enumerate(cells):
+        bits |= tile << index * CELL_BITS
+    return bits
+
+
+def unpack(bits, size):
+    """
+    Unpack a bitboard into tile ids
+    :param bits: the bitboard
+    :param size: number of tiles per line
+    :return: list of the tile ids in linear order
+    """
+    return [(bits >> index * CELL_BITS) & CELL_MASK for index in range(size * size)]
+
+
+class BitBoard:
+    """
+    State of a puzzle up to 4x4 packed in one int, with the same tile ids as PuzzleState
+
+    A move XORs the tile and the blank into each other's cell: (tile ^ blank_id) is spread over both cells with a
+    single multiplication by a precomputed mask. Two bitboards of a size are equal when their ints are equal, and the
+    int is the hash.
+
+    Attributes:
+    size (int): The number of tiles per line
+    bits (int): The packed tile ids
+    blank (int): The linear index of the blank tile
+    moves (tuple): The precomputed moves of the size, see move_table
+    """
+    def __init__(self, size, bits, blank=None):
+        """
+        Constructor of the BitBoard class
+        :param size: The number of tiles per line, up to MAX_BITBOARD_SIZE
+        :param bits: The packed tile ids, see pack
+        :param blank: The linear index of the blank tile, found from bits if not given
+        """
+        if size > MAX_BITBOARD_SIZE:
+            raise ValueError(f"Bitboards hold up to {MAX_BITBOARD_SIZE}x{MAX_BITBOARD_SIZE} puzzles, got {size}x{size}")
+        self.size = size
+        self.bits = bits
+        self.blank = unpack(bits, size).index(size * size - 1) if blank is None else blank
+        self.moves = move_table(size)
+
+    @classmethod
+    def solved(cls, size):
+        """
+        Create the bitboard of a solved puzzle
+        :param size: number of tiles per line
+        :return: a new BitBoard
+        """
+        return cls(size, pack(range(size * size)), size * size - 1)
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Create a bitboard from a PuzzleState
+        :param state: PuzzleState
+        :return: a new BitBoard
+        """
+        return cls(state.size, pack(state.cells))
+
+    @classmethod
+    def from_tiles(cls, tiles):
+        """
+        Create a bitboard from the 2D list of tiles of a board
+        :param tiles: Board.tiles
+        :return: a new BitBoard
+        """
+        return cls.from_state(PuzzleState.from_tiles(tiles))
+
+    def to_state(self):
+        """
+        Convert the bitboard to a PuzzleState
+        :return: a new PuzzleState
+        """
+        return PuzzleState(self.size, unpack(self.bits, self.size), self.blank)
+
+    def apply_to(self, board):
+        """
+        Put the tiles of a board in the positions of the bitboard
+        :param board: Board of the same size
+        :return: None
+        """
+        board.state = self.to_state()
+        board.sync_tiles()
+
+    def legal_moves(self):
+        """
+        Get the linear indices of the tiles that can slide into the blank
+        :return: list of linear indices
+        """
+        return [index for index, _, _ in self.moves[self.blank]]
+
+    def move(self, index):
+        """
+        Slide the tile at the given linear index into the blank, if it is adjacent
+        :param index: linear index of the tile to slide
+        :return: True if the tile moved, False otherwise
+        """
+        blank_id = self.size * self.size - 1
+        for neighbor, shift, spread in self.moves[self.blank]:
+            if neighbor == index:
+                self.bits ^= (((self.bits >> shift) & CELL_MASK) ^ blank_id) * spread
+                self.blank = index
+                return True
+        return False
+
+    def children(self):
+        """
+        Get the bitboards one move away, without creating BitBoard objects
+        :return: list of tuples (bits, blank)
+        """
+        bits = self.bits
+        blank_id = self.size * self.size - 1
+        return [(bits ^ (((bits >> shift) & CELL_MASK) ^ blank_id) * spread, index)
+                for index, shift, spread in self.moves[self.blank]]
+
+    def is_solved(self):
+        """
+        Check if every tile is in its initial position
+        :return: True if solved, False otherwise
+        """
+        return self.bits == _SOLVED_BITS.setdefault(self.size, pack(range(self.size * self.size)))
+
+    def __eq__(self, other):
+        return isinstance(other, BitBoard) and self.size == other.size and self.bits == other.bits
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __repr__(self):
+        return f"BitBoard({self.size}, {self.bits:#x})"
+
+
+_SOLVED_BITS = {}
@@ -1,9 +1,20 @@
 import random
+import time
 import turtle
 import math
 import constants
 from tile import Tile
 from file_manager import FileManager
+from heuristic import ManhattanConflict
+from puzzle_catalog import PuzzleCatalog
+from puzzle_state import PuzzleState
+from reduction_solver import ReductionSolver
+from scramble import ScrambleGenerator
+from scramble_pool import MAX_DISTANCES, ScramblePool
+from renderer import create_renderer
+from solution_cache import SolutionCache
+from solver import AnytimeSolver, IDAStarSolver, SolveResult
+from tile_cache import scaled_name
 
 
 def tuple_to_linear_index(position, num_tiles):
@@ -24,30 +35,58 @@ class Board:
     Attributes:
     file_manager (FileManager): The file manager object
     puzzle_config (dict): The configuration of the puzzle
-    puzzle_catalog (list): The list of available puzzles
+    puzzle_catalog (PuzzleCatalog): The index of the available puzzles, refreshed when a puzzle is loaded
     num_tiles (int): The number of tiles per line in the puzzle
     tile_size (int): The (pixel) size of the tiles
-    tiles (list): The list of tiles
+    renderer (TurtleRenderer): The renderer drawing the tiles, a CanvasRenderer, or a NullRenderer for headless boards
+    state (PuzzleState): The headless state of the puzzle, owning all the rules
+    solver (IDAStarSolver): The solver used for the optimal solution
+    hint_solver (AnytimeSolver): The solver used for the hints within a time budget
+    large_solver (ReductionSolver): The non-optimal solver used beyond constants.OPTIMAL_SOLVER_MAX_SIZE
+    solution_cache (SolutionCache): The optimal distances and best moves of the states solved so far
+    scrambler (ScrambleGenerator): The generator of uniform random solvable scrambles
+    scramble_pool (ScramblePool): The precomputed scrambles of exact optimal distances
+    difficulty (int): The optimal distance of the scrambles, None for uniform random scrambles
+    tiles (list): The list of tiles, a view over the state
+    heuristic (ManhattanConflict): The Manhattan distance plus linear conflict of the state, updated on every move
+    distance_bound (int): The admissible lower bound of the number of moves to solve the puzzle
     empty_tile_position (tuple): The position of the empty tile
-    solvable (str): The resolvability of the puzzle
+    zobrist_hash (int): The 64-bit Zobrist hash of the tiles, updated in O(1) by every swap
+    solvable (str): The resolvability of the puzzle, 'Yes' or 'No', always current
     on_move_callbacks (dict): The dictionary of callbacks for the moves
     """
-    def __init__(self, puzzle_file='mario.puz'):
+    def __init__(self, puzzle_file='mario.puz', renderer=None, solution_cache=None, scramble_pool=None,
+                 difficulty=constants.SCRAMBLE_DIFFICULTY, puzzle_catalog=None):
         """
         Constructor of the Board class
         :param puzzle_file: The name of the puzzle file, default is 'mario.puz'
+        :param renderer: The renderer drawing the tiles, default is the renderer selected by constants.RENDERER
+        :param solution_cache: The SolutionCache, default is one stored in constants.SOLUTION_CACHE_PATH
+        :param scramble_pool: The ScramblePool, default is one stored in constants.PATTERN_DB_DIR
+        :param difficulty: The optimal distance of the scrambles, default is constants.SCRAMBLE_DIFFICULTY
+        :param puzzle_catalog: The PuzzleCatalog, default is one stored in constants.PUZZLE_CATALOG_PATH
         """
         self.file_manager = FileManager(puzzle_file)
+        self.renderer = create_renderer() if renderer is None else renderer
+        self.solver = IDAStarSolver()
+        self.hint_solver = AnytimeSolver()
+        self.large_solver = ReductionSolver()
+        self.solution_cache = SolutionCache(path=constants.SOLUTION_CACHE_PATH) if solution_cache is None \
+            else solution_cache
+        self.scrambler = ScrambleGenerator(min_distance=constants.SCRAMBLE_MIN_DISTANCE)
+        self.scramble_pool = ScramblePool() if scramble_pool is None else scramble_pool
+        self.difficulty = difficulty
         self.puzzle_config = None
-        self.puzzle_catalog = None
+        self.puzzle_catalog = PuzzleCatalog(self.file_manager) if puzzle_catalog is None else puzzle_catalog
+        self.file_manager.puzzle_catalog = self.puzzle_catalog
         self.num_tiles = None
         self.tile_size = None
+        self.state = None
         self.tiles = None
-        self.empty_tile_position = None
+        self.heuristic = None
 
         self.initialize_puzzle()  # Initialize the puzzle
 
-        self.solvable = 'Yes' if self.is_solvable() else 'No'
         self.on_move_callbacks = {}
 
     def register_move_callback(self, event_type, callback):
@@ -65,7 +104,42 @@ class Board:
         :param event_type: the type of event, e.g. 'max_puzzle'
         :return: None
         """
-        self.on_move_callbacks[event_type]()
+        # Headless boards may run without any callback registered
+        callback = self.on_move_callbacks.get(event_type)
+        if callback is not None:
+            callback()
+
+    @property
+    def empty_tile_position(self):
+        """The position of the empty tile"""
+        if self.state is None:
+            return None
+        return self.state.to_position(self.state.blank)
+
+    @empty_tile_position.setter
+    def empty_tile_position(self, position):
+        self.state.blank = self.state.to_index(position)
+
+    @property
+    def solvable(self):
+        """The resolvability of the puzzle, 'Yes' or 'No', from the parity kept up to date by every swap"""
+        if self.state is None:
+            return None
+        return 'Yes' if self.is_solvable() else 'No'
+
+    @property
+    def distance_bound(self):
+        """The admissible lower bound of the number of moves to solve the puzzle, from the incremental heuristic"""
+        if self.heuristic is None:
+            return None
+        return self.heuristic.value
+
+    @property
+    def zobrist_hash(self):
+        """The 64-bit Zobrist hash of the tiles, equal to zobrist.zobrist_hash of the tuple of tile ids"""
+        if self.state is None:
+            return None
+        return self.state.zobrist
 
     def initialize_puzzle(self):
         """
@@ -73,15 +147,27 @@ class Board:
         :return: None
         """
         self.puzzle_config = self.file_manager.load_puzzle_file()
-        self.puzzle_catalog = self.file_manager.load_puzzle_catalog()
         self.num_tiles = int(math.sqrt(self.puzzle_config['number']))
         # Set the tile size, preventing the tiles from being too small
         if self.puzzle_config['size'] <= 90:
             self.tile_size = 90
         else:
-            self.tile_size = self.puzzle_config['size'] + 5
+            self.tile_size = self.puzzle_config['size'] + constants.TILE_GAP
+        # Then shrink the tiles until the board fits in its area
+        self.tile_size = min(self.tile_size, min(constants.BOARD_WIDTH, constants.BOARD_HEIGHT) // self.num_tiles)
         self.initialize_tiles()
 
+    def tile_image(self, image_path):
+        """
+        Get the image of a tile at the tile size, resampled when the source image has another size
+        :param image_path: the image file path of the tile
+        :return: the shape name of the image
+        """
+        image_size = self.tile_size - constants.TILE_GAP
+        if image_size == self.puzzle_config['size']:
+            return image_path
+        return scaled_name(image_path, image_size)
+
     def initialize_tiles(self):
         """
         Initialize the tiles of the puzzle
@@ -101,6 +187,32 @@ class Board:
         start_y = constants.BOARD_OFFSET_Y + (self.num_tiles / 2 * self.tile_size) - (self.tile_size / 2)
         return start_x, start_y
 
+    def position_at(self, x, y):
+        """
+        Find the tile position under a point of the screen, in constant time whatever the board size
+        :param x: x-coordinate of the point
+        :param y: y-coordinate of the point
+        :return: a tuple (row, col), None if the point is outside the board
+        """
+        start_x, start_y = self.start_pos()
+        # Tiles are drawn centered on start_pos plus a multiple of tile_size
+        col = math.floor((x - start_x) / self.tile_size + 0.5)
+        row = math.floor((start_y - y) / self.tile_size + 0.5)
+        if 0 <= row < self.num_tiles and 0 <= col < self.num_tiles:
+            return row, col
+        return None
+
+    def on_click(self, x, y):
+        """
+        Callback function on the event of click on the screen, moving the tile under the click
+        :param x: x-coordinate of the click
+        :param y: y-coordinate of the click
+        :return: None
+        """
+        position = self.position_at(x, y)
+        if position is not None:
+            self.move_puzzle(position)
+
     def draw_all(self):
         """
         Draw all the tiles of the puzzle
@@ -113,19 +225,40 @@ class Board:
                 x = start_x + tile.curr_position[1] * self.tile_size
                 y = start_y - tile.curr_position[0] * self.tile_size
                 tile.draw(x, y)  # Invoke the draw method of the tile
-        turtle.update()  # Update the turtle screen
+        self.renderer.bind_click(self.on_click)  # One click event for the whole board, tiles have none
+        self.renderer.update()  # Update the turtle screen
 
     def load_puzzle(self):
         """
         Load the puzzle configuration, put tiles in the 2D list
         :return: None
         """
+        self.state = PuzzleState(self.num_tiles)
+        self.heuristic = ManhattanConflict(self.num_tiles, self.state.cells)
+        # Hold the images of the puzzle, so that they stay decoded while it is loaded
+        images = [self.tile_image(self.puzzle_config.get(i)) for i in range(1, self.num_tiles ** 2 + 1)]
+        self.renderer.acquire_images(self.file_manager.puzzle_file, images + [self.puzzle_config.get('thumbnail')])
         for i in range(1, self.num_tiles ** 2 + 1):
             # Calculate the row and column of the tile
             row, col = divmod(i - 1, self.num_tiles)
-            image_path = self.puzzle_config.get(i)
             # Create a new instance of the Tile class for each tile
-            self.tiles[row][col] = Tile(image_path, (row, col), (row, col), self.move_puzzle)
+            self.tiles[row][col] = Tile(images[i - 1], (row, col), (row, col), self.renderer)
+
+    def sync_tiles(self):
+        """
+        Rearrange the 2D list of tiles and rebuild the heuristic to match the state, after a direct change of the state
+        :return: None
+        """
+        tiles_by_id = [None] * (self.num_tiles ** 2)
+        for row in self.tiles:
+            for tile in row:
+                tiles_by_id[tuple_to_linear_index(tile.init_position, self.num_tiles)] = tile
+        for index, tile_id in enumerate(self.state.cells):
+            row, col = divmod(index, self.num_tiles)
+            tile = tiles_by_id[tile_id]
+            tile.curr_position = (row, col)
+            self.tiles[row][col] = tile
+        self.heuristic = ManhattanConflict(self.num_tiles, self.state.cells)
 
     def load_new_puzzle(self, x, y):
         """
@@ -135,13 +268,15 @@ class Board:
         :return: None
         """
         text = 'Enter the name of the puzzle you want to load. Choices are:\n'
-        for i in range(0, len(self.puzzle_catalog)):
+        # Only the puzzle files changed since the last load are read, puzzles whose files or images are missing are
+        # not offered
+        for i, puzzle_file in enumerate(self.file_manager.load_puzzle_catalog()):
             # Show the first 10 puzzles
             if i > 9:
                 self.notify_move_callback('max_puzzle')
                 break
             else:
-                text += self.puzzle_catalog[i] + '\n'
+                text += self.catalog_line(puzzle_file) + '\n'
         new_puzzle = turtle.textinput('Load puzzle', text)
         if new_puzzle == '' or new_puzzle is None:
             return
@@ -150,20 +285,39 @@ class Board:
             self.notify_move_callback('no_puzzle')
             return
         else:
-            # Check if the new puzzle is valid
+            # Check if the new puzzle is valid, a malformed puzzle is logged with its missing image
             if self.file_manager.check_puzzle_config(new_puzzle):
-                self.clear_board()
-                self.file_manager.puzzle_file = new_puzzle
-                self.initialize_puzzle()
-                self.solvable = 'Yes' if self.is_solvable() else 'No'
-                self.draw_all()
-                self.notify_move_callback('redraw_thumbnail')
-                self.notify_move_callback('reset_moves')
+                self.switch_puzzle(new_puzzle)
             # If the new puzzle is not valid, show and log an error
             else:
                 self.notify_move_callback('no_puzzle')
                 return
 
+    def catalog_line(self, puzzle_file):
+        """
+        Describe a puzzle of the catalog for the load dialog
+        :param puzzle_file: name of the puzzle file
+        :return: the puzzle file followed by the name and the size of the puzzle
+        """
+        entry = self.puzzle_catalog.lookup(puzzle_file)
+        size = math.isqrt(entry['number'])
+        return f"{puzzle_file} ({entry['name']}, {size}x{size})"
+
+    def switch_puzzle(self, puzzle_file):
+        """
+        Replace the puzzle with a valid puzzle file and redraw it, the turtles of the old tiles are reused
+        :param puzzle_file: the name of the puzzle file
+        :return: None
+        """
+        self.clear_board()
+        self.renderer.release_images(self.file_manager.puzzle_file)
+        self.file_manager.puzzle_file = puzzle_file
+        self.initialize_puzzle()
+        self.draw_all()
+        self.notify_move_callback('state_changed')
+        self.notify_move_callback('redraw_thumbnail')
+        self.notify_move_callback('reset_moves')
+
     def reset(self, x, y):
         """
         Reset the puzzle to the initial state
@@ -174,8 +328,8 @@ class Board:
         self.clear_board()
         self.load_puzzle()
         self.empty_tile_position = self.find_empty_tile_position()
-        self.solvable = 'Yes' if self.is_solvable() else 'No'
         self.draw_all()
+        self.notify_move_callback('state_changed')
         self.notify_move_callback('reset_solvable')
 
     def scramble(self):
@@ -183,46 +337,30 @@ class Board:
         Scramble the puzzle, by shuffling the tiles randomly. Resolvability is not guaranteed
         :return: None
         """
-        # Flatten the 2D list of tiles
-        tiles_lst = [tile for row in self.tiles for tile in row]
-        random.shuffle(tiles_lst)  # Shuffle the tiles
-        # Reconstruct the 2D list of tiles
-        self.tiles = [tiles_lst[i:i + self.num_tiles] for i in range(0, len(tiles_lst), self.num_tiles)]
-        # Update the current positions of the tiles
-        for i in range(self.num_tiles):
-            for j in range(self.num_tiles):
-                self.tiles[i][j].curr_position = (i, j)
-        self.empty_tile_position = self.find_empty_tile_position()
+        cells = list(self.state.cells)
+        random.shuffle(cells)  # Shuffle the tiles
+        self.state = PuzzleState(self.num_tiles, cells)
+        self.sync_tiles()
 
     def get_legal_moves(self):
         """
         Get the possible legal moves of the current empty tile
         :return: list of legal moves
         """
-        legal_moves = []
-        row, col = self.empty_tile_position
-        # Find all possible legal moves and add them to the list
-        if row > 0:
-            legal_moves.append((row - 1, col))
-        if row < self.num_tiles - 1:
-            legal_moves.append((row + 1, col))
-        if col > 0:
-            legal_moves.append((row, col - 1))
-        if col < self.num_tiles - 1:
-            legal_moves.append((row, col + 1))
-        return legal_moves
+        return [self.state.to_position(index) for index in self.state.legal_moves()]
 
     def real_scramble(self):
         """
-        Scramble the puzzle, by reversely moving the empty tile randomly. Resolvability is guaranteed
+        Scramble the puzzle, by taking a scramble of the difficulty from the pool, or when there is no difficulty
+        or the pool is empty, by drawing a state uniformly among the solvable ones. Resolvability is guaranteed.
+        A difficulty beyond the hardest puzzles of the size takes the hardest ones
         :return: None
         """
-        moves = random.randint(5, 200)  # Randomly choose the number of moves
-        for _ in range(moves):
-            legal_moves = random.choice(self.get_legal_moves())  # Randomly choose a legal move from the list
-            # Swap the tiles but not display them yet, to prevent flickering
-            self.swap(legal_moves, self.empty_tile_position)
-            self.empty_tile_position = legal_moves
+        state = None
+        if self.difficulty is not None and self.num_tiles <= constants.OPTIMAL_SOLVER_MAX_SIZE:
+            state = self.scramble_pool.take(self.num_tiles, min(self.difficulty, MAX_DISTANCES[self.num_tiles]))
+        self.state = state if state is not None else self.scrambler.generate(self.num_tiles)
+        self.sync_tiles()
 
     def move_puzzle(self, position):
         """
@@ -234,17 +372,70 @@ class Board:
         empty_row, empty_col = self.empty_tile_position
         if abs(row - empty_row) + abs(col - empty_col) == 1:
             draw = self.swap(position, self.empty_tile_position)  # Swap the tiles and draw the two tiles only
+            # The tile slid from its position into the former empty tile position
+            self.heuristic.slide(self.state.cells, self.state.to_index(position), self.state.blank)
             self.empty_tile_position = position
             start_x, start_y = self.start_pos()
             for tile in draw:
                 x = start_x + tile.curr_position[1] * self.tile_size
                 y = start_y - tile.curr_position[0] * self.tile_size
                 tile.draw(x, y)
-            turtle.update()
+            self.renderer.update()
             # Notify the callback functions
+            self.notify_move_callback('state_changed')
             self.notify_move_callback('count_move')
             self.notify_move_callback('check_game_over')
 
+    def solve(self):
+        """
+        Find a solution of the puzzle from its current state, optimal up to constants.OPTIMAL_SOLVER_MAX_SIZE
+        Optimal solutions are looked up in the solution cache first, and recorded in it when solved
+        :return: SolveResult with the positions of the tiles to click, None if the puzzle is not solvable
+        """
+        if self.num_tiles > constants.OPTIMAL_SOLVER_MAX_SIZE:
+            return self.large_solver.solve(self.state)
+        start = time.perf_counter()
+        path = self.solution_cache.solution(self.state)
+        if path is not None:
+            moves = [self.state.to_position(index) for index in path]
+            return SolveResult(moves, 0, time.perf_counter() - start)
+        result = self.solver.solve(self.state)
+        if result is not None:
+            self.solution_cache.record(self.state, [self.state.to_index(position) for position in result.moves])
+        return result
+
+    def distance(self):
+        """
+        Get the number of moves of an optimal solution, from the solution cache or solved and recorded
+        :return: distance to the solved puzzle, None if the puzzle is not solvable or too large to solve optimally
+        """
+        if self.num_tiles > constants.OPTIMAL_SOLVER_MAX_SIZE:
+            return None
+        entry = self.solution_cache.lookup(self.state)
+        if entry is not None:
+            return entry[0]
+        result = self.solve()
+        return None if result is None else len(result.moves)
+
+    def hint(self, budget_ms=None):
+        """
+        Find the next move of an optimal solution, or the best move found within a time budget
+        :param budget_ms: The time budget in milliseconds, default is None for an optimal move without limit,
+        ignored beyond constants.OPTIMAL_SOLVER_MAX_SIZE where the reduction solver is always used
+        :return: position of the tile to click, None if the puzzle is solved or not solvable
+        """
+        if self.num_tiles <= constants.OPTIMAL_SOLVER_MAX_SIZE:
+            entry = self.solution_cache.lookup(self.state)
+            if entry is not None:
+                return None if entry[0] == 0 else self.state.to_position(entry[1])
+        if budget_ms is None or self.num_tiles > constants.OPTIMAL_SOLVER_MAX_SIZE:
+            result = self.solve()
+        else:
+            result = self.hint_solver.solve(self.state, budget_ms)
+        if result is None or not result.moves:
+            return None
+        return result.moves[0]
+
     def swap(self, prev_pos, next_pos):
         """
         Swap the tiles of the puzzle. Also used for testing (test_module.py).
@@ -253,6 +444,7 @@ class Board:
         :return: a list of tiles to draw
         """
         draw = []
+        self.state.swap(self.state.to_index(prev_pos), self.state.to_index(next_pos))
         self.tiles[prev_pos[0]][prev_pos[1]], self.tiles[next_pos[0]][next_pos[1]] = \
             self.tiles[next_pos[0]][next_pos[1]], self.tiles[prev_pos[0]][prev_pos[1]]
         self.tiles[next_pos[0]][next_pos[1]].curr_position = next_pos
@@ -270,61 +462,28 @@ class Board:
         A inversion refers to a pair of tiles (a, b) where a appears before b but a > b.
         The number of inversions is used to determine if the puzzle is solvable.
         """
-        inversions = 0
-        # Flatten the 2D list of tiles
-        tiles_lst = [tile for row in self.tiles for tile in row]
-        # Calculate the number of inversions by arranging them in linear positions (excluding the empty tile)
-        linear_positions = [tuple_to_linear_index(tile.init_position, self.num_tiles)
-                            for tile in tiles_lst if tile.init_position != (self.num_tiles - 1, self.num_tiles - 1)]
-        for i in range(len(linear_positions)):
-            for j in range(i + 1, len(linear_positions)):
-                if linear_positions[i] > linear_positions[j]:
-                    inversions += 1
-        return inversions
+        return self.state.calculate_inversions()
 
     def is_solvable(self):
         """
         Check if the puzzle is solvable
         :return: yes if solvable, no otherwise
         """
-        """
-        For puzzles with odd number of tiles, the puzzle is solvable if the number of inversions is even.
-        For puzzles with even number of tiles, the puzzle is solvable:
-            1. if the number of inversions is even and the row number of the empty tile counted from the bottom is odd.
-            2. if the number of inversions is odd and the row number of the empty tile counted from the bottom is even.
-        """
-        inversions = self.calculate_inversions()
-        if self.num_tiles % 2 != 0:
-            return inversions % 2 == 0
-        else:
-            blank_row = self.num_tiles - self.empty_tile_position[0]
-            if blank_row % 2 == 0:
-                return inversions % 2 != 0
-            else:
-                return inversions % 2 == 0
+        return self.state.is_solvable()
 
     def is_solved(self):
         """
         Check if the puzzle is solved
         :return: True if solved, False otherwise
         """
-        for row in self.tiles:
-            for tile in row:
-                if tile.curr_position == self.empty_tile_position:
-                    continue
-                if tile.init_position != tile.curr_position:
-                    return False
-        return True
+        return self.state.is_solved()
 
     def find_empty_tile_position(self):
         """
         Find the position of the empty tile
         :return: current position of the empty tile
         """
-        for row in self.tiles:
-            for tile in row:
-                if tile.init_position == (self.num_tiles - 1, self.num_tiles - 1):
-                    return tile.curr_position
+        return self.state.to_position(self.state.cells.index(self.state.blank_id))
 
     def clear_board(self):
         """
@@ -333,14 +492,11 @@ class Board:
         """
         for row in self.tiles:
             for tile in row:
-                tile.turtle.ht()
-                tile.turtle = None
+                self.renderer.hide_tile(tile)
 
     def release_click(self):
         """
-        Release all click events
+        Release the click event of the board
         :return: None
         """
-        for row in self.tiles:
-            for tile in row:
-                tile.turtle.onclick(None)
+        self.renderer.bind_click(None)
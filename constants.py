@@ -20,3 +20,24 @@ QUIT_MSG_PATH = 'Resources/quitmsg.gif'
 WIN_MSG_PATH = 'Resources/winner.gif'
 LOSE_MSG_PATH = 'Resources/Lose.gif'
 CREDITS_PATH = 'Resources/credits.gif'
+
+PATTERN_DB_DIR = 'Databases'
+MOVES_FONT = ("Helvetica", 30, "bold")
+FRAME_INTERVAL_MS = 16  # Time between the first change of a frame and its flush
+RENDERER = 'turtle'  # Drawing backend of the tiles, 'turtle' or 'canvas'
+PUZZLE_DIRS = ['.']  # Search directories of the puzzle files and puzzle packs
+PUZZLE_CATALOG_PATH = 'Databases/catalog.json'
+TILE_GAP = 5  # Space between two tiles, in pixels
+TILE_CACHE_DIR = 'Databases/tiles'
+THUMBNAIL_SIZE = 100  # Width of the thumbnails cut from atlases, in pixels
+SHAPE_CACHE_BUDGET = 64 * 1024 * 1024  # Memory budget of the decoded images, in bytes
+HINT_BUDGET_MS = 200
+SOLUTION_CACHE_PATH = 'Databases/solutions.sqlite'
+SOLUTION_CACHE_SIZE = 100000  # Number of states kept in memory
+SCRAMBLE_MIN_DISTANCE = 10  # Scrambles closer to the solved puzzle are redrawn
+SCRAMBLE_DIFFICULTY = None  # Optimal distance of the scrambles taken from the scramble pool, None for uniform scrambles
+SCRAMBLE_POOL_LOW_WATER = 5  # Number of scrambles left under which a bucket of the pool is refilled
+SCRAMBLE_POOL_CAPACITY = 1000  # Maximum number of scrambles per bucket of the pool
+SCRAMBLE_POOL_MAX_STALLS = 10  # Number of refills in a row adding no scramble after which a fill gives up
+SCRAMBLE_POOL_SOLVE_BUDGET_MS = 60000  # Time budget of the solve of a candidate scramble, in milliseconds
+OPTIMAL_SOLVER_MAX_SIZE = 4  # Larger boards are solved by the non-optimal reduction solver
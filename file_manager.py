@@ -1,6 +1,7 @@
-import os
 import datetime
 import inspect
+from atlas import expand_config, source_path
+from puzzle_pack import exists, member_path, read_bytes, split_path
 
 
 class FileManager:
@@ -12,6 +13,7 @@ class FileManager:
     leaderboard_path (str): path to the leaderboard file
     error_log_path (str): path to the error log file
     log_file (str): path to the log file
+    puzzle_catalog (PuzzleCatalog): the puzzle catalog of the board, set by the board
     """
     _instance = None
 
@@ -36,6 +38,9 @@ class FileManager:
             self.error_log_path = error_log_path
             self.log_file = log_file
             self.initialize = True
+        if not hasattr(self, 'puzzle_catalog'):
+            # Kept by the later calls, which reset the other attributes
+            self.puzzle_catalog = None
 
     def log_error(self, message):
         """
@@ -51,27 +56,42 @@ class FileManager:
 
     def load_puzzle_file(self):
         """
-        Load the puzzle file and return the puzzle configuration
+        Load the puzzle file, loose or inside a puzzle pack, and return the puzzle configuration
         :return: the puzzle configuration
         """
+        return self.read_puzzle_config(self.puzzle_file)
+
+    def read_puzzle_config(self, puzzle_file):
+        """
+        Read the configuration of any puzzle file, loose or inside a puzzle pack, the current puzzle is not changed
+        :param puzzle_file: name of the puzzle file
+        :return: the puzzle configuration, empty if the file is missing
+        """
         puzzle_config = {}
         try:
-            with open(f"{self.puzzle_file}", 'r') as file:
-                lines = file.readlines()
-                for line in lines:
-                    if line.strip() == '':
-                        continue
-                    key, value = line.strip().split(': ')
-                    if key.isdigit():
-                        puzzle_config[int(key)] = value.strip()
-                    elif value.isdigit():
-                        puzzle_config[key] = int(value.strip())
-                    else:
-                        puzzle_config[key] = value.strip()
-        except FileNotFoundError as e:
-            self.log_error(f"Puzzle file not found - \"{self.puzzle_file}\" - {e} ")
+            lines = read_bytes(puzzle_file).decode().splitlines()
+            for line in lines:
+                if line.strip() == '':
+                    continue
+                key, value = line.strip().split(': ')
+                if key.isdigit():
+                    puzzle_config[int(key)] = value.strip()
+                elif value.isdigit():
+                    puzzle_config[key] = int(value.strip())
+                else:
+                    puzzle_config[key] = value.strip()
+        except (FileNotFoundError, KeyError) as e:
+            self.log_error(f"Puzzle file not found - \"{puzzle_file}\" - {e} ")
         except ValueError as e:
             self.log_error(f"Value error - {e} ")
+        pack, member = split_path(puzzle_file)
+        if member is not None:
+            # The image paths of a packed puzzle are relative to its pack
+            for key, value in puzzle_config.items():
+                if isinstance(key, int) or key in ('thumbnail', 'atlas', 'blank'):
+                    puzzle_config[key] = member_path(pack, value)
+        if 'atlas' in puzzle_config and 'number' in puzzle_config:
+            expand_config(puzzle_config)
         return puzzle_config
 
     def load_leaderboard_file(self):
@@ -123,7 +143,7 @@ class FileManager:
         prev = self.puzzle_file
         self.puzzle_file = file_name
         puzzle_config = self.load_puzzle_file()
-        if not os.path.isfile(puzzle_config['thumbnail']):
+        if not exists(source_path(puzzle_config['thumbnail'])):
             self.puzzle_file = prev
             self.log_error(f"Malformed puzzle file - \"{file_name}\" "
                            f"Path does not exist - \"{puzzle_config['thumbnail']}\" ")
@@ -131,7 +151,7 @@ class FileManager:
         num_tiles = puzzle_config['number']
         for i in range(1, num_tiles + 1):
             image_path = puzzle_config.get(i)
-            if not os.path.isfile(image_path):
+            if not exists(source_path(image_path)):
                 self.puzzle_file = prev
                 self.log_error(f"Malformed puzzle file - \"{file_name}\" "
                                f"Path does not exist - \"{image_path}\" ")
@@ -140,11 +160,8 @@ class FileManager:
 
     def load_puzzle_catalog(self):
         """
-        Load the puzzle catalog
-        :return: list of puzzle files
+        List the puzzles of the catalog of the board, loose puzzle files and puzzle files inside puzzle packs
+        :return: list of the puzzle files that can be loaded
         """
-        puzzle_catalog = []
-        for file in os.listdir():
-            if file.endswith('.puz'):
-                puzzle_catalog.append(file)
-        return puzzle_catalog
+        self.puzzle_catalog.refresh()
+        return self.puzzle_catalog.valid_names()
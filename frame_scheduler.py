@@ -0,0 +1,148 @@
+import constants
+
+
+class FrameScheduler:
+    """
+    Renderer wrapper collecting the dirty tiles and text fields of an event, then drawing them once per frame
+
+    Drawing a tile or changing a text field only marks it dirty and asks for a frame; the frame is flushed by a
+    screen timer, so rapid clicks never cause more than one screen update per frame. A tile moved several times
+    within a frame is drawn once at its last position, and a text field is rewritten only when its text changed.
+
+    Attributes:
+    renderer (TurtleRenderer): The renderer drawing the tiles and updating the screen
+    screen (turtle.Screen): The screen whose timer flushes the frames
+    interval (int): The time between the first change of a frame and its flush, in milliseconds
+    tiles (dict): The dirty tiles, tile -> (x, y) position of its last draw
+    fields (dict): The text fields, name -> (turtle object writing the field, font)
+    texts (dict): The text shown by every field
+    pending (dict): The new text of the dirty fields
+    scheduled (bool): True if a flush is waiting for the timer
+    frames (int): The number of frames flushed
+    """
+    def __init__(self, renderer, screen, interval=constants.FRAME_INTERVAL_MS):
+        """
+        Constructor of the FrameScheduler class
+        :param renderer: The renderer drawing the tiles and updating the screen
+        :param screen: The screen whose timer flushes the frames
+        :param interval: The time between the first change of a frame and its flush, default is
+        constants.FRAME_INTERVAL_MS
+        """
+        self.renderer = renderer
+        self.screen = screen
+        self.interval = interval
+        self.tiles = {}
+        self.fields = {}
+        self.texts = {}
+        self.pending = {}
+        self.scheduled = False
+        self.frames = 0
+
+    def acquire_images(self, owner, images):
+        """
+        Hold the images of a puzzle while it is loaded
+        :param owner: the puzzle file name
+        :param images: iterable of image file paths
+        :return: None
+        """
+        self.renderer.acquire_images(owner, images)
+
+    def release_images(self, owner):
+        """
+        Drop the images of a puzzle that is not loaded anymore
+        :param owner: the puzzle file name
+        :return: None
+        """
+        self.renderer.release_images(owner)
+
+    def create_sprite(self):
+        """
+        Create the drawing object of a tile
+        :return: the drawing object of the renderer
+        """
+        return self.renderer.create_sprite()
+
+    def draw_tile(self, tile, x, y):
+        """
+        Mark the tile dirty at the given position (x, y), it is drawn by the next frame
+        :param tile: the tile to draw
+        :param x: x-coordinate of the tile
+        :param y: y-coordinate of the tile
+        :return: None
+        """
+        self.tiles[tile] = (x, y)
+
+    def hide_tile(self, tile):
+        """
+        Hide the tile now, a pending draw of the tile is dropped
+        :param tile: the tile to hide
+        :return: None
+        """
+        self.tiles.pop(tile, None)
+        self.renderer.hide_tile(tile)
+
+    def bind_click(self, callback):
+        """
+        Bind the click event of the screen, replacing the previous binding
+        :param callback: function called with the coordinates of the click, None to release the event
+        :return: None
+        """
+        self.renderer.bind_click(callback)
+
+    def update(self):
+        """
+        Ask for a frame, the screen is updated when it is flushed
+        :return: None
+        """
+        self.request()
+
+    def add_field(self, name, sprite, font):
+        """
+        Add a text field, written by its own turtle so that it can be rewritten alone
+        :param name: the name of the field
+        :param sprite: the hidden turtle object writing the field, at the position of the field
+        :param font: the font of the field
+        :return: None
+        """
+        self.fields[name] = (sprite, font)
+        self.texts[name] = None
+
+    def set_text(self, name, text):
+        """
+        Change the text of a field, it is rewritten by the next frame if it differs from the text shown
+        :param name: the name of the field
+        :param text: the new text
+        :return: None
+        """
+        if text == self.texts[name]:
+            self.pending.pop(name, None)
+        else:
+            self.pending[name] = text
+            self.request()
+
+    def request(self):
+        """
+        Schedule a flush, unless one is already waiting
+        :return: None
+        """
+        if not self.scheduled:
+            self.scheduled = True
+            self.screen.ontimer(self.flush, self.interval)
+
+    def flush(self):
+        """
+        Draw the dirty tiles, rewrite the dirty fields, then update the screen once
+        :return: None
+        """
+        self.scheduled = False
+        tiles, self.tiles = self.tiles, {}
+        for tile, (x, y) in tiles.items():
+            self.renderer.draw_tile(tile, x, y)
+        pending, self.pending = self.pending, {}
+        for name, text in pending.items():
+            sprite, font = self.fields[name]
+            sprite.clear()
+            sprite.write(text, font=font)
+            self.texts[name] = text
+        self.renderer.update()
+        self.frames += 1
@@ -1,3 +1,4 @@
+import constants
 from gameUI import GameUI
 
 
@@ -12,15 +13,20 @@ class Game:
     moves (int): The number of moves made.
     game_win (bool): True if the game is won, False otherwise.
     game_over (bool): True if the game is over, False otherwise.
+    assisted (bool): True if the solver played the puzzle, the score is then not recorded.
     """
-    def __init__(self):
-        """Initialize the Game object."""
-        self.game_ui = GameUI()
+    def __init__(self, renderer=constants.RENDERER):
+        """
+        Initialize the Game object.
+        :param renderer: The name of the renderer drawing the tiles, 'turtle' or 'canvas'.
+        """
+        self.game_ui = GameUI(renderer)
         self.player_name = None
         self.moves_left = None
         self.moves = 0
         self.game_win = False
         self.game_over = False
+        self.assisted = False
         self.init_callback()
 
     def init_callback(self):
@@ -30,6 +36,7 @@ class Game:
         """
         self.game_ui.register_ui_callback('players_name', self.update_players_name)
         self.game_ui.register_ui_callback('moves_left', self.update_moves_left)
+        self.game_ui.register_ui_callback('auto_solve', self.on_auto_solve)
         self.game_ui.board.register_move_callback('count_move', self.count_move)
         self.game_ui.board.register_move_callback('check_game_over', self.check_game_over)
         self.game_ui.board.register_move_callback('reset_moves', self.reset_moves)
@@ -49,6 +56,7 @@ class Game:
         """
         self.update_moves_left()
         self.moves = 0
+        self.assisted = False
         self.display_moves()
 
     def reset_solvable(self):
@@ -65,6 +73,13 @@ class Game:
         """
         self.player_name = self.game_ui.player_input
 
+    def on_auto_solve(self):
+        """
+        Callback function when the solver plays the puzzle.
+        :return: None
+        """
+        self.assisted = True
+
     def count_move(self):
         """
         Count the moves made.
@@ -79,17 +94,17 @@ class Game:
         Display the moves made and the moves left.
         :return: None
         """
-        self.game_ui.text.clear()
         self.game_ui.write_moves(self.moves, self.moves_left)
 
     def check_game_over(self):
         """
-        Check if the game is over.
+        Check if the game is over, lost early when fewer moves are left than the distance bound.
         :return: None
         """
         if self.game_ui.board.is_solved():
             self.on_game_win()
-        elif self.moves_left == 0:
+        # The distance bound is admissible: with fewer moves left, the puzzle cannot be solved anymore
+        elif self.moves_left == 0 or self.moves_left < self.game_ui.board.distance_bound:
             self.on_game_over()
 
     def on_game_win(self):
@@ -97,7 +112,8 @@ class Game:
         Callback function when the game is won.
         :return: None
         """
-        self.game_ui.leaderboard.write_leaderboard(self.player_name, self.moves)
+        if not self.assisted:
+            self.game_ui.leaderboard.write_leaderboard(self.player_name, self.moves)
         self.game_ui.win_game(0, 0)
 
     def on_game_over(self):
@@ -1,17 +1,41 @@
+import tkinter.font
 import turtle
 import constants
 from board import Board
+from frame_scheduler import FrameScheduler
+from renderer import create_renderer
 from leaderboard import Leaderboard
+from shape_registry import ShapeRegistry
 from file_manager import FileManager
+from solver_worker import SolverWorker
+from turtle_pool import TurtlePool
 
 
 def create_custom_turtle():
-    """Create a custom turtle object with penup()"""
-    custom_turtle = turtle.Turtle()
-    custom_turtle.penup()
+    """Check a custom turtle object with penup() out of the turtle pool"""
+    custom_turtle = TurtlePool().checkout()
+    custom_turtle.showturtle()
     return custom_turtle
 
 
+def create_text_button(label, x, y):
+    """
+    Create a button turtle drawn as a labelled rectangle
+    :param label: The text of the button
+    :param x: x-coordinate of the center of the button
+    :param y: y-coordinate of the center of the button
+    :return: the button turtle
+    """
+    button = create_custom_turtle()
+    button.shape('square')
+    button.shapesize(stretch_wid=1.4, stretch_len=3.8, outline=2)
+    button.color('black', 'light gray')
+    button.goto(x, y - 10)
+    button.write(label, align='center', font=("Helvetica", 14, "bold"))
+    button.goto(x, y)
+    return button
+
+
 class GameUI:
     """
     Class to manage the game UI
@@ -19,40 +43,53 @@ class GameUI:
     Attributes:
     file_manager (FileManager): The file manager object
     screen (turtle.Screen): The screen object
+    shapes (ShapeRegistry): The registry decoding every image once
+    frames (FrameScheduler): The scheduler drawing the tiles and the moves information once per frame
     leaderboard (Leaderboard): The leaderboard object
     board (Board): The board object
+    solver_worker (SolverWorker): The background process solving the puzzle for the hint and solve buttons
     ui_callbacks (dict): A dictionary of UI callbacks
     player_input (str): The player's name
     moves_input (int): The number of moves the player wants
     drawing_turtle (turtle.Turtle): The turtle object for drawing
-    text (turtle.Turtle): The turtle object for text
     leaderboard_text (turtle.Turtle): The turtle object for leaderboard text
     reset_button (turtle.Turtle): The turtle object for the reset button
     load_button (turtle.Turtle): The turtle object for the load button
     quit_button (turtle.Turtle): The turtle object for the quit button
+    hint_button (turtle.Turtle): The turtle object for the hint button
+    solve_button (turtle.Turtle): The turtle object for the solve button
+    hint_marker (turtle.Turtle): The turtle object outlining the hinted tile
     thumbnail (turtle.Turtle): The turtle object for the thumbnail
     solvable (str): The resolvability of the puzzle
+    solution (list): The positions of the tiles left to click by the solver
     """
-    def __init__(self):
+    def __init__(self, renderer=constants.RENDERER):
         """
         Initialize the GameUI object
+        :param renderer: The name of the renderer drawing the tiles, 'turtle' or 'canvas', default is constants.RENDERER
         """
         turtle.tracer(0)  # Turn off the animation, very important for the game to run smoothly
         self.file_manager = FileManager()
         self.screen = turtle.Screen()
+        self.shapes = ShapeRegistry(self.screen)
         self.leaderboard = Leaderboard()
-        self.board = Board()
+        self.frames = FrameScheduler(create_renderer(renderer), self.screen)
+        self.board = Board(renderer=self.frames)
+        self.solver_worker = SolverWorker(self.screen)
         self.ui_callbacks = {}
         self.player_input = ""
         self.moves_input = 0
         self.drawing_turtle = None
-        self.text = None
         self.leaderboard_text = None
         self.reset_button = None
         self.load_button = None
         self.quit_button = None
+        self.hint_button = None
+        self.solve_button = None
+        self.hint_marker = None
         self.thumbnail = None
         self.solvable = None
+        self.solution = []
         self.show_splash_screen()  # The game starts with a splash screen
 
     def init_callback(self):
@@ -63,11 +100,12 @@ class GameUI:
         self.board.register_move_callback('max_puzzle', self.show_max_puzzle_error)
         self.board.register_move_callback('no_puzzle', self.show_no_puzzle_error)
         self.board.register_move_callback('redraw_thumbnail', self.draw_thumbnail)
+        self.board.register_move_callback('state_changed', self.on_state_changed)
 
     def register_ui_callback(self, event_type, callback):
         """
         Register a UI callback
-        :param event_type: “players_name” or “moves_left”
+        :param event_type: “players_name”, “moves_left” or “auto_solve”
         :param callback: The callback function
         :return: None
         """
@@ -76,7 +114,7 @@ class GameUI:
     def notify_ui_callback(self, event_type):
         """
         Notify the UI callback
-        :param event_type: “players_name” or “moves_left”
+        :param event_type: “players_name”, “moves_left” or “auto_solve”
         :return: None
         """
         self.ui_callbacks[event_type]()
@@ -96,18 +134,7 @@ class GameUI:
         """
         self.screen.bgpic("nopic")
         if self.leaderboard.file_manager.load_leaderboard_file() == {}:
-            error_turtle = create_custom_turtle()
-            self.screen.register_shape(constants.LEADERBOARD_ERROR_PATH)
-            error_turtle.shape(constants.LEADERBOARD_ERROR_PATH)
-            turtle.update()
-
-            def hide_shape():
-                error_turtle.ht()
-                error_turtle.clear()
-                turtle.update()
-                self.startup()
-
-            self.screen.ontimer(hide_shape, 3000)
+            self.show_popup(constants.LEADERBOARD_ERROR_PATH, 3000, self.startup)
         else:
             self.startup()
 
@@ -136,6 +163,7 @@ class GameUI:
         A sequence of functions to start the game
         :return: None
         """
+        self.solver_worker.start()  # Start the worker process while the player fills in the dialogs
         self.show_player_info()
         self.show_moves_info()
         self.set_screen()
@@ -162,11 +190,21 @@ class GameUI:
         self.drawing_turtle = create_custom_turtle()
         self.drawing_turtle.hideturtle()
         self.drawing_turtle.pensize(5)
-        self.text = create_custom_turtle()
+        # One turtle per line of the moves information, so that a line is rewritten alone when it changes
+        line_height = tkinter.font.Font(font=constants.MOVES_FONT).metrics('linespace')
+        for line, name in enumerate(('player', 'moves', 'moves_left', 'status')):
+            field_turtle = create_custom_turtle()
+            field_turtle.ht()
+            field_turtle.goto(-300, -345 + (3 - line) * line_height)
+            self.frames.add_field(name, field_turtle, constants.MOVES_FONT)
         self.leaderboard_text = create_custom_turtle()
         self.reset_button = create_custom_turtle()
         self.load_button = create_custom_turtle()
         self.quit_button = create_custom_turtle()
+        self.hint_marker = create_custom_turtle()
+        self.hint_marker.hideturtle()
+        self.hint_marker.pensize(4)
+        self.hint_marker.color('red')
         self.thumbnail = create_custom_turtle()
 
     def set_ui(self):
@@ -187,20 +225,23 @@ class GameUI:
         :return: None
         """
         self.reset_button.goto(50, -275)
-        self.screen.register_shape(constants.RESET_BUTTON_PATH)
-        self.reset_button.shape(constants.RESET_BUTTON_PATH)
+        self.shapes.apply(self.reset_button, constants.RESET_BUTTON_PATH)
         self.reset_button.onclick(self.board.reset)
 
         self.load_button.goto(150, -275)
-        self.screen.register_shape(constants.LOAD_BUTTON_PATH)
-        self.load_button.shape(constants.LOAD_BUTTON_PATH)
+        self.shapes.apply(self.load_button, constants.LOAD_BUTTON_PATH)
         self.load_button.onclick(self.board.load_new_puzzle)
 
         self.quit_button.goto(250, -275)
-        self.screen.register_shape(constants.QUIT_BUTTON_PATH)
-        self.quit_button.shape(constants.QUIT_BUTTON_PATH)
+        self.shapes.apply(self.quit_button, constants.QUIT_BUTTON_PATH)
         self.quit_button.onclick(self.quit_game)
 
+        self.hint_button = create_text_button('Hint', 100, -333)
+        self.hint_button.onclick(self.show_hint)
+
+        self.solve_button = create_text_button('Solve', 200, -333)
+        self.solve_button.onclick(self.solve_puzzle)
+
         turtle.update()
 
     def draw_board_area(self):
@@ -260,8 +301,7 @@ class GameUI:
         """
         self.thumbnail.goto(280, 330)
         thumbnail_image = self.board.puzzle_config['thumbnail']
-        self.screen.register_shape(thumbnail_image)
-        self.thumbnail.shape(thumbnail_image)
+        self.shapes.apply(self.thumbnail, thumbnail_image)
         turtle.update()
 
     def draw_board(self):
@@ -273,16 +313,16 @@ class GameUI:
 
     def write_moves(self, moves, moves_left):
         """
-        Write the moves information
+        Write the moves information, only the changed lines are rewritten by the next frame
         :param moves:Number of moves made
         :param moves_left: Number of moves left
         :return: None
         """
-        self.text.goto(-300, -345)
-        self.text.ht()
-        self.text.write(f"Current player: {self.player_input}\nPlayer's moves: {moves}\n"
-                        f"Moves left: {moves_left}\nIs it solvable? {self.board.solvable}",
-                        font=("Helvetica", 30, "bold"))
+        self.frames.set_text('player', f"Current player: {self.player_input}")
+        self.frames.set_text('moves', f"Player's moves: {moves}")
+        self.frames.set_text('moves_left', f"Moves left: {moves_left}")
+        self.frames.set_text('status', f"Is it solvable? {self.board.solvable}   "
+                                       f"Distance: {self.board.distance_bound}+")
 
     def write_leaderboard(self):
         """
@@ -299,45 +339,165 @@ class GameUI:
         Show the maximum puzzle error
         :return: None
         """
-        max_error_turtle = create_custom_turtle()
-        max_error_turtle.goto(0, 200)
-        self.screen.register_shape(constants.MAX_PUZZLE_PATH)
-        max_error_turtle.shape(constants.MAX_PUZZLE_PATH)
+        self.show_popup(constants.MAX_PUZZLE_PATH, 2000, position=(0, 200))
+
+    def show_no_puzzle_error(self):
+        """
+        Show the no puzzle error
+        :return: None
+        """
+        self.show_popup(constants.NO_FILE_PATH, 2000)
+
+    def show_popup(self, image, delay, callback=None, position=(0, 0)):
+        """
+        Show an image for a while, on a turtle checked out of the turtle pool and checked back in when it is hidden
+        :param image: the image file path
+        :param delay: the time the image is shown, in milliseconds
+        :param callback: function called once the image is hidden, default is None
+        :param position: the position of the center of the image, default is the center of the screen
+        :return: None
+        """
+        popup_turtle = create_custom_turtle()
+        popup_turtle.goto(position)
+        self.shapes.apply(popup_turtle, image)
         turtle.update()
 
         def hide_shape():
-            max_error_turtle.ht()
-            max_error_turtle.clear()
+            TurtlePool().checkin(popup_turtle)
             turtle.update()
+            if callback is not None:
+                callback()
 
-        self.screen.ontimer(hide_shape, 2000)
+        self.screen.ontimer(hide_shape, delay)
 
-    def show_no_puzzle_error(self):
+    def show_hint(self, x, y):
         """
-        Show the no puzzle error
+        Outline the tile to click next, found within the hint time budget
+        :param x: x-coordinate of the click, unused in this function
+        :param y: y-coordinate of the click, unused in this function
+        :return: None
+        """
+        self.clear_hint()
+        if self.board.num_tiles <= constants.OPTIMAL_SOLVER_MAX_SIZE:
+            entry = self.board.solution_cache.lookup(self.board.state)
+            if entry is not None:
+                if entry[0] > 0:
+                    self.outline_tile(self.board.state.to_position(entry[1]))
+                return
+        self.solver_worker.submit('hint', self.board.state, self.draw_hint, constants.HINT_BUDGET_MS)
+
+    def draw_hint(self, result):
+        """
+        Outline the first tile of the path found by the hint solver
+        :param result: SolveResult of the hint solver, None if the puzzle is not solvable
+        :return: None
+        """
+        if result is None or not result.moves:
+            return
+        self.outline_tile(result.moves[0])
+
+    def outline_tile(self, position):
+        """
+        Outline the tile at a position of the board
+        :param position: position tuple of the tile
         :return: None
         """
-        no_error_turtle = create_custom_turtle()
-        self.screen.register_shape(constants.NO_FILE_PATH)
-        no_error_turtle.shape(constants.NO_FILE_PATH)
+        start_x, start_y = self.board.start_pos()
+        half = self.board.tile_size / 2 - 4
+        center_x = start_x + position[1] * self.board.tile_size
+        center_y = start_y - position[0] * self.board.tile_size
+        self.hint_marker.goto(center_x - half, center_y + half)
+        self.hint_marker.pendown()
+        for _ in range(4):
+            self.hint_marker.forward(2 * half)
+            self.hint_marker.right(90)
+        self.hint_marker.penup()
         turtle.update()
 
-        def hide_shape():
-            no_error_turtle.ht()
-            no_error_turtle.clear()
-            turtle.update()
+    def clear_hint(self):
+        """
+        Clear the outline of the hinted tile
+        :return: None
+        """
+        self.hint_marker.clear()
 
-        self.screen.ontimer(hide_shape, 2000)
+    def on_state_changed(self):
+        """
+        Callback function when the board changed, the running solver job is stale
+        :return: None
+        """
+        self.solver_worker.cancel()
+        self.clear_hint()
+
+    def solve_puzzle(self, x, y):
+        """
+        Let the solver play an optimal solution of the puzzle
+        :param x: x-coordinate of the click, unused in this function
+        :param y: y-coordinate of the click, unused in this function
+        :return: None
+        """
+        if self.solution:
+            return
+        if self.board.num_tiles <= constants.OPTIMAL_SOLVER_MAX_SIZE:
+            path = self.board.solution_cache.solution(self.board.state)
+            if path is not None:
+                self.play_moves([self.board.state.to_position(index) for index in path])
+                return
+        self.solver_worker.submit('solve', self.board.state, self.play_result)
+
+    def play_result(self, result):
+        """
+        Start playing the solution found by the solver
+        :param result: SolveResult of the solver, None if the puzzle is not solvable
+        :return: None
+        """
+        if result is None:
+            return
+        if self.board.num_tiles <= constants.OPTIMAL_SOLVER_MAX_SIZE:
+            state = self.board.state
+            self.board.solution_cache.record(state, [state.to_index(position) for position in result.moves])
+        self.play_moves(result.moves)
+
+    def play_moves(self, moves):
+        """
+        Start playing a solution of the puzzle
+        :param moves: The positions of the tiles to click, in order
+        :return: None
+        """
+        if not moves:
+            return
+        self.notify_ui_callback('auto_solve')
+        self.solution = list(moves)
+        self.play_solution()
+
+    def play_solution(self):
+        """
+        Play the next move of the solution, one move per timer tick
+        :return: None
+        """
+        if not self.solution:
+            return
+        position = self.solution.pop(0)
+        # The player clicked a tile meanwhile, the solution does not apply anymore
+        if position not in self.board.get_legal_moves():
+            self.solution = []
+            return
+        self.board.move_puzzle(position)
+        self.screen.ontimer(self.play_solution, 200)
 
     def release_click(self):
         """
         Release all the clicks
         :return: None
         """
+        self.solution = []
+        self.solver_worker.cancel()
         self.board.release_click()
         self.reset_button.onclick(None)
         self.load_button.onclick(None)
         self.quit_button.onclick(None)
+        self.hint_button.onclick(None)
+        self.solve_button.onclick(None)
 
     def quit_game(self, x, y):
         """
@@ -347,11 +507,7 @@ class GameUI:
         :return: None
         """
         self.release_click()
-        bye_turtle = create_custom_turtle()
-        self.screen.register_shape(constants.QUIT_MSG_PATH)
-        bye_turtle.shape(constants.QUIT_MSG_PATH)
-        turtle.update()
-        self.screen.ontimer(self.show_credit, 3000)
+        self.show_popup(constants.QUIT_MSG_PATH, 3000, self.show_credit)
 
     def win_game(self, x, y):
         """
@@ -361,11 +517,7 @@ class GameUI:
         :return: None
         """
         self.release_click()
-        win_turtle = create_custom_turtle()
-        self.screen.register_shape(constants.WIN_MSG_PATH)
-        win_turtle.shape(constants.WIN_MSG_PATH)
-        turtle.update()
-        self.screen.ontimer(self.show_credit, 3000)
+        self.show_popup(constants.WIN_MSG_PATH, 3000, self.show_credit)
 
     def lose_game(self, x, y):
         """
@@ -375,22 +527,24 @@ class GameUI:
         :return: None
         """
         self.release_click()
-        lose_turtle = create_custom_turtle()
-        self.screen.register_shape(constants.LOSE_MSG_PATH)
-        lose_turtle.shape(constants.LOSE_MSG_PATH)
-        turtle.update()
-        self.screen.ontimer(self.show_credit, 3000)
+        self.show_popup(constants.LOSE_MSG_PATH, 3000, self.show_credit)
 
     def show_credit(self):
         """
         Show the credits
         :return: None
         """
-        credit_turtle = create_custom_turtle()
-        self.screen.register_shape(constants.CREDITS_PATH)
-        credit_turtle.shape(constants.CREDITS_PATH)
-        turtle.update()
-        self.screen.ontimer(turtle.bye, 3000)
+        self.show_popup(constants.CREDITS_PATH, 3000, self.close)
+
+    def close(self):
+        """
+        Stop the solver worker and the scramble pool, close the solution cache and the window
+        :return: None
+        """
+        self.solver_worker.stop()
+        self.board.scramble_pool.close()
+        self.board.solution_cache.close()
+        turtle.bye()
 
     def mainloop(self):
         """mainloop for the game"""
@@ -0,0 +1,149 @@
+from bisect import bisect_left
+from functools import lru_cache
+
+
+def manhattan_table(size):
+    """
+    Get the Manhattan distance of every tile from every linear index, the blank tile counts as 0
+    :param size: number of tiles per line
+    :return: tuple of tuples, table[tile][index]
+    """
+    table = _MANHATTAN_TABLES.get(size)
+    if table is None:
+        blank_id = size * size - 1
+        rows = []
+        for tile in range(size * size):
+            goal_row, goal_col = divmod(tile, size)
+            if tile == blank_id:
+                rows.append((0,) * (size * size))
+            else:
+                rows.append(tuple(abs(goal_row - index // size) + abs(goal_col - index % size)
+                                  for index in range(size * size)))
+        table = tuple(rows)
+        _MANHATTAN_TABLES[size] = table
+    return table
+
+
+_MANHATTAN_TABLES = {}
+LINE_CONFLICT_CACHE_SIZE = 4096  # Goal tuples are at most one line long, the common short ones stay cached
+
+
+@lru_cache(maxsize=LINE_CONFLICT_CACHE_SIZE)
+def line_conflict(goals):
+    """
+    Calculate the linear conflict of a line
+    :param goals: tuple of the goal offsets, along the line, of the tiles in the line that belong to it
+    :return: the extra moves needed by the conflicts
+    """
+    """
+    Tiles of a line that are not in increasing goal order have to leave the line to pass each other,
+    which costs at least 2 moves per tile. The fewest tiles to remove is the line length minus the
+    longest increasing subsequence of the goals.
+    """
+    tails = []
+    for goal in goals:
+        i = bisect_left(tails, goal)
+        if i == len(tails):
+            tails.append(goal)
+        else:
+            tails[i] = goal
+    return 2 * (len(goals) - len(tails))
+
+
+class ManhattanConflict:
+    """
+    Manhattan distance plus linear conflict heuristic, updated incrementally on every slide
+
+    Attributes:
+    size (int): The number of tiles per line
+    table (tuple): The Manhattan distance table of the size
+    manhattan (int): The sum of the Manhattan distances of the tiles
+    row_conflicts (list): The linear conflict of every row
+    col_conflicts (list): The linear conflict of every column
+    conflicts (int): The sum of all the linear conflicts
+    value (int): The admissible estimate of the moves left, manhattan + conflicts
+    """
+    def __init__(self, size, cells):
+        """
+        Constructor of the ManhattanConflict class
+        :param size: The number of tiles per line
+        :param cells: The tile ids in linear order
+        """
+        self.size = size
+        self.table = manhattan_table(size)
+        self.manhattan = sum(self.table[tile][index] for index, tile in enumerate(cells))
+        self.row_conflicts = [self.row_conflict(cells, row) for row in range(size)]
+        self.col_conflicts = [self.col_conflict(cells, col) for col in range(size)]
+        self.conflicts = sum(self.row_conflicts) + sum(self.col_conflicts)
+        self.value = self.manhattan + self.conflicts
+
+    def row_conflict(self, cells, row):
+        """
+        Calculate the linear conflict of a row
+        :param cells: The tile ids in linear order
+        :param row: The row index
+        :return: the linear conflict of the row
+        """
+        size = self.size
+        blank_id = size * size - 1
+        return line_conflict(tuple(tile % size for tile in cells[row * size:(row + 1) * size]
+                                   if tile != blank_id and tile // size == row))
+
+    def col_conflict(self, cells, col):
+        """
+        Calculate the linear conflict of a column
+        :param cells: The tile ids in linear order
+        :param col: The column index
+        :return: the linear conflict of the column
+        """
+        size = self.size
+        blank_id = size * size - 1
+        return line_conflict(tuple(tile // size for tile in cells[col::size]
+                                   if tile != blank_id and tile % size == col))
+
+    def slide(self, cells, src, dst):
+        """
+        Update the heuristic after a tile slid from src into the blank at dst
+        :param cells: The tile ids in linear order, already updated
+        :param src: The previous linear index of the tile, now the blank
+        :param dst: The new linear index of the tile
+        :return: the new value of the heuristic
+        """
+        size = self.size
+        distances = self.table[cells[dst]]
+        self.manhattan += distances[dst] - distances[src]
+        # Only the two lines crossed by the tile can change their conflicts
+        if src - dst == 1 or dst - src == 1:
+            conflicts, compute = self.col_conflicts, self.col_conflict
+            first, second = src % size, dst % size
+        else:
+            conflicts, compute = self.row_conflicts, self.row_conflict
+            first, second = src // size, dst // size
+        old = conflicts[first] + conflicts[second]
+        first_conflict = compute(cells, first)
+        second_conflict = compute(cells, second)
+        conflicts[first] = first_conflict
+        conflicts[second] = second_conflict
+        self.conflicts += first_conflict + second_conflict - old
+        self.value = self.manhattan + self.conflicts
+        return self.value
+
+    def slide_value(self, cells, child, src, dst, value):
+        """
+        Calculate the value of the heuristic after a slide, without updating the heuristic
+        :param cells: The tile ids in linear order, before the slide
+        :param child: The tile ids in linear order, after the slide
+        :param src: The previous linear index of the tile
+        :param dst: The new linear index of the tile
+        :param value: The value of the heuristic before the slide
+        :return: the value of the heuristic after the slide
+        """
+        size = self.size
+        distances = self.table[child[dst]]
+        value += distances[dst] - distances[src]
+        if src - dst == 1 or dst - src == 1:
+            compute, first, second = self.col_conflict, src % size, dst % size
+        else:
+            compute, first, second = self.row_conflict, src // size, dst // size
+        return (value + compute(child, first) + compute(child, second)
+                - compute(cells, first) - compute(cells, second))
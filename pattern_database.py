@@ -0,0 +1,390 @@
+"""
+Disjoint additive pattern databases, built with a parallel backward BFS and loaded with mmap.
+
+Build the default tables of a size with: python pattern_database.py 4
+"""
+import math
+import mmap
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import constants
+from heuristic import manhattan_table
+from puzzle_state import neighbor_table
+
+MAGIC = b'PDB1'
+HEADER = struct.Struct('<4sBB')
+MAX_STORED = 15  # Largest value of a nibble
+CHUNK_SIZE = 4096  # Number of states expanded per worker task
+
+"""
+Default partitions of the tiles, by puzzle size. Tiles are identified by their linear index in the solved
+puzzle and the blank is the last cell. The 3x3 table holds every tile, so it is exact up to the nibble cap.
+The 4x4 partition is the classic 6-6-3 one, mirrored for a blank in the bottom right corner.
+"""
+PARTITIONS = {
+    2: ((0, 1, 2),),
+    3: ((0, 1, 2, 3, 4, 5, 6, 7),),
+    4: ((2, 5, 6, 9, 10, 14), (0, 1, 3, 4, 7, 8), (11, 12, 13)),
+}
+
+
+def rank_placement(positions, num_cells):
+    """
+    Rank the positions of the tiles of a pattern among all the placements of the pattern
+    :param positions: the linear index of every tile of the pattern, in pattern order
+    :param num_cells: the number of cells of the board
+    :return: the rank, in range(num_cells! / (num_cells - len(positions))!)
+    """
+    rank = 0
+    used = 0
+    for i, position in enumerate(positions):
+        # Skip the cells already taken by the previous tiles of the pattern
+        rank = rank * (num_cells - i) + position - (used & ((1 << position) - 1)).bit_count()
+        used |= 1 << position
+    return rank
+
+
+def count_placements(num_tiles, num_cells):
+    """
+    Count the placements of a pattern
+    :param num_tiles: the number of tiles of the pattern
+    :param num_cells: the number of cells of the board
+    :return: num_cells! / (num_cells - num_tiles)!
+    """
+    return math.perm(num_cells, num_tiles)
+
+
+def database_path(size, tiles, directory=constants.PATTERN_DB_DIR):
+    """
+    Get the file path of the table of a pattern
+    :param size: the number of tiles per line
+    :param tiles: the tile ids of the pattern
+    :param directory: the directory of the tables
+    :return: file path
+    """
+    return os.path.join(directory, f"{size}x{size}-{'-'.join(str(tile) for tile in tiles)}.pdb")
+
+
+def _blank_region(empty, occupied, neighbors):
+    """
+    Find the cells the blank can reach without moving a pattern tile
+    :param empty: a cell of the region
+    :param occupied: bit mask of the cells of the pattern tiles
+    :param neighbors: the neighbor table of the board
+    :return: bit mask of the region
+    """
+    region = 1 << empty
+    stack = [empty]
+    while stack:
+        cell = stack.pop()
+        for neighbor in neighbors[cell]:
+            bit = 1 << neighbor
+            if not (region | occupied) & bit:
+                region |= bit
+                stack.append(neighbor)
+    return region
+
+
+def _lowest_cell(mask):
+    """Index of the lowest set bit of a mask"""
+    return (mask & -mask).bit_length() - 1
+
+
+def _expand_chunk(task):
+    """
+    Expand a chunk of the BFS frontier, run in the worker processes
+    :param task: tuple (size, chunk), the chunk is a list of (positions, region cell)
+    :return: list of (positions, region cell) of the children, one pattern move away
+    """
+    size, chunk = task
+    neighbors = neighbor_table(size)
+    children = []
+    for positions, empty in chunk:
+        occupied = 0
+        for position in positions:
+            occupied |= 1 << position
+        region = _blank_region(empty, occupied, neighbors)
+        for i, position in enumerate(positions):
+            for neighbor in neighbors[position]:
+                if region & (1 << neighbor):
+                    # Slide the tile into the blank region, its old cell becomes empty
+                    child = positions[:i] + (neighbor,) + positions[i + 1:]
+                    child_occupied = occupied ^ (1 << position) ^ (1 << neighbor)
+                    child_region = _blank_region(position, child_occupied, neighbors)
+                    children.append((child, _lowest_cell(child_region)))
+    return children
+
+
+def build_pattern(size, tiles, workers=None):
+    """
+    Compute the distances of a pattern with a backward BFS from the solved puzzle
+    :param size: the number of tiles per line
+    :param tiles: the tile ids of the pattern
+    :param workers: the number of worker processes, default is the number of CPUs
+    :return: bytearray of the values stored per placement rank, (distance - manhattan) / 2 capped to 15
+    """
+    """
+    Only the moves of the pattern tiles count, so every blank position reachable without moving a pattern
+    tile is the same state. A state is then a placement plus the lowest cell of the blank region, and the
+    first level at which a placement is reached is its distance.
+    """
+    num_cells = size * size
+    table = manhattan_table(size)
+    placements = count_placements(len(tiles), num_cells)
+    unseen = 0xFF
+    stored = bytearray([unseen]) * placements
+    visited = bytearray(placements * num_cells)
+    neighbors = neighbor_table(size)
+
+    goal = tuple(tiles)
+    occupied = 0
+    for position in goal:
+        occupied |= 1 << position
+    empty = _lowest_cell(_blank_region(num_cells - 1, occupied, neighbors))
+    stored[rank_placement(goal, num_cells)] = 0
+    visited[rank_placement(goal, num_cells) * num_cells + empty] = 1
+    frontier = [(goal, empty)]
+    distance = 0
+
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        while frontier:
+            distance += 1
+            tasks = [(size, frontier[i:i + CHUNK_SIZE]) for i in range(0, len(frontier), CHUNK_SIZE)]
+            results = pool.map(_expand_chunk, tasks) if pool is not None else map(_expand_chunk, tasks)
+            frontier = []
+            for children in results:
+                for positions, empty in children:
+                    rank = rank_placement(positions, num_cells)
+                    key = rank * num_cells + empty
+                    if visited[key]:
+                        continue
+                    visited[key] = 1
+                    frontier.append((positions, empty))
+                    if stored[rank] == unseen:
+                        manhattan = sum(table[tile][position] for tile, position in zip(tiles, positions))
+                        stored[rank] = min((distance - manhattan) // 2, MAX_STORED)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return stored
+
+
+def write_pattern(path, size, tiles, stored):
+    """
+    Write the values of a pattern to disk, two values per byte
+    :param path: the file path
+    :param size: the number of tiles per line
+    :param tiles: the tile ids of the pattern
+    :param stored: the values per placement rank, as returned by build_pattern
+    :return: None
+    """
+    packed = bytearray((len(stored) + 1) // 2)
+    for rank, value in enumerate(stored):
+        if value > MAX_STORED:
+            value = 0  # Unreachable placement, never looked up by a solvable search
+        packed[rank >> 1] |= value << ((rank & 1) << 2)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file first, a solver process may be reading the old table
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, size, len(tiles)))
+        file.write(bytes(tiles))
+        file.write(packed)
+    os.replace(temp_path, path)
+
+
+def build_partition(size, partition=None, directory=constants.PATTERN_DB_DIR, workers=None):
+    """
+    Build and write the tables of every pattern of a partition
+    :param size: the number of tiles per line
+    :param partition: tuple of patterns, default is PARTITIONS[size]
+    :param directory: the directory of the tables
+    :param workers: the number of worker processes, default is the number of CPUs
+    :return: list of the written file paths
+    """
+    paths = []
+    for tiles in partition or PARTITIONS[size]:
+        path = database_path(size, tiles, directory)
+        write_pattern(path, size, tiles, build_pattern(size, tiles, workers))
+        paths.append(path)
+    return paths
+
+
+class PatternDatabase:
+    """
+    Read-only table of a pattern, memory-mapped so that every process shares the same pages
+
+    Attributes:
+    size (int): The number of tiles per line
+    tiles (tuple): The tile ids of the pattern
+    num_cells (int): The number of cells of the board
+    offset (int): The offset of the packed values in the file
+    table (mmap): The memory-mapped file
+    """
+    def __init__(self, path):
+        """
+        Constructor of the PatternDatabase class
+        :param path: the file path of the table
+        """
+        with open(path, 'rb') as file:
+            self.table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size, num_tiles = HEADER.unpack_from(self.table)
+        if magic != MAGIC:
+            raise ValueError(f"Not a pattern database - \"{path}\"")
+        self.tiles = tuple(self.table[HEADER.size:HEADER.size + num_tiles])
+        self.num_cells = self.size * self.size
+        self.offset = HEADER.size + num_tiles
+
+    def stored(self, positions):
+        """
+        Look up the stored value of a placement
+        :param positions: the linear index of every tile of the pattern, in pattern order
+        :return: (distance - manhattan) / 2, capped to 15
+        """
+        rank = rank_placement(positions, self.num_cells)
+        return (self.table[self.offset + (rank >> 1)] >> ((rank & 1) << 2)) & 0xF
+
+    def close(self):
+        """
+        Unmap the file
+        :return: None
+        """
+        self.table.close()
+
+
+def load_partition(size, partition=None, directory=constants.PATTERN_DB_DIR):
+    """
+    Load the tables of every pattern of a partition, cached per process
+    :param size: the number of tiles per line
+    :param partition: tuple of patterns, default is PARTITIONS[size]
+    :param directory: the directory of the tables
+    :return: list of PatternDatabase, None if a table is missing
+    """
+    partition = partition or PARTITIONS.get(size)
+    if partition is None:
+        return None
+    paths = tuple(database_path(size, tiles, directory) for tiles in partition)
+    if paths not in _LOADED:
+        if all(os.path.isfile(path) for path in paths):
+            _LOADED[paths] = [PatternDatabase(path) for path in paths]
+        else:
+            return None
+    return _LOADED[paths]
+
+
+_LOADED = {}
+
+
+class PatternDatabaseHeuristic:
+    """
+    Additive pattern database heuristic, updated incrementally on every slide, same interface as ManhattanConflict
+
+    Attributes:
+    size (int): The number of tiles per line
+    table (tuple): The Manhattan distance table of the size
+    databases (list): The PatternDatabase of every pattern of the partition
+    group_of (list): The index of the pattern of every tile, None for the tiles of no pattern
+    positions (list): The linear index of every tile
+    manhattan (list): The Manhattan distance of every pattern
+    values (list): The value of every pattern, manhattan + 2 * stored
+    value (int): The admissible estimate of the moves left, the sum of the values
+    """
+    def __init__(self, size, cells, databases=None):
+        """
+        Constructor of the PatternDatabaseHeuristic class
+        :param size: The number of tiles per line
+        :param cells: The tile ids in linear order
+        :param databases: list of PatternDatabase, default is the loaded default partition of the size
+        """
+        self.size = size
+        self.table = manhattan_table(size)
+        self.databases = databases if databases is not None else load_partition(size)
+        if self.databases is None:
+            raise FileNotFoundError(f"No pattern database for {size}x{size} in \"{constants.PATTERN_DB_DIR}\"")
+        self.group_of = [None] * (size * size)
+        for group, database in enumerate(self.databases):
+            for tile in database.tiles:
+                self.group_of[tile] = group
+        self.positions = [0] * (size * size)
+        for index, tile in enumerate(cells):
+            self.positions[tile] = index
+        self.manhattan = [sum(self.table[tile][self.positions[tile]] for tile in database.tiles)
+                          for database in self.databases]
+        self.values = [self.group_value(group) for group in range(len(self.databases))]
+        self.value = sum(self.values)
+
+    def group_value(self, group):
+        """
+        Calculate the value of a pattern from the current positions
+        :param group: The index of the pattern
+        :return: the value of the pattern
+        """
+        database = self.databases[group]
+        positions = self.positions
+        return self.manhattan[group] + 2 * database.stored([positions[tile] for tile in database.tiles])
+
+    def cells_group_value(self, group, cells):
+        """
+        Calculate the value of a pattern from the given cells instead of the current positions
+        :param group: The index of the pattern
+        :param cells: The tile ids in linear order
+        :return: the value of the pattern
+        """
+        database = self.databases[group]
+        positions = [cells.index(tile) for tile in database.tiles]
+        manhattan = sum(self.table[tile][position] for tile, position in zip(database.tiles, positions))
+        return manhattan + 2 * database.stored(positions)
+
+    def slide_value(self, cells, child, src, dst, value):
+        """
+        Calculate the value of the heuristic after a slide, without updating the heuristic
+        :param cells: The tile ids in linear order, before the slide
+        :param child: The tile ids in linear order, after the slide
+        :param src: The previous linear index of the tile
+        :param dst: The new linear index of the tile
+        :param value: The value of the heuristic before the slide
+        :return: the value of the heuristic after the slide
+        """
+        group = self.group_of[child[dst]]
+        if group is None:
+            return value
+        return value - self.cells_group_value(group, cells) + self.cells_group_value(group, child)
+
+    def slide(self, cells, src, dst):
+        """
+        Update the heuristic after a tile slid from src into the blank at dst
+        :param cells: The tile ids in linear order, already updated
+        :param src: The previous linear index of the tile, now the blank
+        :param dst: The new linear index of the tile
+        :return: the new value of the heuristic
+        """
+        tile = cells[dst]
+        self.positions[tile] = dst
+        group = self.group_of[tile]
+        if group is not None:
+            distances = self.table[tile]
+            self.manhattan[group] += distances[dst] - distances[src]
+            value = self.group_value(group)
+            self.value += value - self.values[group]
+            self.values[group] = value
+        return self.value
+
+
+def main():
+    """
+    Build the default tables of the sizes given on the command line
+    :return: None
+    """
+    for size in [int(arg) for arg in sys.argv[1:]] or sorted(PARTITIONS):
+        for path in build_partition(size):
+            print(f"Built {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Persistent index of the puzzles of the search directories, a puzzle file is parsed again only when it changed.
+"""
+import json
+import os
+import constants
+from atlas import source_path
+from puzzle_pack import PACK_EXTENSION, exists, open_pack
+
+CATALOG_VERSION = 1
+
+
+class PuzzleCatalog:
+    """
+    Index of the puzzle files and puzzle packs of the search directories, with the metadata of every puzzle
+
+    A refresh lists the directories with os.scandir, whose entries carry their modification time and size; only the
+    files whose stamp changed are parsed again, and the index is written back to the disk only when it changed.
+    Lookups are dict lookups.
+
+    Attributes:
+    file_manager (FileManager): The file manager reading the puzzle files
+    directories (list): The search directories
+    path (str): The file path of the index
+    files (dict): The indexed files, file path -> {'stamp': [mtime in ns, size], 'puzzles': {puzzle file -> entry}}
+    entries (dict): The metadata of every puzzle, puzzle file -> entry with the keys 'name', 'number', 'size',
+    'thumbnail' and 'valid'
+    """
+    def __init__(self, file_manager, directories=constants.PUZZLE_DIRS, path=constants.PUZZLE_CATALOG_PATH):
+        """
+        Constructor of the PuzzleCatalog class, the index is read from the disk
+        :param file_manager: The file manager reading the puzzle files
+        :param directories: The search directories, default is constants.PUZZLE_DIRS
+        :param path: The file path of the index, default is constants.PUZZLE_CATALOG_PATH
+        """
+        self.file_manager = file_manager
+        self.directories = directories
+        self.path = path
+        self.files = {}
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        """
+        Read the index from the disk, a missing or outdated index is ignored
+        :return: None
+        """
+        try:
+            with open(self.path) as file:
+                index = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return
+        if index.get('version') == CATALOG_VERSION and index.get('directories') == list(self.directories):
+            self.files = index['files']
+            self.update_entries()
+
+    def save(self):
+        """
+        Write the index to the disk
+        :return: None
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first, another game may read the index meanwhile
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({'version': CATALOG_VERSION, 'directories': list(self.directories), 'files': self.files}, file)
+        os.replace(temp_path, self.path)
+
+    def update_entries(self):
+        """
+        Rebuild the puzzle lookup table from the indexed files, in the order of the directories then the file names
+        :return: None
+        """
+        self.entries = {puzzle_file: entry for path in self.files
+                        for puzzle_file, entry in self.files[path]['puzzles'].items()}
+
+    def refresh(self):
+        """
+        Update the index with the files added, changed or removed since the last refresh
+        :return: True if the index changed, False otherwise
+        """
+        files = {}
+        changed = False
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as scan:
+                    found = sorted((item for item in scan if item.name.endswith(('.puz', PACK_EXTENSION))),
+                                   key=lambda item: item.name)
+            except FileNotFoundError:
+                continue
+            for item in found:
+                if not item.is_file():
+                    continue
+                path = item.name if directory == '.' else os.path.join(directory, item.name)
+                stat = item.stat()
+                stamp = [stat.st_mtime_ns, stat.st_size]
+                indexed = self.files.get(path)
+                if indexed is None or indexed['stamp'] != stamp:
+                    indexed = {'stamp': stamp, 'puzzles': self.index_file(path)}
+                    changed = True
+                files[path] = indexed
+        changed = changed or list(files) != list(self.files)
+        self.files = files
+        self.update_entries()
+        if changed:
+            self.save()
+        return changed
+
+    def index_file(self, path):
+        """
+        Read the metadata of the puzzles of a file
+        :param path: the path of a puzzle file or a puzzle pack
+        :return: dict, puzzle file -> entry
+        """
+        puzzle_files = open_pack(path).puzzles() if path.endswith(PACK_EXTENSION) else [path]
+        return {puzzle_file: self.describe(puzzle_file) for puzzle_file in puzzle_files}
+
+    def describe(self, puzzle_file):
+        """
+        Read the metadata of a puzzle, it is valid when its thumbnail and the images of its tiles exist
+        :param puzzle_file: name of the puzzle file
+        :return: dict with the keys 'name', 'number', 'size', 'thumbnail' and 'valid'
+        """
+        puzzle_config = self.file_manager.read_puzzle_config(puzzle_file)
+        number = puzzle_config.get('number')
+        images = [puzzle_config.get('thumbnail')]
+        if isinstance(number, int):
+            images += [puzzle_config.get(i) for i in range(1, number + 1)]
+        valid = isinstance(number, int) and all(image is not None and exists(source_path(image)) for image in images)
+        return {'name': puzzle_config.get('name'), 'number': number, 'size': puzzle_config.get('size'),
+                'thumbnail': puzzle_config.get('thumbnail'), 'valid': valid}
+
+    def lookup(self, puzzle_file):
+        """
+        Get the metadata of a puzzle
+        :param puzzle_file: name of the puzzle file
+        :return: dict, see describe, None if the puzzle is not in the catalog
+        """
+        return self.entries.get(puzzle_file)
+
+    def names(self):
+        """
+        List the puzzle files of the catalog
+        :return: list of puzzle files
+        """
+        return list(self.entries)
+
+    def is_valid(self, puzzle_file):
+        """
+        Check if a puzzle is in the catalog and can be loaded
+        :param puzzle_file: name of the puzzle file
+        :return: True if the puzzle is in the catalog and valid, False otherwise
+        """
+        entry = self.entries.get(puzzle_file)
+        return entry is not None and entry['valid']
+
+    def valid_names(self):
+        """
+        List the puzzle files of the catalog that can be loaded
+        :return: list of puzzle files
+        """
+        return [puzzle_file for puzzle_file, entry in self.entries.items() if entry['valid']]
+
+    def __contains__(self, puzzle_file):
+        return puzzle_file in self.entries
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,12 +1,14 @@
+import sys
+import constants
 from game import Game
 
 
 def main():
     """
-    main function to run the game
+    main function to run the game, the renderer can be chosen on the command line: python puzzle_game.py canvas
     :return: None
     """
-    game = Game()
+    game = Game(sys.argv[1] if len(sys.argv) > 1 else constants.RENDERER)
     game.game_ui.mainloop()
 
 
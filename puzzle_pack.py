@@ -0,0 +1,184 @@
+"""
+Puzzle packs: one zip file holding the puzzle files of many puzzles and their images, read through a single open.
+
+A file inside a pack is named "<pack path>!<member>", such as "classics.pzp!mario.puz". The image paths of a packed
+puzzle file are relative to the pack. The index of a pack is its zip central directory, read once when the pack is
+opened; the pack file stays open, and images are given to Tk from bytes, without temporary files.
+
+Build a pack with: python puzzle_pack.py classics.pzp mario.puz luigi.puz
+"""
+import os
+import sys
+import tkinter
+import zipfile
+
+PACK_EXTENSION = '.pzp'
+SEPARATOR = '!'
+
+
+def split_path(path):
+    """
+    Split a path into the pack and the member it names
+    :param path: a file path, or a "<pack path>!<member>" name
+    :return: tuple (pack path, member), member is None for a file path
+    """
+    pack, separator, member = path.partition(SEPARATOR)
+    if not separator or not pack.endswith(PACK_EXTENSION):
+        return path, None
+    return pack, member
+
+
+def member_path(pack, member):
+    """
+    Get the name of a file inside a pack
+    :param pack: the pack path
+    :param member: the path of the file inside the pack
+    :return: the "<pack path>!<member>" name
+    """
+    return f"{pack}{SEPARATOR}{member}"
+
+
+class PuzzlePack:
+    """
+    An opened puzzle pack, its file is opened once and its index is kept in memory
+
+    Attributes:
+    path (str): The pack path
+    mtime (int): The modification time of the pack when it was opened, in nanoseconds
+    file (file object): The open pack file
+    archive (zipfile.ZipFile): The zip archive read from the open file
+    members (set): The paths of the files inside the pack
+    """
+    def __init__(self, path):
+        """
+        Constructor of the PuzzlePack class, opens the pack
+        :param path: The pack path
+        """
+        self.path = path
+        self.mtime = os.stat(path).st_mtime_ns
+        self.file = open(path, 'rb')
+        self.archive = zipfile.ZipFile(self.file)
+        self.members = set(self.archive.namelist())
+
+    def puzzles(self):
+        """
+        List the puzzle files of the pack
+        :return: list of the "<pack path>!<member>" names of the puzzle files
+        """
+        return sorted(member_path(self.path, member) for member in self.members if member.endswith('.puz'))
+
+    def read(self, member):
+        """
+        Read a file of the pack
+        :param member: the path of the file inside the pack
+        :return: bytes
+        """
+        return self.archive.read(member)
+
+    def close(self):
+        """
+        Close the pack
+        :return: None
+        """
+        self.archive.close()
+        self.file.close()
+
+
+_packs = {}
+
+
+def open_pack(path):
+    """
+    Get the opened pack of a path, the pack is reopened if its file changed
+    :param path: the pack path
+    :return: PuzzlePack
+    """
+    pack = _packs.get(path)
+    if pack is not None and pack.mtime != os.stat(path).st_mtime_ns:
+        pack.close()
+        pack = None
+    if pack is None:
+        pack = _packs[path] = PuzzlePack(path)
+    return pack
+
+
+def exists(path):
+    """
+    Check if a file exists, loose or inside a pack
+    :param path: a file path, or a "<pack path>!<member>" name
+    :return: True if the file exists, False otherwise
+    """
+    pack, member = split_path(path)
+    if member is None:
+        return os.path.isfile(path)
+    return os.path.isfile(pack) and member in open_pack(pack).members
+
+
+def read_bytes(path):
+    """
+    Read a file, loose or inside a pack
+    :param path: a file path, or a "<pack path>!<member>" name
+    :return: bytes
+    """
+    pack, member = split_path(path)
+    if member is None:
+        with open(path, 'rb') as file:
+            return file.read()
+    return open_pack(pack).read(member)
+
+
+def load_photo(path):
+    """
+    Decode an image, loose or inside a pack, a Tk interpreter must exist
+    :param path: a file path, or a "<pack path>!<member>" name
+    :return: tkinter.PhotoImage
+    """
+    if split_path(path)[1] is None:
+        return tkinter.PhotoImage(file=path)
+    return tkinter.PhotoImage(data=read_bytes(path))
+
+
+def list_puzzles(directory='.'):
+    """
+    List the puzzle files inside the packs of a directory
+    :param directory: the directory of the packs
+    :return: list of the "<pack path>!<member>" names of the puzzle files
+    """
+    puzzles = []
+    for file in sorted(os.listdir(directory)):
+        if file.endswith(PACK_EXTENSION):
+            path = file if directory == '.' else os.path.join(directory, file)
+            puzzles.extend(open_pack(path).puzzles())
+    return puzzles
+
+
+def write_pack(path, puzzle_files):
+    """
+    Write a pack holding puzzle files and every image they reference, the images are stored as they are
+    :param path: the pack path
+    :param puzzle_files: the paths of the loose puzzle files
+    :return: None
+    """
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as archive:
+        written = set()
+        for puzzle_file in puzzle_files:
+            archive.write(puzzle_file, os.path.basename(puzzle_file))
+            with open(puzzle_file) as file:
+                for line in file:
+                    key, _, value = line.strip().partition(': ')
+                    if (key.isdigit() or key in ('thumbnail', 'atlas', 'blank')) and value not in written:
+                        archive.write(value, value)
+                        written.add(value)
+
+
+def main():
+    """
+    Write the pack given on the command line: python puzzle_pack.py pack puzzle_file...
+    :return: None
+    """
+    write_pack(sys.argv[1], sys.argv[2:])
+    print(f"Wrote {sys.argv[1]}")
+
+
+if __name__ == "__main__":
+    main()
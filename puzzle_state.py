@@ -0,0 +1,228 @@
+from array import array
+from zobrist import zobrist_hash, zobrist_table
+
+
+def neighbor_table(size):
+    """
+    Get the linear indices adjacent to every cell of a board
+    :param size: number of tiles per line
+    :return: tuple of tuples, the neighbors of each linear index
+    """
+    table = _NEIGHBOR_TABLES.get(size)
+    if table is None:
+        rows = []
+        for index in range(size * size):
+            row, col = divmod(index, size)
+            neighbors = []
+            # Same order as Board.get_legal_moves: up, down, left, right
+            if row > 0:
+                neighbors.append(index - size)
+            if row < size - 1:
+                neighbors.append(index + size)
+            if col > 0:
+                neighbors.append(index - 1)
+            if col < size - 1:
+                neighbors.append(index + 1)
+            rows.append(tuple(neighbors))
+        table = tuple(rows)
+        _NEIGHBOR_TABLES[size] = table
+    return table
+
+
+_NEIGHBOR_TABLES = {}
+
+
+class PuzzleState:
+    """
+    Headless state of a sliding puzzle, owning all the rules of the game
+
+    Tiles are identified by their linear index in the solved puzzle, so the blank tile
+    (always the last one of a puzzle file) has the id size * size - 1.
+
+    Attributes:
+    size (int): The number of tiles per line
+    cells (array): The flat permutation, cells[i] is the id of the tile at linear index i
+    blank (int): The linear index of the blank tile
+    neighbors (tuple): The precomputed neighbors of every linear index
+    zobrist_keys (tuple): The Zobrist keys of the size, see zobrist.zobrist_table
+    zobrist (int): The 64-bit Zobrist hash of cells, updated on every swap
+    misplaced (int): The number of cells not holding their own tile, updated on every swap
+    parity (int): The parity of the number of inversions, updated on every swap
+    """
+    def __init__(self, size, cells=None, blank=None):
+        """
+        Constructor of the PuzzleState class
+        :param size: The number of tiles per line
+        :param cells: Iterable of tile ids in linear order, default is the solved puzzle
+        :param blank: The linear index of the blank tile, found from cells if not given
+        """
+        self.size = size
+        if cells is None:
+            cells = range(size * size)
+        self.cells = array('H', cells)
+        if len(self.cells) != size * size:
+            raise ValueError(f"Expected {size * size} cells, got {len(self.cells)}")
+        self.blank = self.cells.index(self.blank_id) if blank is None else blank
+        self.neighbors = neighbor_table(size)
+        self.zobrist_keys = zobrist_table(size)
+        self.zobrist = zobrist_hash(self.cells, size)
+        self.misplaced = self.count_misplaced()
+        self.parity = self.calculate_inversions() % 2
+
+    @classmethod
+    def from_tiles(cls, tiles):
+        """
+        Build a state from a 2D list of tiles, e.g. Board.tiles
+        :param tiles: 2D list of objects with an init_position attribute
+        :return: a new PuzzleState
+        """
+        size = len(tiles)
+        return cls(size, [tile.init_position[0] * size + tile.init_position[1] for row in tiles for tile in row])
+
+    @property
+    def blank_id(self):
+        """The id of the blank tile"""
+        return self.size * self.size - 1
+
+    def copy(self):
+        """
+        Copy the state
+        :return: a new PuzzleState
+        """
+        return PuzzleState(self.size, self.cells, self.blank)
+
+    def key(self):
+        """
+        Get a hashable snapshot of the state
+        :return: tuple of tile ids in linear order
+        """
+        return tuple(self.cells)
+
+    def to_position(self, index):
+        """
+        Convert a linear index to a (row, col) position
+        :param index: linear index
+        :return: position tuple
+        """
+        return divmod(index, self.size)
+
+    def to_index(self, position):
+        """
+        Convert a (row, col) position to a linear index
+        :param position: position tuple
+        :return: linear index
+        """
+        return position[0] * self.size + position[1]
+
+    def reset(self):
+        """
+        Put every tile back in its initial position
+        :return: None
+        """
+        self.cells = array('H', range(self.size * self.size))
+        self.blank = self.blank_id
+        self.zobrist = zobrist_hash(self.cells, self.size)
+        self.misplaced = 0
+        self.parity = 0
+
+    def legal_moves(self):
+        """
+        Get the linear indices of the tiles that can slide into the blank
+        :return: tuple of linear indices
+        """
+        return self.neighbors[self.blank]
+
+    def swap(self, i, j):
+        """
+        Swap the tiles at two linear indices, without any rule check. The blank index is not updated.
+        :param i: linear index of the first tile
+        :param j: linear index of the second tile
+        :return: None
+        """
+        cells = self.cells
+        first, second = cells[i], cells[j]
+        cells[i], cells[j] = second, first
+        keys = self.zobrist_keys
+        self.zobrist ^= keys[first][i] ^ keys[first][j] ^ keys[second][j] ^ keys[second][i]
+        # Only the two touched cells can change their misplaced status
+        self.misplaced += (second != i) + (first != j) - (first != i) - (second != j)
+        blank_id = len(cells) - 1
+        if i == j:
+            return
+        if first != blank_id and second != blank_id:
+            self.parity ^= 1  # A transposition of two tiles flips the parity
+        else:
+            # The tile jumps over the tiles between the two cells
+            self.parity ^= (abs(i - j) - 1) & 1
+
+    def move(self, index):
+        """
+        Slide the tile at the given linear index into the blank, if it is adjacent
+        :param index: linear index of the tile to slide
+        :return: True if the tile moved, False otherwise
+        """
+        if index not in self.neighbors[self.blank]:
+            return False
+        self.swap(index, self.blank)
+        self.blank = index
+        return True
+
+    def calculate_inversions(self):
+        """
+        Calculate the number of inversions, excluding the blank tile, in O(N log N) with a Fenwick tree
+        :return: inversions
+        """
+        blank_id = self.blank_id
+        tree = [0] * (blank_id + 1)  # tree[k] counts the seen tiles of ids in (k - lowbit(k), k], 1-based
+        inversions = 0
+        seen = 0
+        for tile in self.cells:
+            if tile == blank_id:
+                continue
+            # Count the seen tiles with a smaller id, every other seen tile is an inversion
+            smaller = 0
+            k = tile
+            while k > 0:
+                smaller += tree[k]
+                k &= k - 1
+            inversions += seen - smaller
+            seen += 1
+            k = tile + 1
+            while k <= blank_id:
+                tree[k] += 1
+                k += k & -k
+        return inversions
+
+    def is_solvable(self, blank=None):
+        """
+        Check if the state is solvable, in constant time
+        :param blank: linear index of the blank to use for the check, default is self.blank
+        :return: True if solvable, False otherwise
+        """
+        """
+        For puzzles with odd number of tiles, the puzzle is solvable if the number of inversions is even.
+        For puzzles with even number of tiles, the puzzle is solvable:
+            1. if the number of inversions is even and the row number of the empty tile counted from the bottom is odd.
+            2. if the number of inversions is odd and the row number of the empty tile counted from the bottom is even.
+        """
+        # The parity of the inversions is kept up to date by swap, no rescan needed
+        if self.size % 2 != 0:
+            return self.parity == 0
+        blank_row = self.size - (self.blank if blank is None else blank) // self.size
+        if blank_row % 2 == 0:
+            return self.parity != 0
+        return self.parity == 0
+
+    def count_misplaced(self):
+        """
+        Count the cells not holding their own tile, with a full scan
+        :return: number of misplaced tiles, the blank included
+        """
+        return sum(1 for index, tile in enumerate(self.cells) if tile != index)
+
+    def is_solved(self):
+        """
+        Check if every tile is in its initial position, in constant time
+        :return: True if solved, False otherwise
+        """
+        return self.misplaced == 0
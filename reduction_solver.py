@@ -0,0 +1,253 @@
+import time
+from collections import deque
+from puzzle_state import PuzzleState
+from solver import SolveResult
+from zobrist import zobrist_hash, zobrist_table
+
+
+def shorten_path(state, path):
+    """
+    Remove every loop of a path: inverse move pairs and longer cycles that come back to an earlier state
+    :param state: PuzzleState the path starts from, not modified
+    :param path: list of the linear indices of the tiles to click
+    :return: the shortened list of linear indices
+    """
+    table = zobrist_table(state.size)
+    cells = list(state.cells)
+    blank_id = state.blank_id
+    blank = cells.index(blank_id)
+    current = zobrist_hash(cells, state.size)
+    hashes = [current]
+    seen = {current: 0}
+    shortened = []
+    for index in path:
+        tile = cells[index]
+        cells[blank], cells[index] = tile, blank_id
+        current ^= table[tile][index] ^ table[tile][blank] ^ table[blank_id][blank] ^ table[blank_id][index]
+        blank = index
+        earlier = seen.get(current)
+        if earlier is None:
+            seen[current] = len(hashes)
+            hashes.append(current)
+            shortened.append(index)
+        else:
+            # Back to an earlier state, drop the loop
+            for dropped in hashes[earlier + 1:]:
+                del seen[dropped]
+            del hashes[earlier + 1:]
+            del shortened[earlier:]
+    return shortened
+
+
+class ReductionSolver:
+    """
+    Fast non-optimal solver for boards of any size, in polynomial time
+
+    The board is reduced row by row from the top until two rows are left, then column by column from
+    the left until a 2x2 square is left. Every tile is routed to its goal with the blank, the solved
+    tiles are locked. The last two tiles of a line are placed together by a breadth-first search on
+    a 3x2 window, which avoids the classic traps of the corner tiles.
+
+    Attributes:
+    size (int): The number of tiles per line of the current solve
+    cells (list): The tile ids in linear order
+    positions (list): The linear index of every tile
+    blank (int): The linear index of the blank
+    neighbors (tuple): The neighbor table of the size, see puzzle_state.neighbor_table
+    locked (bytearray): 1 for the cells that the blank must not enter
+    path (list): The linear indices of the tiles clicked so far
+    visit (list): The search stamp of every cell, reused between searches
+    parent (list): The previous cell of every visited cell
+    stamp (int): The stamp of the current search
+    """
+    def __init__(self):
+        """
+        Constructor of the ReductionSolver class
+        """
+        self.size = 0
+        self.cells = None
+        self.positions = None
+        self.blank = None
+        self.neighbors = None
+        self.locked = None
+        self.path = None
+        self.visit = None
+        self.parent = None
+        self.stamp = 0
+
+    def solve(self, state, cancel=None):
+        """
+        Find a solution from the given state, which is not modified
+        :param state: PuzzleState to solve
+        :param cancel: Unused, the search always finishes quickly, same interface as IDAStarSolver
+        :return: SolveResult, None if the state is not solvable
+        """
+        start = time.perf_counter()
+        state = PuzzleState(state.size, state.cells)
+        if not state.is_solvable():
+            return None
+        size = state.size
+        self.size = size
+        self.neighbors = state.neighbors
+        self.cells = list(state.cells)
+        self.positions = [0] * (size * size)
+        for index, tile in enumerate(self.cells):
+            self.positions[tile] = index
+        self.blank = state.blank
+        self.locked = bytearray(size * size)
+        self.path = []
+        self.visit = [0] * (size * size)
+        self.parent = [0] * (size * size)
+        self.stamp = 0
+
+        for row in range(size - 2):
+            for col in range(size - 2):
+                self.place(row * size + col, row * size + col)
+            self.place_pair(row * size + size - 2, row * size + size - 1, row * size + 2 * size - 1,
+                            [(row + i) * size + size - 2 + j for i in range(3) for j in range(2)])
+        for col in range(size - 2):
+            top, bottom = (size - 2) * size + col, (size - 1) * size + col
+            self.place_pair(top, bottom, bottom + 1, [top + j for j in range(3)] + [bottom + j for j in range(3)])
+        last = (size - 2) * size + size - 2
+        corner = [last, last + 1, last + size, last + size + 1]
+        self.solve_window([last, last + 1, last + size], corner)
+
+        moves = [state.to_position(index) for index in shorten_path(state, self.path)]
+        return SolveResult(moves, len(self.path), time.perf_counter() - start)
+
+    def click(self, index):
+        """
+        Slide the tile at index into the adjacent blank
+        :param index: the linear index of the tile
+        :return: None
+        """
+        tile = self.cells[index]
+        self.cells[self.blank] = tile
+        self.positions[tile] = self.blank
+        blank_id = self.size * self.size - 1
+        self.cells[index] = blank_id
+        self.positions[blank_id] = index
+        self.blank = index
+        self.path.append(index)
+
+    def find_path(self, source, targets, blocked):
+        """
+        Find a shortest path from a cell to the nearest of some cells, through the unlocked cells
+        :param source: the linear index of the first cell
+        :param targets: the linear indices of the possible last cells
+        :param blocked: the linear index of a cell to avoid as well, -1 for none
+        :return: list of the linear indices after source up to the target, None if there is no path
+        """
+        self.stamp += 1
+        stamp, visit, parent, locked, neighbors = self.stamp, self.visit, self.parent, self.locked, self.neighbors
+        visit[source] = stamp
+        queue = deque([source])
+        while queue:
+            cell = queue.popleft()
+            if cell in targets:
+                path = []
+                while cell != source:
+                    path.append(cell)
+                    cell = parent[cell]
+                return path[::-1]
+            for neighbor in neighbors[cell]:
+                if visit[neighbor] != stamp and not locked[neighbor] and neighbor != blocked:
+                    visit[neighbor] = stamp
+                    parent[neighbor] = cell
+                    queue.append(neighbor)
+        return None
+
+    def move_blank(self, targets, blocked=-1):
+        """
+        Move the blank to the nearest of some cells, through the unlocked cells
+        :param targets: the linear indices of the cells
+        :param blocked: the linear index of a cell to avoid as well, -1 for none
+        :return: None
+        """
+        path = self.find_path(self.blank, targets, blocked)
+        if path is None:
+            raise RuntimeError(f"The blank cannot reach cells {targets}")
+        for index in path:
+            self.click(index)
+
+    def move_tile(self, tile, target):
+        """
+        Route a tile to a cell with the blank, through the unlocked cells
+        :param tile: the tile id
+        :param target: the linear index of the cell
+        :return: None
+        """
+        route = self.find_path(self.positions[tile], (target,), -1)
+        if route is None:
+            raise RuntimeError(f"Tile {tile} cannot reach cell {target}")
+        for step in route:
+            # Bring the blank in front of the tile without pushing it, then slide the tile
+            self.move_blank((step,), self.positions[tile])
+            self.click(self.positions[tile])
+
+    def place(self, tile, target):
+        """
+        Route a tile to a cell and lock it there
+        :param tile: the tile id
+        :param target: the linear index of the cell
+        :return: None
+        """
+        self.move_tile(tile, target)
+        self.locked[target] = 1
+
+    def place_pair(self, first, second, staging, window):
+        """
+        Place the last two tiles of a line, whose goals are the cells first and second
+        :param first: the goal of the tile placed first, the one next to the solved part of the line
+        :param second: the goal of the last tile of the line
+        :param staging: a window cell where the second tile waits out of the line
+        :param window: the 3x2 or 2x3 window holding both goals
+        :return: None
+        """
+        self.place(first, first)
+        if self.positions[second] != second:
+            self.place(second, staging)
+        self.locked[first] = 0
+        self.locked[staging] = 0
+        self.solve_window([first, second], window)
+
+    def solve_window(self, tiles, window):
+        """
+        Put tiles at their goals by moving the blank inside a window only
+        :param tiles: the ids of the tiles, their goals are in the window
+        :param window: the linear indices of the cells of the window, the tiles must be in it
+        :return: None
+        """
+        for tile in tiles:
+            self.locked[self.positions[tile]] = 1
+        self.move_blank(set(cell for cell in window if not self.locked[cell]))
+        for tile in tiles:
+            self.locked[self.positions[tile]] = 0
+
+        # Breadth-first search on the positions of the tiles and of the blank, other tiles are indistinct
+        cells = set(window)
+        start = tuple(self.positions[tile] for tile in tiles) + (self.blank,)
+        goal = tuple(tiles)
+        parent = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node[:-1] == goal:
+                break
+            blank = node[-1]
+            for neighbor in self.neighbors[blank]:
+                if neighbor in cells:
+                    child = tuple(blank if position == neighbor else position for position in node[:-1]) + (neighbor,)
+                    if child not in parent:
+                        parent[child] = node
+                        queue.append(child)
+        else:
+            raise RuntimeError(f"Tiles {tiles} cannot be placed in window {window}")
+        clicks = []
+        while parent[node] is not None:
+            clicks.append(node[-1])
+            node = parent[node]
+        for index in reversed(clicks):
+            self.click(index)
+        for tile in tiles:
+            self.locked[tile] = 1
@@ -0,0 +1,192 @@
+import turtle
+import constants
+from shape_registry import ShapeRegistry
+from turtle_pool import TurtlePool
+
+
+class TurtleRenderer:
+    """
+    Renderer drawing the tiles of a board with turtle shapes
+
+    Attributes:
+    shapes (ShapeRegistry): The registry decoding every image once
+    pool (TurtlePool): The pool the drawing objects of the tiles are checked out of
+    """
+    def __init__(self):
+        """
+        Constructor of the TurtleRenderer class
+        """
+        self.shapes = ShapeRegistry()
+        self.pool = TurtlePool()
+
+    def acquire_images(self, owner, images):
+        """
+        Hold the images of a puzzle while it is loaded
+        :param owner: the puzzle file name
+        :param images: iterable of image file paths
+        :return: None
+        """
+        self.shapes.acquire(owner, images)
+
+    def release_images(self, owner):
+        """
+        Drop the images of a puzzle that is not loaded anymore
+        :param owner: the puzzle file name
+        :return: None
+        """
+        self.shapes.release(owner)
+
+    def create_sprite(self):
+        """
+        Check the drawing object of a tile out of the turtle pool
+        :return: a hidden turtle object with penup()
+        """
+        return self.pool.checkout()
+
+    def draw_tile(self, tile, x, y):
+        """
+        Draw the tile at the given position (x, y)
+        :param tile: the tile to draw
+        :param x: x-coordinate of the tile
+        :param y: y-coordinate of the tile
+        :return: None
+        """
+        sprite = tile.turtle
+        # The image is set on the first draw only, later draws just move the sprite
+        if sprite.shape() != tile.image:
+            self.shapes.apply(sprite, tile.image)
+        if not sprite.isvisible():
+            sprite.showturtle()
+        sprite.goto(x, y)
+
+    def hide_tile(self, tile):
+        """
+        Hide the tile and check its drawing object back into the turtle pool
+        :param tile: the tile to hide
+        :return: None
+        """
+        self.pool.checkin(tile.turtle)
+        tile.turtle = None
+
+    def bind_click(self, callback):
+        """
+        Bind the click event of the screen, replacing the previous binding
+        :param callback: function called with the coordinates of the click, None to release the event
+        :return: None
+        """
+        turtle.onscreenclick(callback)
+
+    def update(self):
+        """
+        Update the turtle screen
+        :return: None
+        """
+        turtle.update()
+
+
+class CanvasRenderer(TurtleRenderer):
+    """
+    Renderer drawing the tiles directly on the Tk canvas of the turtle screen, one image item per tile
+
+    Turtle redraws every turtle item on each turtle.update(); here a move only changes the coordinates of two canvas
+    items, and Tk redraws the damaged area when it is idle. Images are decoded through the same shape registry.
+
+    Attributes:
+    canvas (tkinter.Canvas): The canvas the tiles are drawn on, the one of the turtle screen by default
+    """
+    def __init__(self, canvas=None):
+        """
+        Constructor of the CanvasRenderer class
+        :param canvas: The canvas the tiles are drawn on, default is the canvas of the turtle screen
+        """
+        super().__init__()
+        self.canvas = turtle.getcanvas() if canvas is None else canvas
+
+    def create_sprite(self):
+        """
+        The image item of a tile is created on its first draw
+        :return: None
+        """
+        return None
+
+    def draw_tile(self, tile, x, y):
+        """
+        Draw the tile at the given position (x, y)
+        :param tile: the tile to draw
+        :param x: x-coordinate of the tile
+        :param y: y-coordinate of the tile
+        :return: None
+        """
+        # The y axis of the canvas points down, the one of the turtle screen points up
+        if tile.turtle is None:
+            tile.turtle = self.canvas.create_image(x, -y, image=self.shapes.image(tile.image))
+        else:
+            self.canvas.coords(tile.turtle, x, -y)
+
+    def hide_tile(self, tile):
+        """
+        Delete the image item of the tile
+        :param tile: the tile to hide
+        :return: None
+        """
+        if tile.turtle is not None:
+            self.canvas.delete(tile.turtle)
+            tile.turtle = None
+
+    def bind_click(self, callback):
+        """
+        Bind the click event of the canvas, replacing the previous binding
+        :param callback: function called with the turtle coordinates of the click, None to release the event
+        :return: None
+        """
+        if callback is None:
+            self.canvas.unbind('<Button-1>')
+        else:
+            self.canvas.bind('<Button-1>', lambda event: callback(self.canvas.canvasx(event.x),
+                                                                  -self.canvas.canvasy(event.y)))
+
+    def update(self):
+        """
+        Redraw the damaged area of the canvas, the turtles are not redrawn
+        :return: None
+        """
+        self.canvas.update_idletasks()
+
+
+RENDERERS = {'turtle': TurtleRenderer, 'canvas': CanvasRenderer}
+
+
+def create_renderer(name=constants.RENDERER):
+    """
+    Create the renderer selected at startup
+    :param name: 'turtle' or 'canvas', default is constants.RENDERER
+    :return: a new renderer
+    """
+    return RENDERERS[name]()
+
+
+class NullRenderer:
+    """
+    Renderer that draws nothing, used to run boards without a display (tests, simulations, benchmarks)
+    """
+    def acquire_images(self, owner, images):
+        """No image to hold"""
+
+    def release_images(self, owner):
+        """No image to drop"""
+
+    def create_sprite(self):
+        """Tiles of a headless board have no drawing object"""
+        return None
+
+    def draw_tile(self, tile, x, y):
+        """Nothing to draw"""
+
+    def hide_tile(self, tile):
+        """Nothing to hide"""
+
+    def bind_click(self, callback):
+        """No click to bind"""
+
+    def update(self):
+        """Nothing to update"""
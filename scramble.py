@@ -0,0 +1,96 @@
+"""
+Uniform random solvable scrambles, in O(N²) per scramble whatever the board size.
+"""
+import random
+from heuristic import manhattan_table
+from puzzle_state import PuzzleState
+
+
+def permutation_parity(tiles):
+    """
+    Get the parity of a permutation from its cycles, which equals the parity of its number of inversions
+    :param tiles: list of the integers 0 to len(tiles) - 1 in any order
+    :return: 0 if even, 1 if odd
+    """
+    seen = bytearray(len(tiles))
+    cycles = 0
+    for start in range(len(tiles)):
+        if not seen[start]:
+            cycles += 1
+            index = start
+            while not seen[index]:
+                seen[index] = 1
+                index = tiles[index]
+    return (len(tiles) - cycles) & 1
+
+
+class ScrambleGenerator:
+    """
+    Generator of scrambles drawn uniformly among the solvable states
+
+    A random permutation is shuffled, then if it is not solvable, its first two tiles are swapped: this flips the
+    parity of the inversions and maps the unsolvable states of every blank position one to one onto the solvable
+    ones, so the result stays uniform.
+
+    Attributes:
+    rng (random.Random): The random number generator, seeded for reproducible scrambles
+    min_distance (int): The minimum Manhattan distance of a scramble, closer states are redrawn
+    max_draws (int): The maximum number of draws of a scramble, the farthest one is kept if none is far enough
+    """
+    def __init__(self, seed=None, min_distance=0, max_draws=100):
+        """
+        Constructor of the ScrambleGenerator class
+        :param seed: The seed of the random number generator, default is None for a random seed
+        :param min_distance: The minimum Manhattan distance of a scramble, default is 0 to accept every state
+        :param max_draws: The maximum number of draws of a scramble, as small boards may have no state far enough
+        """
+        self.rng = random.Random(seed)
+        self.min_distance = min_distance
+        self.max_draws = max_draws
+
+    def generate_cells(self, size):
+        """
+        Draw the tile ids of a solvable scramble
+        :param size: number of tiles per line
+        :return: list of the tile ids in linear order
+        """
+        farthest, farthest_distance = None, -1
+        table = manhattan_table(size)
+        for _ in range(self.max_draws):
+            cells = self.draw(size)
+            if self.min_distance <= 0:
+                return cells
+            # A plain Manhattan sum is enough to reject the rare states close to the goal
+            distance = sum(map(lambda tile, index: table[tile][index], cells, range(len(cells))))
+            if distance >= self.min_distance:
+                return cells
+            if distance > farthest_distance:
+                farthest, farthest_distance = cells, distance
+        return farthest
+
+    def draw(self, size):
+        """
+        Draw the tile ids of a solvable state, uniformly
+        :param size: number of tiles per line
+        :return: list of the tile ids in linear order
+        """
+        cells = list(range(size * size))
+        self.rng.shuffle(cells)
+        blank = cells.index(size * size - 1)
+        tiles = cells[:blank] + cells[blank + 1:]
+        # Same rules as PuzzleState.is_solvable: the parity of the inversions must be even on odd sizes,
+        # and differ from the parity of the blank row counted from the bottom on even sizes
+        wanted = 0 if size % 2 != 0 else 1 - (size - blank // size) % 2
+        if permutation_parity(tiles) != wanted:
+            # Swap the first two tiles, skipping the blank
+            first, second = [index for index in range(3) if index != blank][:2]
+            cells[first], cells[second] = cells[second], cells[first]
+        return cells
+
+    def generate(self, size):
+        """
+        Draw a solvable scramble
+        :param size: number of tiles per line
+        :return: a new PuzzleState
+        """
+        return PuzzleState(size, self.generate_cells(size))
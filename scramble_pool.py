@@ -0,0 +1,375 @@
+"""
+Pool of precomputed scrambles bucketed by exact optimal distance, one indexed file per size.
+
+Fill a pool ahead of time with: python scramble_pool.py 4 30 40 50
+"""
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+import constants
+from bitboard import MAX_BITBOARD_SIZE, pack, unpack
+from puzzle_state import PuzzleState
+from scramble import ScrambleGenerator
+from solver import IDAStarSolver, default_heuristic_class
+
+MAGIC = b'SCP1'
+HEADER = struct.Struct('<4sBBH')  # magic, size, record size, number of buckets
+BUCKET = struct.Struct('<II')  # first record, number of records left
+CANDIDATES_PER_TASK = 8
+MAX_CANDIDATE_DRAWS = 1000  # Number of draws of a candidate, the one whose lower bound is the closest is kept
+MAX_DISTANCES = {1: 0, 2: 6, 3: 31, 4: 80}  # Largest optimal distance of the puzzles of every size
+
+
+def pool_path(size, directory=constants.PATTERN_DB_DIR):
+    """
+    Get the file path of the pool of a size
+    :param size: the number of tiles per line
+    :param directory: the directory of the pools
+    :return: file path
+    """
+    return os.path.join(directory, f"{size}x{size}-scrambles.pool")
+
+
+def check_distance(size, distance):
+    """
+    Check that a size is held by the pools and that its puzzles reach a distance
+    :param size: the number of tiles per line
+    :param distance: the optimal distance
+    :return: None
+    """
+    if size > MAX_BITBOARD_SIZE:
+        raise ValueError(f"Scramble pools hold up to {MAX_BITBOARD_SIZE}x{MAX_BITBOARD_SIZE} puzzles")
+    if not 0 <= distance <= MAX_DISTANCES[size]:
+        raise ValueError(f"{size}x{size} puzzles are solved in 0 to {MAX_DISTANCES[size]} moves, got {distance}")
+
+
+def record_size(size):
+    """
+    Get the number of bytes of a scramble, 4 bits per cell
+    :param size: the number of tiles per line
+    :return: number of bytes
+    """
+    return (size * size + 1) // 2
+
+
+def random_walk_cells(size, length, rng):
+    """
+    Walk the blank randomly from the solved puzzle, never undoing the previous move
+    :param size: the number of tiles per line
+    :param length: the number of moves
+    :param rng: random.Random object
+    :return: list of the tile ids in linear order
+    """
+    state = PuzzleState(size)
+    prev = -1
+    for _ in range(length):
+        index = rng.choice([index for index in state.legal_moves() if index != prev])
+        prev = state.blank
+        state.move(index)
+    return list(state.cells)
+
+
+def draw_candidate(size, distance, bound, rng, generator):
+    """
+    Draw a scramble around a distance whose lower bound, the heuristic of the solver, is as close as possible to a
+    given value. Random walks reach the short distances and uniform scrambles the long ones, so the draws alternate
+    between them
+    :param size: the number of tiles per line
+    :param distance: the wanted optimal distance
+    :param bound: the wanted lower bound, of the same parity as the distance
+    :param rng: random.Random object of the walks
+    :param generator: ScrambleGenerator of the uniform scrambles
+    :return: tuple (list of the tile ids in linear order, lower bound), the closest of MAX_CANDIDATE_DRAWS draws of the
+    same parity as the distance
+    """
+    heuristic_class = default_heuristic_class(size)
+    closest, closest_bound = None, None
+    for draw in range(MAX_CANDIDATE_DRAWS):
+        if draw % 2:
+            cells = generator.generate_cells(size)
+        else:
+            cells = random_walk_cells(size, rng.randint(distance, 2 * distance), rng)
+        value = heuristic_class(size, cells).value
+        # The lower bound has the parity of the optimal distance
+        if (value - bound) % 2 == 0 and (closest is None or abs(value - bound) < abs(closest_bound - bound)):
+            closest, closest_bound = cells, value
+            if value == bound:
+                break
+    return closest, closest_bound
+
+
+def median_gap(gaps):
+    """
+    Get the median of the gaps between the optimal distances and the lower bounds of solved scrambles
+    :param gaps: list of gaps, even numbers
+    :return: the median gap, 0 if there is none
+    """
+    return sorted(gaps)[len(gaps) // 2] if gaps else 0
+
+
+def classify_scrambles(size, distance, count, seed, gap=0, budget_ms=constants.SCRAMBLE_POOL_SOLVE_BUDGET_MS):
+    """
+    Generate scrambles around a distance and solve them optimally, in a worker process
+
+    The optimal distance of a candidate is its lower bound plus a gap, even since both have the same parity, which
+    depends on the size and the heuristic. The candidates are drawn with a lower bound under the distance by the
+    median gap of the candidates solved so far, so that their optimal distances center on the wanted one.
+    :param size: the number of tiles per line
+    :param distance: the wanted optimal distance
+    :param count: the number of candidates
+    :param seed: the seed of the candidates
+    :param gap: the gap expected before any candidate is solved, default is 0
+    :param budget_ms: the time budget of the solve of a candidate, which is dropped when it runs out, default is
+    constants.SCRAMBLE_POOL_SOLVE_BUDGET_MS
+    :return: list of tuples (optimal distance, packed scramble, gap)
+    """
+    rng = random.Random(seed)
+    generator = ScrambleGenerator(rng.getrandbits(32))
+    solver = IDAStarSolver()
+    classified = []
+    for _ in range(count):
+        if classified:
+            gap = median_gap([solved_gap for _, _, solved_gap in classified])
+        cells, bound = draw_candidate(size, distance, max(distance - gap, distance % 2), rng, generator)
+        if cells is None:
+            continue
+        deadline = time.monotonic() + budget_ms / 1000
+        result = solver.solve(PuzzleState(size, cells), cancel=lambda: time.monotonic() > deadline)
+        if result is not None:
+            classified.append((len(result.moves), pack(cells), len(result.moves) - bound))
+    return classified
+
+
+def read_pool(path):
+    """
+    Read the scrambles left in a pool file
+    :param path: the file path
+    :return: dict of the packed scrambles per distance, empty if there is no pool
+    """
+    buckets = {}
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        return buckets
+    magic, _, size_bytes, num_buckets = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"Not a scramble pool - \"{path}\"")
+    records = HEADER.size + num_buckets * BUCKET.size
+    for distance in range(num_buckets):
+        first, left = BUCKET.unpack_from(data, HEADER.size + distance * BUCKET.size)
+        if left:
+            start = records + first * size_bytes
+            buckets[distance] = [int.from_bytes(data[start + i * size_bytes:start + (i + 1) * size_bytes], 'little')
+                                 for i in range(left)]
+    return buckets
+
+
+def write_pool(path, size, buckets):
+    """
+    Write a pool file: the header, the index of the buckets, then the records of every bucket in a row
+    :param path: the file path
+    :param size: the number of tiles per line
+    :param buckets: dict of the packed scrambles per distance
+    :return: None
+    """
+    size_bytes = record_size(size)
+    num_buckets = max(buckets, default=-1) + 1
+    index = bytearray()
+    records = bytearray()
+    first = 0
+    for distance in range(num_buckets):
+        bucket = buckets.get(distance, [])
+        index += BUCKET.pack(first, len(bucket))
+        for bits in bucket:
+            records += bits.to_bytes(size_bytes, 'little')
+        first += len(bucket)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file first, the pool may be read meanwhile
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, size, size_bytes, num_buckets))
+        file.write(index)
+        file.write(records)
+    os.replace(temp_path, path)
+
+
+class ScramblePool:
+    """
+    Scrambles of exact optimal distances, taken in O(1) and refilled in the background
+
+    Taking a scramble reads one record and decrements the count of its bucket in the file index, in place. When a
+    bucket runs low, scrambles are generated and solved on a process pool; the results are merged into the file by
+    the next poll, so the game never waits for a solver.
+
+    Attributes:
+    directory (str): The directory of the pool files
+    workers (int): The number of worker processes of the refills
+    low_water (int): The number of scrambles left in a bucket under which it is refilled
+    capacity (int): The maximum number of scrambles kept per bucket
+    rng (random.Random): The random number generator of the seeds of the refills
+    executor (ProcessPoolExecutor): The worker processes, started on the first refill
+    pending (dict): The futures of the running refills, to the bucket (size, distance) they refill
+    gaps (dict): The median gap between the optimal distances and the lower bounds of the last refill of every size,
+    see classify_scrambles
+    """
+    def __init__(self, directory=constants.PATTERN_DB_DIR, workers=None, low_water=constants.SCRAMBLE_POOL_LOW_WATER,
+                 capacity=constants.SCRAMBLE_POOL_CAPACITY):
+        """
+        Constructor of the ScramblePool class
+        :param directory: The directory of the pool files, default is constants.PATTERN_DB_DIR
+        :param workers: The number of worker processes of the refills, default is the number of CPUs
+        :param low_water: The number of scrambles left under which a bucket is refilled
+        :param capacity: The maximum number of scrambles kept per bucket
+        """
+        self.directory = directory
+        self.workers = workers or os.cpu_count() or 1
+        self.low_water = low_water
+        self.capacity = capacity
+        self.rng = random.Random()
+        self.executor = None
+        self.pending = {}
+        self.gaps = {}
+
+    def take(self, size, distance):
+        """
+        Take a scramble out of the pool, and start a refill if its bucket runs low
+        :param size: the number of tiles per line
+        :param distance: the optimal distance of the scramble
+        :return: PuzzleState, None if the bucket is empty
+        """
+        check_distance(size, distance)
+        self.poll()
+        state = None
+        left = 0
+        path = pool_path(size, self.directory)
+        try:
+            with open(path, 'r+b') as file:
+                magic, _, size_bytes, num_buckets = HEADER.unpack(file.read(HEADER.size))
+                if magic == MAGIC and distance < num_buckets:
+                    file.seek(HEADER.size + distance * BUCKET.size)
+                    first, left = BUCKET.unpack(file.read(BUCKET.size))
+                    if left:
+                        left -= 1
+                        file.seek(HEADER.size + num_buckets * BUCKET.size + (first + left) * size_bytes)
+                        state = PuzzleState(size, unpack(int.from_bytes(file.read(size_bytes), 'little'), size))
+                        file.seek(HEADER.size + distance * BUCKET.size)
+                        file.write(BUCKET.pack(first, left))
+        except FileNotFoundError:
+            pass
+        if left < self.low_water:
+            self.refill(size, distance)
+        return state
+
+    def refill(self, size, distance):
+        """
+        Start generating and solving scrambles around a distance in the background, unless a refill of the same
+        bucket is running
+        :param size: the number of tiles per line
+        :param distance: the wanted optimal distance
+        :return: None
+        """
+        if (size, distance) in self.pending.values():
+            return
+        if self.executor is None:
+            # Spawn rather than fork, the workers must not inherit the Tk interpreter
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        for _ in range(self.workers):
+            future = self.executor.submit(classify_scrambles, size, distance, CANDIDATES_PER_TASK,
+                                          self.rng.getrandbits(32), self.gaps.get(size, 0))
+            self.pending[future] = (size, distance)
+
+    def poll(self, block=False):
+        """
+        Merge the scrambles of the finished refills into the pool files
+        :param block: True to wait for the running refills, default is False to never block
+        :return: None
+        """
+        if block:
+            wait(list(self.pending))
+        classified = {}
+        for future, (size, _) in list(self.pending.items()):
+            if future.done():
+                del self.pending[future]
+                if not future.cancelled() and future.exception() is None:
+                    classified.setdefault(size, []).extend(future.result())
+        for size, scrambles in classified.items():
+            if scrambles:
+                self.gaps[size] = median_gap([gap for _, _, gap in scrambles])
+            self.merge(size, scrambles)
+
+    def merge(self, size, scrambles):
+        """
+        Add classified scrambles to the pool file of a size
+        :param size: the number of tiles per line
+        :param scrambles: list of tuples (optimal distance, packed scramble, gap)
+        :return: None
+        """
+        path = pool_path(size, self.directory)
+        buckets = read_pool(path)
+        for distance, bits, _ in scrambles:
+            bucket = buckets.setdefault(distance, [])
+            if len(bucket) < self.capacity and bits not in bucket:
+                bucket.append(bits)
+        write_pool(path, size, buckets)
+
+    def fill(self, size, distance, count, max_stalls=constants.SCRAMBLE_POOL_MAX_STALLS):
+        """
+        Refill until a bucket holds enough scrambles, blocking
+        :param size: the number of tiles per line
+        :param distance: the optimal distance of the bucket
+        :param count: the number of scrambles wanted in the bucket
+        :param max_stalls: the number of refills in a row adding no scramble after which the bucket is given up,
+        default is constants.SCRAMBLE_POOL_MAX_STALLS
+        :return: None
+        """
+        check_distance(size, distance)
+        if count > self.capacity:
+            raise ValueError(f"A bucket holds up to {self.capacity} scrambles, got {count}")
+        path = pool_path(size, self.directory)
+        held = len(read_pool(path).get(distance, []))
+        stalls = 0
+        while held < count:
+            self.refill(size, distance)
+            self.poll(block=True)
+            filled = len(read_pool(path).get(distance, []))
+            stalls = 0 if filled > held else stalls + 1
+            if stalls >= max_stalls:
+                raise RuntimeError(f"No new {size}x{size} scramble at distance {distance} after {stalls} refills, "
+                                   f"{filled} of {count} found")
+            held = filled
+
+    def close(self):
+        """
+        Stop the worker processes, the running refills are dropped
+        :return: None
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.pending = {}
+
+
+def main():
+    """
+    Fill the pool of the size and distances given on the command line: python scramble_pool.py size distance...
+    :return: None
+    """
+    size, distances = int(sys.argv[1]), [int(arg) for arg in sys.argv[2:]]
+    pool = ScramblePool()
+    try:
+        for distance in distances:
+            pool.fill(size, distance, pool.low_water * 4)
+            print(f"Filled {pool_path(size)} at distance {distance}")
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
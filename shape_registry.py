@@ -0,0 +1,166 @@
+from collections import OrderedDict
+import turtle
+import constants
+from atlas import slice_atlas, split_name
+from puzzle_pack import load_photo
+from tile_cache import TileCache, split_scaled_name
+
+
+class ShapeRegistry:
+    """
+    Singleton registry of the image shapes of the turtle screen, so that every image is decoded only once
+
+    turtle.register_shape decodes the GIF into a new PhotoImage on every call. The registry registers an image the
+    first time it is used and remembers it. The tiles of an atlas puzzle are all cut from one decode of the atlas
+    the first time one of them is used, and tiles resampled to the tile size are read from the disk cache of
+    TileCache. Images are reference counted per owner (a loaded puzzle); when the
+    decoded images exceed the memory budget, the least recently used ones that no owner holds anymore and no turtle
+    of the screen shows are evicted.
+
+    The registry keeps its own reference to every decoded image and registers it through the public register_shape,
+    it never reads nor deletes the shapes of the screen. An evicted image is registered again as an empty shape, so
+    that the screen drops its PhotoImage.
+
+    Attributes:
+    screen (turtle.Screen): The screen the shapes are registered on, the turtle screen by default
+    budget (int): The memory budget of the decoded images, in bytes
+    loader (function): The function decoding an image file, loose or inside a puzzle pack
+    shapes (OrderedDict): The registered images, name -> estimated size in bytes, least recently used first
+    images (dict): The decoded images of the registered shapes, name -> tkinter PhotoImage
+    owners (dict): The images held by every owner, owner -> set of names
+    references (dict): The number of owners holding every image
+    used (int): The estimated memory of the registered images, in bytes
+    tiles (TileCache): The disk cache of the resampled tile images
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        """Singleton pattern implementation"""
+        if cls._instance is None:
+            cls._instance = super(ShapeRegistry, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, screen=None, budget=constants.SHAPE_CACHE_BUDGET, tile_cache=None, loader=load_photo):
+        """
+        Constructor of the ShapeRegistry class, only the first call initializes the registry
+        :param screen: The screen the shapes are registered on, default is the turtle screen, opened on first use
+        :param budget: The memory budget of the decoded images in bytes, default is constants.SHAPE_CACHE_BUDGET
+        :param tile_cache: The disk cache of the resampled tile images, default is a TileCache
+        :param loader: The function decoding an image file, default is load_photo
+        """
+        if not hasattr(self, 'shapes'):
+            self.screen = screen
+            self.budget = budget
+            self.loader = loader
+            self.shapes = OrderedDict()
+            self.images = {}
+            self.owners = {}
+            self.references = {}
+            self.used = 0
+            self.tiles = TileCache() if tile_cache is None else tile_cache
+
+    def register(self, name):
+        """
+        Register an image as a shape, decoding it only if it is not registered yet
+        :param name: the image file path
+        :return: the shape name
+        """
+        if name in self.shapes:
+            self.shapes.move_to_end(name)
+            return name
+        if self.screen is None:
+            self.screen = turtle.Screen()
+        base, size = split_scaled_name(name)
+        path, grid, _ = split_name(base)
+        if size is not None:
+            # The source image is decoded on a cache miss only
+            self.add(name, self.tiles.load(base, size, lambda: self.image(base)))
+        elif grid is None:
+            self.add(name, self.loader(name))
+        else:
+            slices = slice_atlas(path, grid)
+            if name not in slices:
+                raise ValueError(f"No image \"{name}\" in the {grid}x{grid} atlas \"{path}\"")
+            for slice_name, image in slices.items():
+                if slice_name not in self.shapes:
+                    self.add(slice_name, image)
+            self.shapes.move_to_end(name)
+            # The other tiles of the atlas are drawn next, evicting them would decode the atlas again
+            self.evict(keep=slices)
+            return name
+        self.evict(keep=(name,))
+        return name
+
+    def add(self, name, image):
+        """
+        Register a decoded image as a shape and add it to the registered images, with its estimated memory
+        :param name: the shape name
+        :param image: the tkinter PhotoImage
+        :return: None
+        """
+        self.screen.register_shape(name, turtle.Shape('image', image))
+        self.images[name] = image
+        self.shapes[name] = image.width() * image.height() * 4
+        self.used += self.shapes[name]
+
+    def image(self, name):
+        """
+        Get the decoded image of a shape, registering the image if needed
+        :param name: the image file path
+        :return: the tkinter PhotoImage of the shape
+        """
+        return self.images[self.register(name)]
+
+    def apply(self, sprite, name):
+        """
+        Give an image shape to a turtle, registering the image if needed
+        :param sprite: the turtle object
+        :param name: the image file path
+        :return: None
+        """
+        sprite.shape(self.register(name))
+
+    def acquire(self, owner, names):
+        """
+        Hold images for an owner, so that they are never evicted while it is in use
+        :param owner: the owner, such as the puzzle file name
+        :param names: iterable of image file paths
+        :return: None
+        """
+        held = self.owners.setdefault(owner, set())
+        for name in names:
+            if name not in held:
+                held.add(name)
+                self.references[name] = self.references.get(name, 0) + 1
+
+    def release(self, owner):
+        """
+        Drop the images held by an owner, then evict the unused images over the budget
+        :param owner: the owner
+        :return: None
+        """
+        for name in self.owners.pop(owner, ()):
+            self.references[name] -= 1
+            if not self.references[name]:
+                del self.references[name]
+        self.evict()
+
+    def evict(self, keep=()):
+        """
+        Unregister the least recently used images no owner holds and no turtle shows, until the images fit in the
+        budget
+        :param keep: the images never evicted, such as the ones being registered, default is none
+        :return: None
+        """
+        if self.used <= self.budget:
+            return
+        # Hidden turtles count too, a turtle keeps its shape until it is checked back into the pool
+        shown = {sprite.shape() for sprite in self.screen.turtles()}
+        for name in list(self.shapes):
+            if self.used <= self.budget:
+                break
+            if name not in self.references and name not in shown and name not in keep:
+                self.used -= self.shapes.pop(name)
+                del self.images[name]
+                # The empty shape replaces the image on the screen, which frees the PhotoImage
+                self.screen.register_shape(name, turtle.Shape('compound'))
@@ -0,0 +1,159 @@
+"""
+Transposition table of solved states: distance to the goal and best next move, kept in a bounded LRU in memory and
+optionally in an SQLite file shared by every game and session.
+"""
+import os
+import sqlite3
+import sys
+from array import array
+from collections import OrderedDict
+import constants
+from puzzle_state import PuzzleState
+
+
+def pack_state(state):
+    """
+    Pack a state into the canonical key of the cache
+    :param state: PuzzleState
+    :return: bytes, the size followed by the tile ids as 16-bit little-endian integers
+    """
+    cells = array('H', state.cells)
+    if sys.byteorder == 'big':
+        cells.byteswap()
+    return bytes([state.size]) + cells.tobytes()
+
+
+class SolutionCache:
+    """
+    Cache of the optimal distance and best next move of the states met so far
+
+    Every state along an optimal solution is recorded, so a solved scramble answers every later query on its path.
+    Entries live in an LRU of bounded capacity, backed by an SQLite table when a path is given.
+
+    Attributes:
+    capacity (int): The maximum number of entries kept in memory
+    path (str): The path of the SQLite file, None to keep the cache in memory only
+    entries (OrderedDict): The in-memory entries, packed state -> (distance, linear index of the tile to click)
+    connection (sqlite3.Connection): The connection to the SQLite file, None if there is none
+    hits (int): The number of queries answered by the cache
+    misses (int): The number of queries not found in the cache
+    """
+    def __init__(self, capacity=constants.SOLUTION_CACHE_SIZE, path=None):
+        """
+        Constructor of the SolutionCache class
+        :param capacity: The maximum number of entries kept in memory, default is constants.SOLUTION_CACHE_SIZE
+        :param path: The path of the SQLite file, default is None to keep the cache in memory only
+        """
+        self.capacity = capacity
+        self.path = path
+        self.entries = OrderedDict()
+        self.connection = None
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self.open()
+
+    def open(self):
+        """
+        Open the SQLite file, the cache stays in memory only if it cannot be opened
+        :return: None
+        """
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS solutions "
+                                    "(state BLOB PRIMARY KEY, distance INTEGER NOT NULL, move INTEGER NOT NULL)")
+            self.connection.commit()
+        except (OSError, sqlite3.Error):
+            self.connection = None
+
+    def close(self):
+        """
+        Close the SQLite file
+        :return: None
+        """
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def remember(self, key, entry):
+        """
+        Put an entry in memory as the most recently used one, evicting the least recently used if full
+        :param key: the packed state
+        :param entry: tuple (distance, move)
+        :return: None
+        """
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def lookup(self, state):
+        """
+        Get the distance and best next move of a state
+        :param state: PuzzleState
+        :return: tuple (distance, linear index of the tile to click, -1 if solved), None if the state is not cached
+        """
+        key = pack_state(state)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        elif self.connection is not None:
+            row = self.connection.execute("SELECT distance, move FROM solutions WHERE state = ?", (key,)).fetchone()
+            if row is not None:
+                entry = row
+                self.remember(key, entry)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def solution(self, state):
+        """
+        Rebuild an optimal solution by following the cached best moves
+        :param state: PuzzleState, not modified
+        :return: list of the linear indices of the tiles to click, None if a state of the path is not cached
+        """
+        state = PuzzleState(state.size, state.cells)
+        path = []
+        while True:
+            entry = self.lookup(state)
+            if entry is None:
+                return None
+            distance, move = entry
+            if distance == 0:
+                return path
+            path.append(move)
+            state.move(move)
+
+    def record(self, state, path):
+        """
+        Store every state of an optimal solution
+        :param state: PuzzleState the solution starts from, not modified
+        :param path: list of the linear indices of the tiles to click
+        :return: None
+        """
+        state = PuzzleState(state.size, state.cells)
+        rows = []
+        for distance in range(len(path), -1, -1):
+            move = path[len(path) - distance] if distance else -1
+            key = pack_state(state)
+            self.remember(key, (distance, move))
+            rows.append((key, distance, move))
+            if distance:
+                state.move(move)
+        if self.connection is not None:
+            try:
+                with self.connection:
+                    self.connection.executemany("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)", rows)
+            except sqlite3.Error:
+                pass  # The in-memory entries are enough for this session
+
+    @property
+    def hit_rate(self):
+        """The share of the queries answered by the cache"""
+        queries = self.hits + self.misses
+        return self.hits / queries if queries else 0.0
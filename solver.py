@@ -0,0 +1,451 @@
+import heapq
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from heuristic import ManhattanConflict
+from pattern_database import PatternDatabaseHeuristic, load_partition
+from puzzle_state import PuzzleState, neighbor_table
+
+INFINITY = float('inf')
+FOUND = -1  # Returned by a bounded search instead of the next bound when it reached the goal
+CANCEL_CHECK_INTERVAL = 1024  # Number of nodes between two checks of the cancel callback, a power of 2
+FRONTIER_PER_WORKER = 16  # Number of subtrees per worker process of the parallel solver, to balance the load
+
+
+class SolveCancelled(Exception):
+    """Raised inside a search when its cancel callback returns True"""
+
+
+class SolveResult:
+    """
+    Result of a solver run
+
+    Attributes:
+    moves (list): The positions of the tiles to click, in order, to solve the puzzle
+    nodes (int): The number of nodes expanded by the search
+    elapsed (float): The time spent searching, in seconds
+    complete (bool): True if the moves solve the puzzle, False for the partial path of an interrupted search
+    """
+    def __init__(self, moves, nodes, elapsed, complete=True):
+        """
+        Constructor of the SolveResult class
+        :param moves: The positions of the tiles to click, in order
+        :param nodes: The number of nodes expanded by the search
+        :param elapsed: The time spent searching, in seconds
+        :param complete: True if the moves solve the puzzle, default is True
+        """
+        self.moves = moves
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.complete = complete
+
+    @property
+    def nodes_per_second(self):
+        """The throughput of the search"""
+        return self.nodes / self.elapsed if self.elapsed > 0 else float(self.nodes)
+
+    def __repr__(self):
+        return (f"SolveResult(moves={len(self.moves)}, nodes={self.nodes}, elapsed={self.elapsed:.3f}s, "
+                f"complete={self.complete})")
+
+
+def default_heuristic_class(size):
+    """
+    Choose the best heuristic available for a size
+    :param size: number of tiles per line
+    :return: PatternDatabaseHeuristic if the tables of the size are built, ManhattanConflict otherwise
+    """
+    if load_partition(size) is not None:
+        return PatternDatabaseHeuristic
+    return ManhattanConflict
+
+
+def make_search(cells, neighbors, blank_id, heuristic, path, cancel=None):
+    """
+    Build the bounded depth-first search of IDA*, which slides the tiles of cells in place
+    :param cells: list of the tile ids in linear order, restored when the search returns without finding the goal
+    :param neighbors: the neighbor table of the size
+    :param blank_id: the tile id of the blank
+    :param heuristic: the incremental heuristic of cells, see heuristic.ManhattanConflict
+    :param path: list receiving the linear indices of the tiles clicked, the solution when the goal is found
+    :param cancel: Callable polled during the search, returning True to raise SolveCancelled, default is None
+    :return: tuple (search, count), search(blank, g, bound, prev) returns FOUND or the smallest f over the bound,
+    count() returns the number of nodes expanded so far
+    """
+    slide = heuristic.slide
+    nodes = 0
+
+    def search(blank, g, bound, prev):
+        # The caller checked that f = g + h is within the bound
+        nonlocal nodes
+        if heuristic.value == 0:
+            return FOUND
+        nodes += 1
+        if cancel is not None and nodes % CANCEL_CHECK_INTERVAL == 0 and cancel():
+            raise SolveCancelled()
+        minimum = INFINITY
+        for index in neighbors[blank]:
+            if index == prev:
+                continue
+            # Slide the tile at index into the blank
+            cells[blank] = cells[index]
+            cells[index] = blank_id
+            f = g + 1 + slide(cells, index, blank)
+            if f <= bound:
+                path.append(index)
+                f = search(index, g + 1, bound, blank)
+                if f == FOUND:
+                    return FOUND
+                path.pop()
+            cells[index] = cells[blank]
+            cells[blank] = blank_id
+            slide(cells, blank, index)
+            if f < minimum:
+                minimum = f
+        return minimum
+
+    def count():
+        return nodes
+
+    return search, count
+
+
+class IDAStarSolver:
+    """
+    Optimal solver using iterative deepening A*
+
+    Attributes:
+    heuristic_class (class): The class of the incremental heuristic, None to choose it per size
+    """
+    def __init__(self, heuristic_class=None):
+        """
+        Constructor of the IDAStarSolver class
+        :param heuristic_class: The class of the incremental heuristic, see heuristic.ManhattanConflict,
+        default is default_heuristic_class of the size of the solved state
+        """
+        self.heuristic_class = heuristic_class
+
+    def solve(self, state, cancel=None):
+        """
+        Find an optimal solution from the given state, which is not modified
+        :param state: PuzzleState to solve
+        :param cancel: Callable polled during the search, returning True to abandon it, default is None
+        :return: SolveResult, None if the state is not solvable or the search was cancelled
+        """
+        # Rebuild the state so that the blank index is never stale
+        state = PuzzleState(state.size, state.cells)
+        if not state.is_solvable():
+            return None
+        start = time.perf_counter()
+        cells = list(state.cells)
+        heuristic_class = self.heuristic_class or default_heuristic_class(state.size)
+        heuristic = heuristic_class(state.size, cells)
+        path = []
+        search, count = make_search(cells, state.neighbors, state.blank_id, heuristic, path, cancel)
+        bound = heuristic.value
+        try:
+            while True:
+                t = search(state.blank, 0, bound, -1)
+                if t == FOUND:
+                    break
+                bound = t
+        except SolveCancelled:
+            return None
+        moves = [state.to_position(index) for index in path]
+        return SolveResult(moves, count(), time.perf_counter() - start)
+
+
+_shared = None  # The (stop, next_bound) values of the parallel solver, set in each worker process
+
+
+def _init_subtree_worker(stop, next_bound):
+    """
+    Initializer of the worker processes of ParallelIDAStarSolver
+    :param stop: multiprocessing.Value set to 1 when the running subtree searches must stop
+    :param next_bound: multiprocessing.Value of the smallest f over the bound found so far
+    :return: None
+    """
+    global _shared
+    _shared = (stop, next_bound)
+
+
+def _search_subtree(size, cells, blank, prev, g, bound, heuristic_class):
+    """
+    Run one bounded depth-first search of IDA* from a frontier node, in a worker process
+    :param size: the number of tiles per line
+    :param cells: list of the tile ids of the frontier node
+    :param blank: the linear index of the blank
+    :param prev: the linear index of the blank before the last move, never clicked back
+    :param g: the number of moves from the root
+    :param bound: the bound of the current iteration
+    :param heuristic_class: the class of the incremental heuristic
+    :return: tuple (path from the frontier node or None, nodes expanded)
+    """
+    stop, next_bound = _shared
+    path = []
+    heuristic = heuristic_class(size, cells)
+    search, count = make_search(cells, neighbor_table(size), size * size - 1, heuristic, path,
+                                lambda: stop.value)
+    try:
+        t = search(blank, g, bound, prev)
+    except SolveCancelled:
+        return None, count()
+    if t == FOUND:
+        stop.value = 1  # Early termination of the other subtrees
+        return path, count()
+    with next_bound.get_lock():
+        if t < next_bound.value:
+            next_bound.value = t
+    return None, count()
+
+
+class ParallelIDAStarSolver:
+    """
+    Optimal solver running IDA* on several processes
+
+    The root is expanded breadth-first until the frontier holds FRONTIER_PER_WORKER nodes per worker. Every
+    iteration then submits the frontier nodes within the bound to a process pool, best f first. The workers
+    share the next bound and a stop flag: the first worker reaching the goal raises the flag and the others
+    abandon their subtrees. All the subtrees of an iteration use the same bound, so the first solution is
+    optimal.
+
+    Attributes:
+    workers (int): The number of worker processes
+    heuristic_class (class): The class of the incremental heuristic, None to choose it per size
+    context (multiprocessing.context): The multiprocessing context of the pool
+    stop (multiprocessing.Value): Set to 1 when the running subtree searches must stop
+    next_bound (multiprocessing.Value): The smallest f over the bound found by the workers
+    pool (ProcessPoolExecutor): The worker processes, started on the first solve
+    """
+    def __init__(self, workers=None, heuristic_class=None):
+        """
+        Constructor of the ParallelIDAStarSolver class
+        :param workers: The number of worker processes, default is the number of CPUs
+        :param heuristic_class: The class of the incremental heuristic, default is default_heuristic_class of the size
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.heuristic_class = heuristic_class
+        # Spawn rather than fork, the workers must not inherit the Tk interpreter
+        self.context = multiprocessing.get_context('spawn')
+        self.stop = self.context.Value('b', 0)
+        self.next_bound = self.context.Value('d', INFINITY)
+        self.pool = None
+
+    def start(self):
+        """
+        Start the worker processes if they are not running
+        :return: None
+        """
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=self.context, initializer=_init_subtree_worker,
+                                            initargs=(self.stop, self.next_bound))
+
+    def close(self):
+        """
+        Stop the worker processes
+        :return: None
+        """
+        if self.pool is not None:
+            self.stop.value = 1
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def frontier(self, state, heuristic_class):
+        """
+        Expand the root breadth-first until the frontier is large enough to keep every worker busy
+        :param state: PuzzleState of the root
+        :param heuristic_class: the class of the heuristic
+        :return: tuple (frontier, solution), frontier is a list of tuples (f, cells, blank, prev, path),
+        solution is the path to the goal if it is shallower than the frontier, None otherwise
+        """
+        size = state.size
+        blank_id = state.blank_id
+        neighbors = state.neighbors
+        level = [(heuristic_class(size, state.cells).value, list(state.cells), state.blank, -1, [])]
+        if level[0][0] == 0:
+            return level, []
+        while len(level) < self.workers * FRONTIER_PER_WORKER:
+            children = []
+            for _, cells, blank, prev, path in level:
+                for index in neighbors[blank]:
+                    if index == prev:
+                        continue
+                    child = list(cells)
+                    child[blank] = child[index]
+                    child[index] = blank_id
+                    h = heuristic_class(size, child).value
+                    if h == 0:
+                        return children, path + [index]
+                    children.append((len(path) + 1 + h, child, index, blank, path + [index]))
+            level = children
+        return level, None
+
+    def solve(self, state, cancel=None):
+        """
+        Find an optimal solution from the given state, which is not modified
+        :param state: PuzzleState to solve
+        :param cancel: Callable polled while waiting for the workers, returning True to abandon the search,
+        default is None
+        :return: SolveResult, None if the state is not solvable or the search was cancelled
+        """
+        state = PuzzleState(state.size, state.cells)
+        if not state.is_solvable():
+            return None
+        start = time.perf_counter()
+        heuristic_class = self.heuristic_class or default_heuristic_class(state.size)
+        frontier, solution = self.frontier(state, heuristic_class)
+        nodes = len(frontier)
+        if solution is not None:
+            return SolveResult([state.to_position(index) for index in solution], nodes, time.perf_counter() - start)
+        frontier.sort(key=lambda node: node[0])
+        self.start()
+        bound = frontier[0][0]
+        while solution is None:
+            self.stop.value = 0
+            self.next_bound.value = INFINITY
+            futures = {}
+            frontier_bound = INFINITY
+            for f, cells, blank, prev, path in frontier:
+                if f <= bound:
+                    future = self.pool.submit(_search_subtree, state.size, cells, blank, prev, len(path), bound,
+                                              heuristic_class)
+                    futures[future] = path
+                elif f < frontier_bound:
+                    frontier_bound = f
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    subtree_path, expanded = future.result()
+                    nodes += expanded
+                    if subtree_path is not None and solution is None:
+                        solution = futures[future] + subtree_path
+                if solution is None and cancel is not None and cancel():
+                    self.stop.value = 1
+                    wait(pending)
+                    return None
+            bound = min(frontier_bound, self.next_bound.value)
+        moves = [state.to_position(index) for index in solution]
+        return SolveResult(moves, nodes, time.perf_counter() - start)
+
+
+class AnytimeSolver:
+    """
+    Deadline-bounded solver for hints, returning the best path found when the time budget runs out
+
+    Weighted A* finds a solution fast when the weight is high. The search is then restarted with tightening
+    weights, pruning every node that cannot beat the best solution so far, until the weight 1 search proves
+    it optimal or the budget runs out. If no solution was found in time, the path to the node closest to
+    the goal is returned instead, so a hint always comes back within the budget.
+
+    Attributes:
+    weights (tuple): The weights of the successive searches, the last one should be 1
+    heuristic_class (class): The class of the heuristic, None to choose it per size
+    """
+    def __init__(self, weights=(5.0, 3.0, 2.0, 1.5, 1.2, 1.0), heuristic_class=None):
+        """
+        Constructor of the AnytimeSolver class
+        :param weights: The weights of the successive searches
+        :param heuristic_class: The class of the heuristic, default is default_heuristic_class of the size
+        """
+        self.weights = weights
+        self.heuristic_class = heuristic_class
+
+    def solve(self, state, budget_ms, cancel=None):
+        """
+        Find the best solution possible within a time budget, from the given state which is not modified
+        :param state: PuzzleState to solve
+        :param budget_ms: The time budget, in milliseconds
+        :param cancel: Callable polled during the search, returning True to abandon it, default is None
+        :return: SolveResult, complete is False for a partial path,
+        None if the state is not solvable or the search was cancelled
+        """
+        start = time.perf_counter()
+        deadline = start + budget_ms / 1000
+        state = PuzzleState(state.size, state.cells)
+        if not state.is_solvable():
+            return None
+        heuristic_class = self.heuristic_class or default_heuristic_class(state.size)
+        best = None
+        closest = []
+        nodes = 0
+        for weight in self.weights:
+            limit = INFINITY if best is None else len(best)
+            try:
+                path, expanded, partial = self.weighted_search(state, heuristic_class, weight, limit, deadline, cancel)
+            except SolveCancelled:
+                return None
+            nodes += expanded
+            if path is not None:
+                best = path
+            elif best is None and partial:
+                closest = partial
+            if time.perf_counter() >= deadline:
+                break
+        elapsed = time.perf_counter() - start
+        if best is not None:
+            return SolveResult([state.to_position(index) for index in best], nodes, elapsed)
+        return SolveResult([state.to_position(index) for index in closest], nodes, elapsed, complete=False)
+
+    def weighted_search(self, state, heuristic_class, weight, limit, deadline, cancel=None):
+        """
+        Run one weighted A* search
+        :param state: PuzzleState to solve
+        :param heuristic_class: The class of the heuristic
+        :param weight: The weight of the heuristic, f = g + weight * h
+        :param limit: The length of the best solution so far, longer paths are pruned
+        :param deadline: The time.perf_counter() value at which the search stops
+        :param cancel: Callable polled during the search, returning True to abandon it, default is None
+        :return: tuple (solution or None, nodes expanded, path to the node closest to the goal),
+        paths are lists of the linear indices of the tiles to click
+        """
+        size = state.size
+        neighbors = state.neighbors
+        blank_id = state.blank_id
+        root = tuple(state.cells)
+        heuristic = heuristic_class(size, root)
+        root_h = heuristic.value
+        parents = {root: None}
+        costs = {root: 0}
+        heap = [(weight * root_h, root_h, 0, root, state.blank)]
+        closest = None
+        closest_rank = (INFINITY, INFINITY)
+        nodes = 0
+
+        def path_to(cells):
+            path = []
+            while parents[cells] is not None:
+                cells, index = parents[cells]
+                path.append(index)
+            # The parent links store the index the tile was clicked at
+            return path[::-1]
+
+        while heap:
+            if time.perf_counter() >= deadline:
+                break
+            _, h, g, cells, blank = heapq.heappop(heap)
+            if g > costs[cells]:
+                continue  # A shorter path to this node was found after it was pushed
+            if h == 0:
+                return path_to(cells), nodes, path_to(cells)
+            nodes += 1
+            if cancel is not None and nodes % CANCEL_CHECK_INTERVAL == 0 and cancel():
+                raise SolveCancelled()
+            for index in neighbors[blank]:
+                child = list(cells)
+                child[blank] = child[index]
+                child[index] = blank_id
+                child = tuple(child)
+                child_g = g + 1
+                if child_g >= costs.get(child, INFINITY):
+                    continue
+                child_h = heuristic.slide_value(cells, child, index, blank, h)
+                if child_g + child_h >= limit:
+                    continue
+                costs[child] = child_g
+                parents[child] = (cells, index)
+                heapq.heappush(heap, (child_g + weight * child_h, child_h, child_g, child, index))
+                if (child_h, child_g) < closest_rank:
+                    closest, closest_rank = child, (child_h, child_g)
+        return None, nodes, [] if closest is None else path_to(closest)
@@ -0,0 +1,157 @@
+import multiprocessing
+import queue
+import constants
+from puzzle_state import PuzzleState
+from reduction_solver import ReductionSolver
+from solver import AnytimeSolver, IDAStarSolver
+
+
+def _worker_loop(jobs, results, generation):
+    """
+    Main loop of the worker process: solve the jobs until None is received
+    :param jobs: multiprocessing.Queue of the jobs, tuples (generation, kind, size, cells, budget_ms)
+    :param results: multiprocessing.Queue of the results, tuples (generation, SolveResult or None)
+    :param generation: multiprocessing.Value of the generation of the current job
+    :return: None
+    """
+    solvers = {'solve': IDAStarSolver(), 'hint': AnytimeSolver()}
+    large_solver = ReductionSolver()
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_generation, kind, size, cells, budget_ms = job
+        if job_generation != generation.value:
+            continue  # The board changed before the job started
+
+        def cancel():
+            return generation.value != job_generation
+
+        state = PuzzleState(size, cells)
+        if size > constants.OPTIMAL_SOLVER_MAX_SIZE:
+            result = large_solver.solve(state)
+        elif kind == 'hint':
+            result = solvers[kind].solve(state, budget_ms, cancel)
+        else:
+            result = solvers[kind].solve(state, cancel)
+        if not cancel():
+            results.put((job_generation, result))
+
+
+class SolverWorker:
+    """
+    Solver running in a background process, so that the turtle event loop never stalls
+
+    Only one job runs at a time. Submitting a job or calling cancel() bumps the generation shared with the
+    worker process, which abandons the running search and drops the stale jobs. Results are polled from the
+    turtle event loop with screen.ontimer and handed to the callback of their job.
+
+    Attributes:
+    screen (turtle.Screen): The screen used to poll the results, None to poll manually
+    poll_interval (int): The time between two polls, in milliseconds
+    context (multiprocessing.context): The multiprocessing context of the worker process
+    generation (multiprocessing.Value): The generation of the current job
+    jobs (multiprocessing.Queue): The queue of the jobs sent to the worker process
+    results (multiprocessing.Queue): The queue of the results sent back by the worker process
+    process (multiprocessing.Process): The worker process, started on demand
+    callback (function): The callback of the current job, None if there is none
+    polling (bool): True while a poll is scheduled
+    """
+    def __init__(self, screen=None, poll_interval=50):
+        """
+        Constructor of the SolverWorker class
+        :param screen: The screen used to poll the results, default is None to poll manually
+        :param poll_interval: The time between two polls, in milliseconds
+        """
+        self.screen = screen
+        self.poll_interval = poll_interval
+        # Spawn rather than fork, the worker must not inherit the Tk interpreter
+        self.context = multiprocessing.get_context('spawn')
+        self.generation = self.context.Value('i', 0)
+        self.jobs = self.context.Queue()
+        self.results = self.context.Queue()
+        self.process = None
+        self.callback = None
+        self.polling = False
+
+    def start(self):
+        """
+        Start the worker process if it is not running
+        :return: None
+        """
+        if self.process is None or not self.process.is_alive():
+            self.process = self.context.Process(target=_worker_loop, args=(self.jobs, self.results, self.generation),
+                                                daemon=True)
+            self.process.start()
+
+    def submit(self, kind, state, callback, budget_ms=None):
+        """
+        Submit a job for a snapshot of the state, cancelling the previous job
+        :param kind: 'solve' for an optimal solution, 'hint' for the anytime solver,
+        both use the reduction solver beyond constants.OPTIMAL_SOLVER_MAX_SIZE
+        :param state: PuzzleState to solve
+        :param callback: Function called with the SolveResult, or None if the state is not solvable
+        :param budget_ms: The time budget of a hint, in milliseconds
+        :return: None
+        """
+        self.start()
+        self.cancel()
+        self.callback = callback
+        self.jobs.put((self.generation.value, kind, state.size, list(state.cells), budget_ms))
+        self.schedule_poll()
+
+    def cancel(self):
+        """
+        Cancel the current job, its result will never be delivered
+        :return: None
+        """
+        with self.generation.get_lock():
+            self.generation.value += 1
+        self.callback = None
+
+    def pending(self):
+        """
+        Check if a job is waiting for its result
+        :return: True if a job is pending, False otherwise
+        """
+        return self.callback is not None
+
+    def schedule_poll(self):
+        """
+        Schedule the next poll on the turtle event loop
+        :return: None
+        """
+        if self.screen is not None and not self.polling:
+            self.polling = True
+            self.screen.ontimer(self.poll, self.poll_interval)
+
+    def poll(self):
+        """
+        Deliver the result of the current job if it is ready, never blocks
+        :return: None
+        """
+        self.polling = False
+        while True:
+            try:
+                generation, result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            # Results of cancelled jobs may still be in the queue
+            if generation == self.generation.value and self.callback is not None:
+                callback, self.callback = self.callback, None
+                callback(result)
+        if self.pending():
+            self.schedule_poll()
+
+    def stop(self):
+        """
+        Stop the worker process
+        :return: None
+        """
+        self.cancel()
+        if self.process is not None and self.process.is_alive():
+            self.jobs.put(None)
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.process = None
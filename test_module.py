@@ -1,12 +1,60 @@
+import collections
+import functools
+import gc
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
 import unittest
+from unittest import mock
+import atlas
+import constants
+import batch_board
+import puzzle_pack
+from batch_board import BatchBoard
+from bitboard import BitBoard, unpack
 from board import Board
+from puzzle_catalog import PuzzleCatalog
+from puzzle_state import PuzzleState
+from renderer import CanvasRenderer, NullRenderer, TurtleRenderer
+from frame_scheduler import FrameScheduler
+from file_manager import FileManager
+from heuristic import ManhattanConflict
+from pattern_database import PatternDatabaseHeuristic, build_partition, load_partition
+from reduction_solver import ReductionSolver, shorten_path
+from solution_cache import SolutionCache
+from zobrist import zobrist_hash
+from benchmark import random_walk_state
+from scramble import ScrambleGenerator, permutation_parity
+from scramble_pool import ScramblePool, classify_scrambles, pool_path, read_pool
+from shape_registry import ShapeRegistry
+from turtle_pool import TurtlePool
+from solver import AnytimeSolver, IDAStarSolver, ParallelIDAStarSolver
+from solver_worker import SolverWorker
+from tile_cache import TileCache, scale_photo, split_scaled_name
+
+# The databases of the test boards: the scramble pools and the puzzle catalog live in a temporary directory
+TEST_DATABASES = tempfile.TemporaryDirectory()
+
+
+def make_board(puzzle_file='mario.puz', renderer=None, solution_cache=None, scramble_pool=None, puzzle_catalog=None,
+               **kwargs):
+    """Create a board that opens none of the databases of constants.PATTERN_DB_DIR, headless by default"""
+    if puzzle_catalog is None:
+        puzzle_catalog = PuzzleCatalog(FileManager(), path=os.path.join(TEST_DATABASES.name, 'catalog.json'))
+    return Board(puzzle_file, NullRenderer() if renderer is None else renderer,
+                 SolutionCache() if solution_cache is None else solution_cache,
+                 ScramblePool(TEST_DATABASES.name) if scramble_pool is None else scramble_pool,
+                 puzzle_catalog=puzzle_catalog, **kwargs)
 
 
 class TestSolvable(unittest.TestCase):
     """
     Test class for Board.is_solvable() method
     """
-    board = Board()
+    board = make_board()
 
     def setup(self):
         """Setting up the board for testing"""
@@ -42,7 +90,7 @@ class TestSolvable(unittest.TestCase):
         
         Inversions: 0
         """
-        self.board = Board('luigi.puz')
+        self.board = make_board('luigi.puz')
 
         self.setup()
         self.assertTrue(self.board.is_solvable())
@@ -126,7 +174,7 @@ class TestSolvable(unittest.TestCase):
 
     def test_odd_not_solvable(self):
         """Test when the number of tiles of the puzzle is odd but the puzzle is not solvable"""
-        self.board = Board('luigi.puz')
+        self.board = make_board('luigi.puz')
 
         """
         | 0 | 1 | 2 |
@@ -184,7 +232,7 @@ class TestScramble(unittest.TestCase):
     """
     Test class for Board.real_scramble() method
     """
-    board = Board()
+    board = make_board()
 
     def setup(self):
         """Setting up the board for testing"""
@@ -201,5 +249,1035 @@ class TestScramble(unittest.TestCase):
                 self.assertTrue(self.board.is_solvable())
 
 
+class TestScrambleGenerator(unittest.TestCase):
+    """
+    Test class for the uniform random solvable scrambles
+    """
+    def test_solvable_and_seeded(self):
+        """Test that the scrambles are solvable, far enough and reproducible from a seed"""
+        generator = ScrambleGenerator(5001, min_distance=14)
+        scrambles = [generator.generate(size) for size in (3, 4, 5, 10) for _ in range(50)]
+        for state in scrambles:
+            self.assertTrue(state.is_solvable())
+            self.assertGreaterEqual(ManhattanConflict(state.size, state.cells).manhattan, 14)
+        generator = ScrambleGenerator(5001, min_distance=14)
+        self.assertEqual([generator.generate(size).key() for size in (3, 4, 5, 10) for _ in range(50)],
+                         [state.key() for state in scrambles])
+        self.assertEqual(permutation_parity([1, 0, 2]), 1)
+        self.assertEqual(permutation_parity([1, 2, 0]), 0)
+
+    def test_uniform(self):
+        """Test that all the 12 solvable 2x2 states are drawn evenly"""
+        generator = ScrambleGenerator(5001)
+        counts = collections.Counter(tuple(generator.generate_cells(2)) for _ in range(12000))
+        self.assertEqual(len(counts), 12)
+        self.assertLess(max(counts.values()) - min(counts.values()), 200)
+
+
+class TestScramblePool(unittest.TestCase):
+    """
+    Test class for the pool of scrambles of exact optimal distances
+    """
+    def test_take_exact_distance(self):
+        """Test that the board takes its scramble from the pool, at the exact distance, and the pool refills"""
+        with tempfile.TemporaryDirectory() as directory:
+            pool = ScramblePool(directory, workers=1, low_water=2)
+            try:
+                pool.fill(3, 12, 3)
+                left = len(read_pool(pool_path(3, directory))[12])
+                board = make_board('luigi.puz', scramble_pool=pool, difficulty=12)
+                self.assertEqual(board.distance(), 12)
+                self.assertEqual(len(read_pool(pool_path(3, directory))[12]), left - 1)
+                while pool.take(3, 12) is not None:
+                    pass
+                self.assertTrue(pool.pending)
+                pool.poll(block=True)
+                self.assertFalse(pool.pending)
+                self.assertTrue(read_pool(pool_path(3, directory)))
+            finally:
+                pool.close()
+
+    def test_refill_per_bucket(self):
+        """Test that a refill of a bucket does not hold back the refill of another bucket of the same size"""
+        with tempfile.TemporaryDirectory() as directory:
+            pool = ScramblePool(directory, workers=1)
+            try:
+                pool.refill(3, 12)
+                pool.refill(3, 12)
+                pool.refill(3, 14)
+                self.assertEqual(sorted(pool.pending.values()), [(3, 12), (3, 14)])
+                pool.poll(block=True)
+                self.assertFalse(pool.pending)
+            finally:
+                pool.close()
+
+    def test_candidates_reach_distance(self):
+        """Test that the candidates center on the wanted distance, and that a solve out of time is dropped"""
+        for distance in (20, 26):
+            classified = classify_scrambles(3, distance, 15, 5001)
+            self.assertEqual(len(classified), 15)
+            distances = sorted(optimal for optimal, _, _ in classified)
+            self.assertEqual(distances[len(distances) // 2], distance)
+            for optimal, bits, gap in classified:
+                self.assertEqual(len(IDAStarSolver().solve(PuzzleState(3, unpack(bits, 3))).moves), optimal)
+                self.assertEqual(gap % 2, 0)
+        start = time.monotonic()
+        self.assertEqual(classify_scrambles(4, 50, 1, 5001, budget_ms=10), [])
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_fill_bounds(self):
+        """Test that a fill rejects unreachable distances and gives up on a bucket that stops growing"""
+        with tempfile.TemporaryDirectory() as directory:
+            pool = ScramblePool(directory, workers=1)
+            try:
+                self.assertRaises(ValueError, pool.fill, 3, 32, 1)
+                self.assertRaises(ValueError, pool.fill, 2, 7, 1)
+                self.assertRaises(ValueError, pool.fill, 2, 6, pool.capacity + 1)
+                # A single 2x2 state is 6 moves away from the solved puzzle
+                self.assertRaises(RuntimeError, pool.fill, 2, 6, 2, max_stalls=3)
+                self.assertEqual(len(read_pool(pool_path(2, directory))[6]), 1)
+            finally:
+                pool.close()
+
+
+class FakeImage:
+    """Decoded image of FakeScreen, 10x10 pixels"""
+    def width(self):
+        return 10
+
+    def height(self):
+        return 10
+
+
+class FakeScreen:
+    """Screen keeping its shapes and turtles, and counting the images it decodes, to test the shape registry without
+    a display"""
+    def __init__(self):
+        self.shapes = {}
+        self.sprites = []
+        self.decoded = 0
+
+    def decode(self, name):
+        self.decoded += 1
+        return FakeImage()
+
+    def register_shape(self, name, shape):
+        self.shapes[name] = shape
+
+    def turtles(self):
+        return self.sprites
+
+
+def fake_registry(**kwargs):
+    """Create the registry of a fake screen, decoding the images with the screen"""
+    screen = FakeScreen()
+    return ShapeRegistry(screen, loader=screen.decode, **kwargs)
+
+
+class TestShapeRegistry(unittest.TestCase):
+    """
+    Test class for the registry decoding every image once
+    """
+    def setUp(self):
+        """Create a fresh registry with a budget of 3 images of 400 bytes"""
+        ShapeRegistry._instance = None
+        self.registry = fake_registry(budget=1200)
+        self.screen = self.registry.screen
+
+    def tearDown(self):
+        """Let the next user create the registry of the turtle screen"""
+        ShapeRegistry._instance = None
+
+    def test_decode_once(self):
+        """Test that an image is decoded on its first use only, by any user of the singleton"""
+        for _ in range(100):
+            ShapeRegistry().register('a.gif')
+        self.assertEqual(self.screen.decoded, 1)
+
+    def test_lru_eviction(self):
+        """Test that only the least recently used images no puzzle holds are evicted over the budget"""
+        self.registry.acquire('mario.puz', ['a.gif', 'b.gif'])
+        for name in ('a.gif', 'b.gif', 'c.gif', 'd.gif'):
+            self.registry.register(name)
+        self.assertEqual(set(self.registry.images), {'a.gif', 'b.gif', 'd.gif'})
+        self.registry.release('mario.puz')
+        self.registry.register('e.gif')
+        self.assertEqual(set(self.registry.images), {'b.gif', 'd.gif', 'e.gif'})
+        self.assertEqual(self.registry.used, 1200)
+        # The evicted images stay registered as empty shapes, whose PhotoImage the screen has dropped
+        self.assertEqual({name: shape._type for name, shape in self.screen.shapes.items()},
+                         {'a.gif': 'compound', 'b.gif': 'image', 'c.gif': 'compound', 'd.gif': 'image',
+                          'e.gif': 'image'})
+
+    def test_atlas_slices_kept(self):
+        """Test that registering a tile of an atlas keeps all its slices, so that the atlas is decoded once"""
+        sliced = []
+
+        def slice_atlas(path, grid):
+            sliced.append(path)
+            names = [atlas.tile_name(path, grid, cell) for cell in range(grid * grid)]
+            return {name: FakeImage() for name in names + [atlas.thumbnail_name(path, grid)]}
+
+        with mock.patch('shape_registry.slice_atlas', slice_atlas):
+            for cell in range(4):
+                self.registry.register(atlas.tile_name('atlas.gif', 2, cell))
+            self.assertEqual(sliced, ['atlas.gif'])
+            self.assertEqual(len(self.registry.images), 5)
+            self.assertRaises(ValueError, self.registry.register, atlas.tile_name('other.gif', 2, 4))
+
+    def test_shown_never_evicted(self):
+        """Test that an image shown by a turtle of the screen, such as a popup no puzzle holds, is never evicted"""
+        popup = FakeSprite()
+        self.screen.sprites.append(popup)
+        self.registry.apply(popup, 'popup.gif')
+        for name in ('a.gif', 'b.gif', 'c.gif', 'd.gif'):
+            self.registry.register(name)
+        self.assertEqual(self.screen.shapes['popup.gif']._type, 'image')
+        self.assertEqual(set(self.registry.images), {'popup.gif', 'c.gif', 'd.gif'})
+
+
+class FakeSprite:
+    """Turtle of the tests of the turtle pool, keeping the state the renderer and the pool set"""
+    def __init__(self):
+        self.name = 'classic'
+        self.visible = False
+        self.heading = 0
+        self.width = 1
+        self.speed_value = 3
+        self.stretch = (1, 1, 1)
+        self.colors = ('black',)
+
+    def shape(self, name=None):
+        if name is None:
+            return self.name
+        self.name = name
+
+    def isvisible(self):
+        return self.visible
+
+    def showturtle(self):
+        self.visible = True
+
+    def hideturtle(self):
+        self.visible = False
+
+    def ht(self):
+        self.visible = False
+
+    def onclick(self, callback):
+        pass
+
+    def goto(self, x, y=None):
+        pass
+
+    def clear(self):
+        pass
+
+    def setheading(self, angle):
+        self.heading = angle
+
+    def pensize(self, width):
+        self.width = width
+
+    def speed(self, speed):
+        self.speed_value = speed
+
+    def shapesize(self, *args):
+        self.stretch = args
+
+    def color(self, *args):
+        self.colors = args
+
+    def penup(self):
+        pass
+
+
+class PooledRenderer(TurtleRenderer):
+    """Turtle renderer without a screen to bind or update"""
+    def bind_click(self, callback):
+        pass
+
+    def update(self):
+        pass
+
+
+class TestTurtlePool(unittest.TestCase):
+    """
+    Test class for the reuse of the turtles of the tiles
+    """
+    def setUp(self):
+        """Create a fresh pool of fake turtles and a registry of a fake screen"""
+        TurtlePool._instance = None
+        ShapeRegistry._instance = None
+        self.pool = TurtlePool(FakeSprite)
+        fake_registry()
+
+    def tearDown(self):
+        """Let the next user create the pool and registry of the turtle screen"""
+        TurtlePool._instance = None
+        ShapeRegistry._instance = None
+
+    def test_checkin_resets(self):
+        """Test that a turtle comes out of the pool as a new one, whatever a popup did to it"""
+        sprite = self.pool.checkout()
+        sprite.shape('popup.gif')
+        sprite.showturtle()
+        sprite.setheading(90)
+        sprite.pensize(5)
+        sprite.speed(0)
+        sprite.shapesize(2, 2, 2)
+        sprite.color('red')
+        self.pool.checkin(sprite)
+        self.assertIs(self.pool.checkout(), sprite)
+        self.assertEqual(vars(sprite), vars(FakeSprite()))
+
+    def test_reset_load_soak(self):
+        """Test that 10,000 reset/load cycles create no turtle after the first ones and run in flat memory"""
+        board = make_board('luigi.puz', PooledRenderer())
+        puzzles = ['mario.puz', 'luigi.puz']
+
+        def cycle(i):
+            board.reset(0, 0)
+            board.switch_puzzle(puzzles[i % 2])
+
+        for i in range(100):
+            cycle(i)
+        created = self.pool.created
+        tracemalloc.start()
+        try:
+            # A full collection empties the free lists, whose blocks tracemalloc counts as allocated
+            gc.collect()
+            before = tracemalloc.get_traced_memory()[0]
+            for i in range(10000):
+                cycle(i)
+            gc.collect()
+            growth = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(self.pool.created, created)
+        self.assertEqual(created, 16)  # The tiles of mario.puz, the largest puzzle
+        self.assertLess(growth, 64 * 1024)
+
+
+class FakeCanvas:
+    """Canvas keeping the coordinates of its image items, to test the canvas renderer without a display"""
+    def __init__(self):
+        self.items = {}
+        self.next_item = 1
+
+    def create_image(self, x, y, image):
+        self.items[self.next_item] = (x, y)
+        self.next_item += 1
+        return self.next_item - 1
+
+    def coords(self, item, x, y):
+        self.items[item] = (x, y)
+
+    def delete(self, item):
+        del self.items[item]
+
+    def bind(self, sequence, callback):
+        pass
+
+    def unbind(self, sequence):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+
+class TestCanvasRenderer(unittest.TestCase):
+    """
+    Test class for the renderer drawing the tiles as canvas items
+    """
+    def setUp(self):
+        """Create a registry of a fake screen"""
+        ShapeRegistry._instance = None
+        fake_registry()
+
+    def tearDown(self):
+        """Let the next user create the registry of the turtle screen"""
+        ShapeRegistry._instance = None
+
+    def test_items_follow_tiles(self):
+        """Test that every tile has one item at its drawing position, also after moves and after a load"""
+        canvas = FakeCanvas()
+        board = make_board('luigi.puz', CanvasRenderer(canvas))
+        board.draw_all()
+        start_x, start_y = board.start_pos()
+        rng = random.Random(5001)
+        for _ in range(50):
+            board.move_puzzle(rng.choice(board.get_legal_moves()))
+        for row in board.tiles:
+            for tile in row:
+                x = start_x + tile.curr_position[1] * board.tile_size
+                y = start_y - tile.curr_position[0] * board.tile_size
+                self.assertEqual(canvas.items[tile.turtle], (x, -y))
+        self.assertEqual(len(canvas.items), 9)
+        board.switch_puzzle('mario.puz')
+        self.assertEqual(len(canvas.items), 16)
+
+
+class CountingRenderer(NullRenderer):
+    """Renderer counting the draws of every tile and the screen updates"""
+    def __init__(self):
+        self.draws = collections.Counter()
+        self.updates = 0
+
+    def draw_tile(self, tile, x, y):
+        self.draws[tile] += 1
+
+    def update(self):
+        self.updates += 1
+
+
+class TimerScreen:
+    """Screen keeping the timer callbacks instead of running them"""
+    def __init__(self):
+        self.timers = []
+
+    def ontimer(self, callback, delay):
+        self.timers.append(callback)
+
+
+class TextSprite:
+    """Turtle keeping the text it writes"""
+    def __init__(self):
+        self.text = ''
+        self.writes = 0
+
+    def clear(self):
+        self.text = ''
+
+    def write(self, text, font=None):
+        self.text = text
+        self.writes += 1
+
+
+class TestFrameScheduler(unittest.TestCase):
+    """
+    Test class for the batching of the draws of a frame
+    """
+    def test_one_update_per_frame(self):
+        """Test that many moves within a frame cause one timer, one screen update and one draw per moved tile"""
+        renderer = CountingRenderer()
+        screen = TimerScreen()
+        frames = FrameScheduler(renderer, screen)
+        board = make_board('luigi.puz', frames)
+        board.draw_all()
+        screen.timers.pop()()
+        renderer.draws.clear()
+        rng = random.Random(5001)
+        for _ in range(100):
+            board.move_puzzle(rng.choice(board.get_legal_moves()))
+        self.assertEqual(len(screen.timers), 1)
+        screen.timers.pop()()
+        self.assertEqual(renderer.updates, 2)
+        self.assertLessEqual(max(renderer.draws.values()), 1)
+        self.assertEqual(frames.frames, 2)
+
+    def test_changed_fields_only(self):
+        """Test that only the fields whose text changed are rewritten"""
+        screen = TimerScreen()
+        frames = FrameScheduler(CountingRenderer(), screen)
+        sprites = {name: TextSprite() for name in ('moves', 'moves_left')}
+        for name, sprite in sprites.items():
+            frames.add_field(name, sprite, None)
+        frames.set_text('moves', "Player's moves: 0")
+        frames.set_text('moves_left', "Moves left: 50")
+        screen.timers.pop()()
+        frames.set_text('moves', "Player's moves: 1")
+        frames.set_text('moves', "Player's moves: 2")
+        frames.set_text('moves_left', "Moves left: 50")
+        screen.timers.pop()()
+        self.assertEqual(sprites['moves'].text, "Player's moves: 2")
+        self.assertEqual((sprites['moves'].writes, sprites['moves_left'].writes), (2, 1))
+        self.assertEqual(screen.timers, [])
+
+
+class TestClick(unittest.TestCase):
+    """
+    Test class for the click event of the board
+    """
+    def test_position_at(self):
+        """Test that every point of a tile maps to its position and the points around the board map to None"""
+        board = make_board('mario.puz')
+        start_x, start_y = board.start_pos()
+        half = board.tile_size / 2 - 1
+        for row in range(board.num_tiles):
+            for col in range(board.num_tiles):
+                x, y = start_x + col * board.tile_size, start_y - row * board.tile_size
+                for dx, dy in ((0, 0), (-half, half), (half, -half)):
+                    self.assertEqual(board.position_at(x + dx, y + dy), (row, col))
+        self.assertIsNone(board.position_at(start_x - board.tile_size, start_y))
+        self.assertIsNone(board.position_at(start_x, start_y - board.num_tiles * board.tile_size))
+
+    def test_on_click(self):
+        """Test that a click on a tile next to the empty tile moves it, and a click elsewhere does not"""
+        board = make_board('luigi.puz')
+        start_x, start_y = board.start_pos()
+        row, col = board.get_legal_moves()[0]
+        board.on_click(start_x + col * board.tile_size, start_y - row * board.tile_size)
+        self.assertEqual(board.empty_tile_position, (row, col))
+        cells = list(board.state.cells)
+        board.on_click(start_x - board.tile_size, start_y)
+        self.assertEqual(list(board.state.cells), cells)
+
+
+class TestAtlas(unittest.TestCase):
+    """
+    Test class for the puzzles referencing one atlas image instead of one image per tile
+    """
+    def test_expand_config(self):
+        """Test that the tiles and the thumbnail get shape names split back into the atlas and their cell"""
+        puzzle_config = {'atlas': 'Images/mario/atlas.gif', 'number': 16, 'blank': 'Images/mario/blank.gif'}
+        atlas.expand_config(puzzle_config)
+        for cell in range(15):
+            self.assertEqual(atlas.split_name(puzzle_config[cell + 1]), ('Images/mario/atlas.gif', 4, cell))
+        self.assertEqual(puzzle_config[16], 'Images/mario/blank.gif')
+        self.assertEqual(atlas.split_name(puzzle_config['thumbnail']), ('Images/mario/atlas.gif', 4, 'thumbnail'))
+        self.assertEqual(atlas.split_name('Images/mario/1.gif'), ('Images/mario/1.gif', None, None))
+
+    def test_check_atlas_puzzle(self):
+        """Test that an atlas puzzle is valid when its atlas file exists, whatever its number of tiles"""
+        file_manager = FileManager()
+        prev, log_file = file_manager.puzzle_file, file_manager.log_file
+        with tempfile.TemporaryDirectory() as directory:
+            file_manager.log_file = f"{directory}/puzzle.err"
+            image = f"{directory}/atlas.gif"
+            for name, number in (('valid', 25), ('missing', 9)):
+                with open(f"{directory}/{name}.puz", 'w') as file:
+                    file.write(f"name: {name}\nnumber: {number}\nsize: 98\natlas: {image}\n")
+            with open(image, 'wb') as file:
+                file.write(b'GIF87a')
+            try:
+                self.assertTrue(file_manager.check_puzzle_config(f"{directory}/valid.puz"))
+                self.assertEqual(len([key for key in file_manager.load_puzzle_file() if isinstance(key, int)]), 25)
+                file_manager.puzzle_file = prev
+                os.remove(image)
+                self.assertFalse(file_manager.check_puzzle_config(f"{directory}/missing.puz"))
+            finally:
+                file_manager.puzzle_file, file_manager.log_file = prev, log_file
+
+
+class TestPuzzlePack(unittest.TestCase):
+    """
+    Test class for the puzzles loaded from a puzzle pack
+    """
+    def test_load_packed_puzzle(self):
+        """Test that a packed puzzle is listed, valid and loaded with the same images as the loose one"""
+        file_manager = FileManager()
+        prev = file_manager.puzzle_file
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/classics.pzp"
+            puzzle_pack.write_pack(path, ['luigi.puz', 'yoshi.puz'])
+            pack = puzzle_pack.open_pack(path)
+            try:
+                self.assertEqual(pack.puzzles(), [f"{path}!luigi.puz", f"{path}!yoshi.puz"])
+                self.assertTrue(file_manager.check_puzzle_config(f"{path}!luigi.puz"))
+                puzzle_config = file_manager.load_puzzle_file()
+                self.assertEqual(puzzle_config[1], f"{path}!Images/luigi/9.gif")
+                self.assertEqual(puzzle_pack.read_bytes(puzzle_config[1]), puzzle_pack.read_bytes('Images/luigi/9.gif'))
+                board = make_board(f"{path}!luigi.puz")
+                self.assertEqual(board.num_tiles, 3)
+                self.assertFalse(puzzle_pack.exists(f"{path}!mario.puz"))
+            finally:
+                file_manager.puzzle_file = prev
+                pack.close()
+                del puzzle_pack._packs[path]
+
+
+class FakePhoto:
+    """Image of the tests of the resampling, keeping only its width"""
+    def __init__(self, width):
+        self.size = width
+
+    def width(self):
+        return self.size
+
+    def zoom(self, factor):
+        return FakePhoto(self.size * factor)
+
+    def subsample(self, factor):
+        return FakePhoto(self.size // factor)
+
+
+class TestTileCache(unittest.TestCase):
+    """
+    Test class for the tile images resampled to the tile size
+    """
+    def test_board_fits(self):
+        """Test that the tiles of a board too big for the board area are shrunk and resampled"""
+        with tempfile.TemporaryDirectory() as directory:
+            puzzle_file = f"{directory}/big.puz"
+            with open(puzzle_file, 'w') as file:
+                file.write("name: big\nnumber: 36\nsize: 98\nthumbnail: Images/luigi/luigi_thumbnail.gif\n")
+                file.write("".join(f"{i}: Images/luigi/{i % 9 + 1}.gif\n" for i in range(1, 37)))
+            board = make_board(puzzle_file)
+            self.assertLessEqual(board.num_tiles * board.tile_size, min(constants.BOARD_WIDTH, constants.BOARD_HEIGHT))
+            for row in board.tiles:
+                for tile in row:
+                    self.assertEqual(split_scaled_name(tile.image)[1], board.tile_size - constants.TILE_GAP)
+        board = make_board('luigi.puz')
+        self.assertTrue(all(split_scaled_name(tile.image)[1] is None for row in board.tiles for tile in row))
+
+    def test_cache_key(self):
+        """Test that a resampled image gets a new file when its size or its source file changes"""
+        with tempfile.TemporaryDirectory() as directory:
+            source = f"{directory}/1.gif"
+            with open(source, 'wb') as file:
+                file.write(b'GIF87a')
+            cache = TileCache(directory)
+            path = cache.path(source, 70)
+            self.assertEqual(cache.path(source, 70), path)
+            self.assertNotEqual(cache.path(source, 80), path)
+            os.utime(source, ns=(0, 0))
+            self.assertNotEqual(cache.path(source, 70), path)
+
+    def test_scale_photo(self):
+        """Test that the resampling gets close to the wanted width with small zoom and subsample factors"""
+        for width, size in ((98, 70), (98, 45), (53, 85), (98, 98)):
+            self.assertLessEqual(abs(scale_photo(FakePhoto(width), size).width() - size), width / 8)
+
+
+class CountingCatalog(PuzzleCatalog):
+    """Catalog counting the files it parses"""
+    parsed = 0
+
+    def index_file(self, path):
+        self.parsed += 1
+        return super().index_file(path)
+
+
+class TestPuzzleCatalog(unittest.TestCase):
+    """
+    Test class for the persistent index of the puzzles
+    """
+    def test_refresh_changed_files_only(self):
+        """Test that only added or changed files are parsed, removed ones are dropped and the index persists"""
+        with tempfile.TemporaryDirectory() as directory:
+            puzzles, packs = f"{directory}/puzzles", f"{directory}/packs"
+            os.mkdir(puzzles)
+            os.mkdir(packs)
+            for name in ('luigi', 'yoshi', 'malformed_mario'):
+                shutil.copy(f"{name}.puz", puzzles)
+            puzzle_pack.write_pack(f"{packs}/classics.pzp", ['mario.puz'])
+            path = f"{directory}/catalog.json"
+            catalog = CountingCatalog(FileManager(), [puzzles, packs], path)
+            self.assertTrue(catalog.refresh())
+            self.assertEqual(catalog.parsed, 4)
+            self.assertEqual(len(catalog), 4)
+            self.assertEqual(catalog.lookup(f"{puzzles}/luigi.puz"),
+                             {'name': 'luigi', 'number': 9, 'size': 98, 'thumbnail': 'Images/luigi/luigi_thumbnail.gif',
+                              'valid': True})
+            self.assertFalse(catalog.lookup(f"{puzzles}/malformed_mario.puz")['valid'])
+            self.assertFalse(catalog.is_valid(f"{puzzles}/malformed_mario.puz"))
+            self.assertEqual(len(catalog.valid_names()), 3)
+            self.assertIn(f"{packs}/classics.pzp!mario.puz", catalog)
+
+            catalog = CountingCatalog(FileManager(), [puzzles, packs], path)
+            self.assertEqual(len(catalog), 4)
+            self.assertFalse(catalog.refresh())
+            self.assertEqual(catalog.parsed, 0)
+            with open(f"{puzzles}/yoshi.puz", 'a') as file:
+                file.write("\n")
+            os.remove(f"{puzzles}/luigi.puz")
+            self.assertTrue(catalog.refresh())
+            self.assertEqual(catalog.parsed, 1)
+            self.assertNotIn(f"{puzzles}/luigi.puz", catalog)
+            self.assertEqual(catalog.lookup(f"{puzzles}/yoshi.puz")['number'], 4)
+            puzzle_pack.open_pack(f"{packs}/classics.pzp").close()
+            del puzzle_pack._packs[f"{packs}/classics.pzp"]
+
+    def test_file_manager_lists_board_catalog(self):
+        """Test that the file manager lists the loose and packed puzzles of the catalog of the board"""
+        with tempfile.TemporaryDirectory() as directory:
+            shutil.copy('yoshi.puz', directory)
+            shutil.copy('malformed_mario.puz', directory)
+            puzzle_pack.write_pack(f"{directory}/classics.pzp", ['mario.puz'])
+            catalog = PuzzleCatalog(FileManager(), [directory], f"{directory}/catalog.json")
+            make_board('luigi.puz', puzzle_catalog=catalog)
+            self.assertEqual(FileManager().load_puzzle_catalog(),
+                             [f"{directory}/classics.pzp!mario.puz", f"{directory}/yoshi.puz"])
+            self.assertIs(FileManager().puzzle_catalog, catalog)
+            puzzle_pack.open_pack(f"{directory}/classics.pzp").close()
+            del puzzle_pack._packs[f"{directory}/classics.pzp"]
+
+    def test_load_offers_valid_puzzles(self):
+        """Test that the load dialog lists only the valid puzzles and refuses an invalid one"""
+        with tempfile.TemporaryDirectory() as directory:
+            catalog = PuzzleCatalog(FileManager(), ['.'], f"{directory}/catalog.json")
+            board = make_board('luigi.puz', puzzle_catalog=catalog)
+            log_file, board.file_manager.log_file = board.file_manager.log_file, f"{directory}/puzzle.err"
+            events = []
+            board.register_move_callback('no_puzzle', lambda: events.append('no_puzzle'))
+            prompts = []
+            try:
+                with mock.patch('turtle.textinput', lambda title, text: prompts.append(text) or 'malformed_mario.puz'):
+                    board.load_new_puzzle(0, 0)
+            finally:
+                board.file_manager.log_file = log_file
+            self.assertIn('luigi.puz (luigi, 3x3)', prompts[0])
+            self.assertNotIn('malformed_mario.puz', prompts[0])
+            self.assertEqual(events, ['no_puzzle'])
+            self.assertEqual(board.file_manager.puzzle_file, 'luigi.puz')
+            with open(f"{directory}/puzzle.err") as file:
+                log = file.read()
+            self.assertIn('Malformed puzzle file - "malformed_mario.puz"', log)
+            self.assertNotIn('not found', log)
+
+
+class TestPuzzleState(unittest.TestCase):
+    """
+    Test class for the headless PuzzleState, and Board as a view over it
+    """
+    def test_move(self):
+        """Test that only tiles adjacent to the blank can move"""
+        state = PuzzleState(4)
+        self.assertEqual(state.legal_moves(), (11, 14))
+        self.assertFalse(state.move(0))
+        self.assertTrue(state.move(14))
+        self.assertEqual(state.blank, 14)
+        self.assertEqual(state.cells[15], 14)
+        self.assertFalse(state.is_solved())
+        self.assertTrue(state.move(15))
+        self.assertTrue(state.is_solved())
+
+    def test_board_view(self):
+        """Test that the tiles of the board follow the state"""
+        board = make_board()
+        self.assertEqual(PuzzleState.from_tiles(board.tiles).key(), board.state.key())
+        for row in range(board.num_tiles):
+            for col in range(board.num_tiles):
+                self.assertEqual(board.tiles[row][col].curr_position, (row, col))
+        row, col = board.empty_tile_position
+        board.move_puzzle(board.get_legal_moves()[0])
+        self.assertEqual(board.tiles[row][col].curr_position, (row, col))
+        self.assertEqual(PuzzleState.from_tiles(board.tiles).key(), board.state.key())
+
+
+class TestBitBoard(unittest.TestCase):
+    """
+    Test class for the packed bitboard state
+    """
+    def test_moves_match_state(self):
+        """Test that the bitboard follows the state move for move, and converts back to the board"""
+        board = make_board('mario.puz')
+        bitboard = BitBoard.from_tiles(board.tiles)
+        state = board.state.copy()
+        rng = random.Random(5001)
+        for _ in range(200):
+            index = rng.choice(bitboard.legal_moves())
+            self.assertTrue(bitboard.move(index))
+            state.move(index)
+            self.assertEqual(bitboard, BitBoard.from_state(state))
+        self.assertFalse(bitboard.move(bitboard.blank))
+        bitboard.apply_to(board)
+        self.assertEqual(PuzzleState.from_tiles(board.tiles).key(), state.key())
+        self.assertEqual(len({BitBoard.solved(4), BitBoard.from_state(PuzzleState(4))}), 1)
+        self.assertTrue(BitBoard.solved(3).is_solved())
+        with self.assertRaises(ValueError):
+            BitBoard.solved(5)
+
+
+@unittest.skipIf(batch_board.np is None, "NumPy is not installed")
+class TestBatchBoard(unittest.TestCase):
+    """
+    Test class for the NumPy batch simulator
+    """
+    def test_matches_puzzle_state(self):
+        """Test that every board of the batch follows the same moves as a PuzzleState"""
+        batch = BatchBoard.from_puzzle_file('mario.puz', 50)
+        states = [PuzzleState(batch.size) for _ in range(batch.count)]
+        rng = batch_board.np.random.default_rng(5001)
+        for _ in range(40):
+            moves = rng.integers(0, 4, batch.count)
+            legal = batch.step(moves)
+            for board, state in enumerate(states):
+                neighbor = batch_board.direction_table(batch.size)[state.blank, moves[board]]
+                self.assertEqual(bool(legal[board]), neighbor >= 0)
+                if neighbor >= 0:
+                    state.move(int(neighbor))
+        for board, state in enumerate(states):
+            self.assertEqual(batch.to_state(board).key(), state.key())
+            self.assertEqual(batch.manhattan()[board], ManhattanConflict(batch.size, state.cells).manhattan)
+            self.assertEqual(batch.is_solved()[board], state.is_solved())
+
+    def test_scramble(self):
+        """Test that the scrambled boards stay solvable and the legality mask matches the blank"""
+        batch = BatchBoard(3, 100)
+        self.assertTrue(batch.is_solved().all())
+        batch.scramble(30, batch_board.np.random.default_rng(5001))
+        self.assertFalse(batch.is_solved().all())
+        mask = batch.legal_mask()
+        for board in range(batch.count):
+            state = batch.to_state(board)
+            self.assertTrue(state.is_solvable())
+            self.assertEqual(int(mask[board].sum()), len(state.legal_moves()))
+
+
+class TestIncrementalState(unittest.TestCase):
+    """
+    Test class for the values the state keeps up to date on every swap
+    """
+    def test_incremental_hash(self):
+        """Test that the hash kept by the board matches the standalone hash after every move"""
+        board = make_board('luigi.puz')
+        hashes = {board.zobrist_hash}
+        rng = random.Random(5001)
+        for _ in range(200):
+            board.move_puzzle(rng.choice(board.get_legal_moves()))
+            self.assertEqual(board.zobrist_hash, zobrist_hash(tuple(board.state.cells)))
+            hashes.add(board.zobrist_hash)
+        self.assertEqual(zobrist_hash(tuple(range(16))), PuzzleState(4).zobrist)
+        self.assertGreater(len(hashes), 1)
+
+    def test_misplaced_counter(self):
+        """Test that the misplaced counter kept by the state matches a full scan after every move"""
+        state = PuzzleState(5)
+        rng = random.Random(5001)
+        for _ in range(300):
+            state.move(rng.choice(state.legal_moves()))
+            self.assertEqual(state.misplaced, state.count_misplaced())
+            self.assertEqual(state.is_solved(), state.key() == tuple(range(25)))
+        state.reset()
+        self.assertTrue(state.is_solved())
+
+    def test_distance_bound(self):
+        """Test that the heuristic kept by the board matches a rebuilt one and never exceeds the true distance"""
+        board = make_board('luigi.puz')
+        rng = random.Random(5001)
+        for _ in range(30):
+            board.move_puzzle(rng.choice(board.get_legal_moves()))
+            self.assertEqual(board.distance_bound, ManhattanConflict(board.num_tiles, board.state.cells).value)
+        self.assertLessEqual(board.distance_bound, board.distance())
+
+    def test_inversion_parity(self):
+        """Test the Fenwick tree count and the parity kept by swap against the quadratic count"""
+        rng = random.Random(5001)
+        state = PuzzleState(6)
+        for _ in range(200):
+            # Raw swaps of any two cells, the blank included
+            state.swap(rng.randrange(36), rng.randrange(36))
+            ids = [tile for tile in state.cells if tile != state.blank_id]
+            inversions = sum(1 for i in range(len(ids)) for j in range(i + 1, len(ids)) if ids[i] > ids[j])
+            self.assertEqual(state.calculate_inversions(), inversions)
+            self.assertEqual(state.parity, inversions % 2)
+
+
+class TestSolver(unittest.TestCase):
+    """
+    Test class for the IDA* solver
+    """
+    def test_optimal_solution(self):
+        """Test that the solution solves the puzzle in the fewest moves"""
+        """
+        | 1 | 2 | 5 |
+        | 0 | 4 | 8 |
+        | 3 | 6 | 7 |
+
+        Known optimal solution: 7 moves
+        """
+        state = PuzzleState(3, [1, 2, 5, 0, 4, 8, 3, 6, 7])
+        result = IDAStarSolver().solve(state)
+        self.assertEqual(len(result.moves), 7)
+        self.assertGreater(result.nodes, 0)
+        for position in result.moves:
+            self.assertTrue(state.move(state.to_index(position)))
+        self.assertTrue(state.is_solved())
+
+    def test_board_hint(self):
+        """Test that following the hints solves a scrambled board"""
+        board = make_board('luigi.puz')
+        distance = len(board.solve().moves)
+        for _ in range(distance):
+            board.move_puzzle(board.hint())
+        self.assertTrue(board.is_solved())
+        self.assertIsNone(board.hint())
+
+    def test_not_solvable(self):
+        """Test that an unsolvable state has no solution"""
+        state = PuzzleState(3)
+        state.swap(0, 1)
+        self.assertIsNone(IDAStarSolver().solve(state))
+
+
+class TestParallelSolver(unittest.TestCase):
+    """
+    Test class for the multi-process IDA* solver
+    """
+    def test_same_length_as_single_process(self):
+        """Test that the parallel solution is optimal and solves the puzzle"""
+        solver = ParallelIDAStarSolver(workers=2)
+        try:
+            for state in (make_board('luigi.puz').state.copy(), random_walk_state(4, 60, random.Random(7))):
+                result = solver.solve(state)
+                self.assertEqual(len(result.moves), len(IDAStarSolver().solve(state).moves))
+                for position in result.moves:
+                    self.assertTrue(state.move(state.to_index(position)))
+                self.assertTrue(state.is_solved())
+        finally:
+            solver.close()
+
+
+class TestAnytimeSolver(unittest.TestCase):
+    """
+    Test class for the deadline-bounded hint solver
+    """
+    def test_optimal_within_budget(self):
+        """Test that an easy puzzle is solved optimally when the budget is large enough"""
+        board = make_board('luigi.puz')
+        result = AnytimeSolver().solve(board.state, 5000)
+        self.assertTrue(result.complete)
+        self.assertEqual(len(result.moves), len(board.solve().moves))
+
+    def test_deadline(self):
+        """Test that a hint on a deep scramble of a big board comes back within the budget"""
+        state = PuzzleState(8)
+        rng = random.Random(5001)
+        for _ in range(2000):
+            state.move(rng.choice(state.legal_moves()))
+        result = AnytimeSolver().solve(state, 50)
+        self.assertLess(result.elapsed, 0.1)
+        self.assertFalse(result.complete)
+        self.assertTrue(result.moves)
+        for position in result.moves:
+            self.assertTrue(state.move(state.to_index(position)))
+
+
+class TestReductionSolver(unittest.TestCase):
+    """
+    Test class for the non-optimal solver of large boards
+    """
+    def test_solve_any_size(self):
+        """Test that random solvable states of every size are solved, a 20x20 board in under a second"""
+        rng = random.Random(5001)
+        for size in (2, 3, 5, 8, 20):
+            cells = list(range(size * size))
+            rng.shuffle(cells)
+            state = PuzzleState(size, cells)
+            if not state.is_solvable():
+                state.swap(*[index for index, tile in enumerate(cells) if tile != state.blank_id][:2])
+            result = ReductionSolver().solve(state)
+            if size == 20:
+                self.assertLess(result.elapsed, 1.0)
+            for position in result.moves:
+                self.assertTrue(state.move(state.to_index(position)))
+            self.assertTrue(state.is_solved())
+
+    def test_shorten_path(self):
+        """Test that inverse pairs and cycles are removed from a path"""
+        state = PuzzleState(3)
+        # Three turns of the blank around the bottom right 2x2 square restore it, then a move and its inverse
+        path = [5, 4, 7, 8] * 3 + [7, 8]
+        self.assertEqual(shorten_path(state, path), [])
+        self.assertEqual(shorten_path(state, [5, 4, 7, 8]), [5, 4, 7, 8])
+
+
+class TestSolutionCache(unittest.TestCase):
+    """
+    Test class for the transposition table of solved states
+    """
+    def test_board_queries(self):
+        """Test that a solve records the whole path, so the later queries are hits"""
+        board = make_board('luigi.puz')
+        distance = len(board.solve().moves)
+        self.assertEqual(board.solution_cache.misses, 1)
+        for remaining in range(distance, 0, -1):
+            self.assertEqual(board.distance(), remaining)
+            board.move_puzzle(board.hint())
+        self.assertTrue(board.is_solved())
+        self.assertEqual(board.distance(), 0)
+        self.assertEqual(board.solution_cache.misses, 1)
+        self.assertEqual(board.solution_cache.hits, 2 * distance + 1)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used states are evicted first"""
+        cache = SolutionCache(capacity=3)
+        state = PuzzleState(3, [1, 2, 5, 0, 4, 8, 3, 6, 7])
+        path = [state.to_index(position) for position in IDAStarSolver().solve(state).moves]
+        cache.record(state, path)
+        self.assertEqual(len(cache.entries), 3)
+        self.assertIsNone(cache.lookup(state))
+        self.assertEqual(cache.lookup(PuzzleState(3)), (0, -1))
+
+    def test_persistent(self):
+        """Test that the entries are reused by another cache on the same file"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = directory + '/solutions.sqlite'
+            state = PuzzleState(3, [1, 2, 5, 0, 4, 8, 3, 6, 7])
+            path_moves = [state.to_index(position) for position in IDAStarSolver().solve(state).moves]
+            cache = SolutionCache(path=path)
+            cache.record(state, path_moves)
+            cache.close()
+            cache = SolutionCache(path=path)
+            self.assertEqual(cache.solution(state), path_moves)
+            self.assertEqual(cache.misses, 0)
+            cache.close()
+
+
+class TestSolverWorker(unittest.TestCase):
+    """
+    Test class for the background solver process
+    """
+    def setUp(self):
+        """Start a worker polled manually"""
+        self.worker = SolverWorker()
+        self.results = []
+
+    def tearDown(self):
+        """Stop the worker process"""
+        self.worker.stop()
+
+    def wait(self, timeout=30):
+        """Poll the worker until no job is pending"""
+        deadline = time.monotonic() + timeout
+        while self.worker.pending() and time.monotonic() < deadline:
+            self.worker.poll()
+            time.sleep(0.01)
+
+    def test_solve(self):
+        """Test that the result of a job is delivered to its callback"""
+        board = make_board('luigi.puz')
+        self.worker.submit('solve', board.state, self.results.append)
+        self.wait()
+        self.assertEqual(len(self.results), 1)
+        self.assertEqual(len(self.results[0].moves), len(board.solve().moves))
+
+    def test_cancel_stale_job(self):
+        """Test that a job is cancelled when the board changes, only the last result is delivered"""
+        board = make_board()
+        self.worker.submit('solve', board.state, lambda result: self.results.append('stale'))
+        board.move_puzzle(board.get_legal_moves()[0])
+        self.worker.cancel()
+        self.worker.submit('hint', board.state, self.results.append, 100)
+        self.wait()
+        self.assertEqual(len(self.results), 1)
+        self.assertNotEqual(self.results[0], 'stale')
+
+
+class TestPatternDatabase(unittest.TestCase):
+    """
+    Test class for the additive pattern databases
+    """
+    def test_additive_heuristic(self):
+        """Test that a 4-4 partition of the 3x3 puzzle, built in parallel, keeps the solutions optimal"""
+        partition = ((0, 1, 2, 3), (4, 5, 6, 7))
+        with tempfile.TemporaryDirectory() as directory:
+            build_partition(3, partition, directory, workers=2)
+            databases = load_partition(3, partition, directory)
+            heuristic_class = functools.partial(PatternDatabaseHeuristic, databases=databases)
+            board = make_board('luigi.puz')
+            for _ in range(5):
+                board.real_scramble()
+                cells = list(board.state.cells)
+                self.assertGreaterEqual(heuristic_class(3, cells).value, ManhattanConflict(3, cells).manhattan)
+                expected = IDAStarSolver(ManhattanConflict).solve(board.state)
+                result = IDAStarSolver(heuristic_class).solve(board.state)
+                self.assertEqual(len(result.moves), len(expected.moves))
+            for database in databases:
+                database.close()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,4 +1,4 @@
-import turtle
+from renderer import create_renderer
 
 
 class Tile:
@@ -9,24 +9,22 @@ class Tile:
         image (str): The image file path of the tile
         init_position (tuple): The initial position of the tile
         curr_position (tuple): The current position of the tile
+        renderer (TurtleRenderer): The renderer drawing the tile
         turtle (turtle): A turtle object used for drawing, representing an image registered as a shape
-        tile_callback (function): Callback function on the event of click
     """
-    def __init__(self, image, init_position, curr_position, callback=None):
+    def __init__(self, image, init_position, curr_position, renderer=None):
         """
         Initialize a Tile object
         :param image: The image file path of the tile
         :param init_position: The initial position of the tile
         :param curr_position: The current position of the tile
-        :param callback: Callback function on the event of click, initialized as None
+        :param renderer: The renderer drawing the tile, default is the renderer selected by constants.RENDERER
         """
         self.image = image
         self.init_position = init_position
         self.curr_position = curr_position
-        self.turtle = turtle.Turtle()
-        self.turtle.hideturtle()
-        self.turtle.penup()
-        self.tile_callback = callback
+        self.renderer = create_renderer() if renderer is None else renderer
+        self.turtle = self.renderer.create_sprite()
 
     def draw(self, x, y):
         """
@@ -35,20 +33,4 @@ class Tile:
         :param y: y-coordinate of the click
         :return: None
         """
-        if not self.turtle.isvisible():
-            self.turtle.showturtle()
-
-        turtle.register_shape(self.image)
-        self.turtle.shape(self.image)
-        self.turtle.goto(x, y)
-        self.turtle.onclick(self.on_event)
-
-    def on_event(self, x, y):
-        """
-        Callback function on the event of click
-        :param x: x-coordinate of the click
-        :param y: y-coordinate of the click
-        :return: None
-        """
-        if self.tile_callback is not None:
-            self.tile_callback(self.curr_position)
+        self.renderer.draw_tile(self, x, y)
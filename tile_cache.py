@@ -0,0 +1,96 @@
+"""
+Disk cache of the tile images resampled to the tile size of a board, so that a puzzle is resampled only once.
+"""
+import hashlib
+import os
+from fractions import Fraction
+import constants
+from atlas import source_path
+from puzzle_pack import load_photo, split_path
+
+SIZE_SEPARATOR = '@'
+MAX_SCALE_DENOMINATOR = 8  # Bounds the intermediate zoom of a resampling
+
+
+def scaled_name(name, size):
+    """
+    Get the shape name of an image resampled to a size
+    :param name: the image file path or shape name
+    :param size: the width of the resampled image, in pixels
+    :return: the shape name
+    """
+    return f"{name}{SIZE_SEPARATOR}{size}"
+
+
+def split_scaled_name(name):
+    """
+    Split a shape name into the image it is resampled from and its size
+    :param name: the shape name
+    :return: tuple (image file path or shape name, size), size is None for an image that is not resampled
+    """
+    base, separator, size = name.rpartition(SIZE_SEPARATOR)
+    if not separator or not size.isdigit():
+        return name, None
+    return base, int(size)
+
+
+def scale_photo(photo, size):
+    """
+    Resample an image to a width with Tk: zoom by the numerator then subsample by the denominator of the scale,
+    which keeps the colors of the image so that it can be written as a GIF
+    :param photo: tkinter.PhotoImage
+    :param size: the width of the resampled image, in pixels
+    :return: a new tkinter.PhotoImage, as close to the width as a scale with a small denominator allows
+    """
+    scale = Fraction(size, photo.width()).limit_denominator(MAX_SCALE_DENOMINATOR)
+    if scale.numerator > 1:
+        photo = photo.zoom(scale.numerator)
+    if scale.denominator > 1:
+        photo = photo.subsample(scale.denominator)
+    return photo
+
+
+class TileCache:
+    """
+    Resampled tile images stored as GIFs on disk, keyed by the source image, its modification time and the size
+
+    Attributes:
+    directory (str): The directory of the resampled images
+    """
+    def __init__(self, directory=constants.TILE_CACHE_DIR):
+        """
+        Constructor of the TileCache class
+        :param directory: The directory of the resampled images, default is constants.TILE_CACHE_DIR
+        """
+        self.directory = directory
+
+    def path(self, name, size):
+        """
+        Get the file of a resampled image, a changed source file gets a new file
+        :param name: the image file path or shape name, loose or inside a puzzle pack
+        :param size: the width of the resampled image
+        :return: the file path
+        """
+        # The file behind an atlas tile or a packed image is the atlas or the pack
+        source = split_path(source_path(name))[0]
+        key = f"{name}|{os.stat(source).st_mtime_ns}|{size}"
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.gif')
+
+    def load(self, name, size, decode):
+        """
+        Load a resampled image from the disk, or resample it and store it
+        :param name: the image file path or shape name
+        :param size: the width of the resampled image
+        :param decode: function returning the tkinter.PhotoImage of the source image, called on a cache miss only
+        :return: tkinter.PhotoImage
+        """
+        path = self.path(name, size)
+        if os.path.isfile(path):
+            return load_photo(path)
+        photo = scale_photo(decode(), size)
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first, another game may read the cache meanwhile
+        temp_path = path + '.tmp'
+        photo.write(temp_path, format='gif')
+        os.replace(temp_path, path)
+        return photo
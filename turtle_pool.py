@@ -0,0 +1,75 @@
+import turtle
+
+DEFAULT_SPEED = 3  # The speed of a new turtle
+
+
+def create_pooled_turtle():
+    """
+    Create a new turtle object for the pool
+    :return: a hidden turtle object with penup()
+    """
+    sprite = turtle.Turtle()
+    sprite.hideturtle()
+    sprite.penup()
+    return sprite
+
+
+class TurtlePool:
+    """
+    Singleton pool of turtle objects, so that the turtles of the tiles and popups are reused instead of recreated
+
+    Every turtle.Turtle() adds items to the Tk canvas that are never deleted, even when the turtle is hidden.
+    Turtles are checked out of the pool and checked back in when they are not shown anymore, so the number of
+    turtles, and of canvas items, is bounded by the most turtles shown at once.
+
+    Attributes:
+    factory (function): The function creating a new turtle when the pool is empty
+    free (list): The turtles checked in, ready to be checked out
+    created (int): The number of turtles created by the pool
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        """Singleton pattern implementation"""
+        if cls._instance is None:
+            cls._instance = super(TurtlePool, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, factory=create_pooled_turtle):
+        """
+        Constructor of the TurtlePool class, only the first call initializes the pool
+        :param factory: The function creating a new turtle, default is create_pooled_turtle
+        """
+        if not hasattr(self, 'free'):
+            self.factory = factory
+            self.free = []
+            self.created = 0
+
+    def checkout(self):
+        """
+        Take a turtle out of the pool, creating one if the pool is empty
+        :return: a hidden turtle object with penup(), in the classic shape and without click event
+        """
+        if self.free:
+            return self.free.pop()
+        self.created += 1
+        return self.factory()
+
+    def checkin(self, sprite):
+        """
+        Put a turtle back into the pool: hide it, erase its drawings and text, and reset its shape, click event, heading,
+        pen and speed to those of a new turtle
+        :param sprite: the turtle object, which must not be used by the caller anymore
+        :return: None
+        """
+        sprite.hideturtle()
+        sprite.clear()
+        sprite.onclick(None)
+        sprite.shape('classic')
+        sprite.shapesize(1, 1, 1)
+        sprite.color('black')
+        sprite.setheading(0)
+        sprite.pensize(1)
+        sprite.speed(DEFAULT_SPEED)
+        sprite.penup()
+        self.free.append(sprite)
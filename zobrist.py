@@ -0,0 +1,42 @@
+"""
+Zobrist hashing of boards: one random 64-bit key per (tile id, linear index) pair, XORed over the board.
+
+The keys of a size are the same in every process and session, so hashes can be stored and compared anywhere.
+"""
+import math
+import random
+
+ZOBRIST_SEED = 5001
+
+
+def zobrist_table(size):
+    """
+    Get the Zobrist keys of a size
+    :param size: number of tiles per line
+    :return: tuple of tuples, table[tile][index] is the key of the tile at the linear index
+    """
+    table = _ZOBRIST_TABLES.get(size)
+    if table is None:
+        rng = random.Random(ZOBRIST_SEED * 1000 + size)
+        table = tuple(tuple(rng.getrandbits(64) for _ in range(size * size)) for _ in range(size * size))
+        _ZOBRIST_TABLES[size] = table
+    return table
+
+
+_ZOBRIST_TABLES = {}
+
+
+def zobrist_hash(cells, size=None):
+    """
+    Hash a board from scratch
+    :param cells: sequence of the tile ids in linear order, such as a tuple or PuzzleState.cells
+    :param size: number of tiles per line, default is the square root of the number of cells
+    :return: the 64-bit hash
+    """
+    if size is None:
+        size = math.isqrt(len(cells))
+    table = zobrist_table(size)
+    value = 0
+    for index, tile in enumerate(cells):
+        value ^= table[tile][index]
+    return value